@@ -0,0 +1,187 @@
+"""
+Alarm register haritaları ve vektörel hata biti çözücü.
+
+hata_kodu (Register 189, 32-bit) ve hata_kodu_193 (Register 193) sütunlarını
+satır satır 32 bit döngüsü yerine NumPy ile bir seferde bit matrisine açar;
+milyonlarca satırda da aktif arıza tablosu ve başlangıç/bitiş olayları
+saniyeler içinde çıkar.
+"""
+import numpy as np
+import pandas as pd
+
+# --- ALARM HARİTALARI ---
+FAULT_MAP_189 = {
+    0:  "DC Overcurrent Fault [1-1]",
+    1:  "DC Overcurrent Fault [1-2]",
+    2:  "DC Overcurrent Fault [2-1]",
+    3:  "DC Overcurrent Fault [2-2]",
+    4:  "DC Overcurrent Fault [3-1]",
+    5:  "DC Overcurrent Fault [3-2]",
+    6:  "DC Overcurrent Fault [4-1]",
+    7:  "DC Overcurrent Fault [4-2]",
+    8:  "DC Overcurrent Fault [5-1]",
+    9:  "DC Overcurrent Fault [5-2]",
+    10: "DC Overcurrent Fault [6-1]",
+    11: "DC Overcurrent Fault [6-2]",
+    12: "DC Overcurrent Fault [7-1]",
+    13: "DC Overcurrent Fault [7-2]",
+    14: "DC Overcurrent Fault [8-1]",
+    15: "DC Overcurrent Fault [8-2]",
+    16: "DC Overcurrent Fault [9-1]",
+    17: "DC Overcurrent Fault [9-2]",
+    18: "DC Overcurrent Fault [10-1]",
+    19: "DC Overcurrent Fault [10-2]",
+    20: "DC Overcurrent Fault [11-1]",
+    21: "DC Overcurrent Fault [11-2]",
+    22: "DC Overcurrent Fault [12-1]",
+    23: "DC Overcurrent Fault [12-2]"
+}
+
+FAULT_MAP_193 = {
+    0: "PV Overvoltage[1]",
+    1: "PV Overvoltage[2]",
+    2: "PV Overvoltage[3]",
+    3: "PV Overvoltage[4]",
+    4: "PV Overvoltage[5]",
+    5: "PV Overvoltage[6]",
+    6: "PV Overvoltage[7]",
+    7: "PV Overvoltage[8]",
+    8: "PV Overvoltage[9]",
+    9: "PV Overvoltage[10]",
+    10: "PV Overvoltage[11]",
+    11: "PV Overvoltage[12]"
+}
+
+# Sütun adı -> (register adresi, bit haritası)
+ALARM_REGISTERLARI = {
+    'hata_kodu': (189, FAULT_MAP_189),
+    'hata_kodu_193': (193, FAULT_MAP_193),
+}
+
+def hata_mesaji(register, bit):
+    fault_map = {reg: fmap for reg, fmap in ALARM_REGISTERLARI.values()}.get(register, {})
+    return fault_map.get(bit, f"Bilinmeyen Hata (Bit {bit})")
+
+def bitleri_ac(degerler):
+    """
+    32-bit alarm kelimelerini (n, 32) boolean matrise açar; sütun i = bit i.
+    Little-endian byte + little bit sırası ile bit 0 ilk sütuna düşer.
+    """
+    kelimeler = np.asarray(degerler, dtype=np.int64).astype('<u4')
+    return np.unpackbits(kelimeler.view(np.uint8).reshape(-1, 4), axis=1, bitorder='little').astype(bool)
+
+def hata_tablosu(df):
+    """
+    df: slave_id, zaman, hata_kodu, hata_kodu_193 sütunlu ölçümler.
+    Dönüş (uzun format, sadece aktif bitler): slave_id, zaman, register, bit, mesaj
+    """
+    parcalar = []
+    for sutun, (register, _) in ALARM_REGISTERLARI.items():
+        if sutun not in df:
+            continue
+        satir, bit = np.nonzero(bitleri_ac(df[sutun].to_numpy()))
+        parcalar.append(pd.DataFrame({
+            'slave_id': df['slave_id'].to_numpy()[satir],
+            'zaman': df['zaman'].to_numpy()[satir],
+            'register': register,
+            'bit': bit,
+        }))
+    sonuc = pd.concat(parcalar, ignore_index=True) if parcalar else \
+        pd.DataFrame(columns=['slave_id', 'zaman', 'register', 'bit'])
+    sonuc['mesaj'] = _mesajlar(sonuc)
+    return sonuc
+
+def _mesajlar(df):
+    # (register, bit) çiftleri az: her benzersiz çift için bir kez sözlük bakılır
+    if df.empty:
+        return pd.Series(dtype=object)
+    ciftler = df[['register', 'bit']].drop_duplicates()
+    etiketler = {(r, b): hata_mesaji(r, b) for r, b in ciftler.itertuples(index=False)}
+    return pd.Series([etiketler[k] for k in zip(df['register'], df['bit'])], index=df.index)
+
+def alarm_olaylari(df):
+    """
+    Ölçüm serisinden arıza başlangıç/bitiş olaylarını çıkarır.
+    Her (cihaz, register, bit) için 0->1 geçişi başlangıç, 1->0 geçişi bitiştir;
+    hâlâ aktif olanların bitisi NaT'dir.
+    Dönüş: slave_id, register, bit, mesaj, baslangic, bitis, sure
+    """
+    df = df.sort_values(['slave_id', 'zaman'], kind='stable')
+    zaman = df['zaman'].to_numpy()
+    slave = df['slave_id'].to_numpy()
+    # Her cihazın ilk satırında önceki durum "temiz" kabul edilir
+    yeni_cihaz = np.r_[True, slave[1:] != slave[:-1]]
+
+    baslayanlar, bitenler = [], []
+    for sutun, (register, _) in ALARM_REGISTERLARI.items():
+        if sutun not in df:
+            continue
+        bitler = bitleri_ac(df[sutun].to_numpy())
+        onceki = np.vstack([np.zeros((1, 32), dtype=bool), bitler[:-1]])
+        onceki[yeni_cihaz] = False
+
+        for maske, hedef in ((bitler & ~onceki, baslayanlar), (onceki & ~bitler, bitenler)):
+            satir, bit = np.nonzero(maske)
+            hedef.append(pd.DataFrame({'slave_id': slave[satir], 'register': register,
+                                       'bit': bit, 'zaman': zaman[satir]}))
+
+    anahtar = ['slave_id', 'register', 'bit']
+    bas = pd.concat(baslayanlar, ignore_index=True) if baslayanlar else pd.DataFrame(columns=anahtar + ['zaman'])
+    bit = pd.concat(bitenler, ignore_index=True) if bitenler else pd.DataFrame(columns=anahtar + ['zaman'])
+
+    # k. başlangıç k. bitişle eşleşir (geçişler her anahtar için sırayla değişir)
+    bas = bas.sort_values(anahtar + ['zaman'], ignore_index=True)
+    bit = bit.sort_values(anahtar + ['zaman'], ignore_index=True)
+    bas['sira'] = bas.groupby(anahtar).cumcount()
+    bit['sira'] = bit.groupby(anahtar).cumcount()
+    olaylar = bas.merge(bit, on=anahtar + ['sira'], how='left', suffixes=('_bas', '_bit'))
+    olaylar = olaylar.rename(columns={'zaman_bas': 'baslangic', 'zaman_bit': 'bitis'}).drop(columns='sira')
+
+    olaylar['sure'] = olaylar['bitis'] - olaylar['baslangic']
+    olaylar['mesaj'] = _mesajlar(olaylar)
+    return olaylar[['slave_id', 'register', 'bit', 'mesaj', 'baslangic', 'bitis', 'sure']]
+
+def olay_ozeti(olaylar, simdi=None):
+    """Cihaz + arıza bazında sıklık ve toplam süre (açık olaylar simdi'ye kadar sayılır)."""
+    simdi = pd.Timestamp(simdi or pd.Timestamp.now())
+    sure = olaylar['sure'].fillna(simdi - olaylar['baslangic'])
+    return (olaylar.assign(sure=sure, aktif=olaylar['bitis'].isna())
+            .groupby(['slave_id', 'register', 'mesaj'], as_index=False)
+            .agg(adet=('baslangic', 'size'), toplam_sure=('sure', 'sum'),
+                 ort_sure=('sure', 'mean'), aktif=('aktif', 'any'))
+            .sort_values(['adet', 'toplam_sure'], ascending=False, ignore_index=True))
+
+class AlarmIzleyici:
+    """
+    Collector tarafında her cihazın son alarm kelimelerini tutar; yeni okumayla
+    XOR alıp sadece değişen bitler için başlangıç/bitiş olayı üretir.
+    Değişiklik yoksa maliyet cihaz başına iki tamsayı karşılaştırmasıdır.
+    """
+
+    def __init__(self, aktif_alarmlar=()):
+        # aktif_alarmlar: veritabani.aktif_alarmlar() çıktısı; yeniden başlatmada
+        # açık arızalar tekrar "başladı" diye yazılmasın
+        self.durum = {}
+        register_sutun = {reg: sutun for sutun, (reg, _) in ALARM_REGISTERLARI.items()}
+        for slave_id, register, bit, *_ in aktif_alarmlar:
+            kelimeler = self.durum.setdefault(slave_id, dict.fromkeys(ALARM_REGISTERLARI, 0))
+            kelimeler[register_sutun[register]] |= 1 << bit
+
+    def guncelle(self, slave_id, data, zaman=None):
+        """Yeni okumayı işler, olay listesi döner: [{'tur', 'slave_id', 'register', 'bit', 'zaman'}]"""
+        zaman = zaman or data.get('timestamp') or pd.Timestamp.now().to_pydatetime()
+        onceki = self.durum.setdefault(slave_id, dict.fromkeys(ALARM_REGISTERLARI, 0))
+        olaylar = []
+        for sutun, (register, _) in ALARM_REGISTERLARI.items():
+            yeni = int(data.get(sutun, 0))
+            fark = yeni ^ onceki[sutun]
+            if not fark:
+                continue
+            for bit in range(32):
+                if (fark >> bit) & 1:
+                    olaylar.append({
+                        'tur': 'baslangic' if (yeni >> bit) & 1 else 'bitis',
+                        'slave_id': slave_id, 'register': register, 'bit': bit, 'zaman': zaman,
+                    })
+            onceki[sutun] = yeni
+        return olaylar
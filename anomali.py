@@ -0,0 +1,183 @@
+"""
+Filo bazında düşük performans ve anomali tespiti (toplu analiz).
+
+Tüm cihazların guc/sicaklik serileri bir özet tablosunun (varsayılan
+olcumler_1dk) ortak kovalarında hizalanır: satırlar kova, sütunlar cihaz.
+Bütün hesaplar bu iki matris üzerinde vektörel yapılır (cihaz başına döngü yok):
+    - dusuk_verim  : güç / aynı kovadaki filo medyanı, kayan ortalaması oran_esik altında
+    - ani_dusus    : oranın kendi geçmişine göre kayan z-skoru -z_esik altında
+    - asiri_isinma : sıcaklığın filo medyanından farkı (kayan ortalama) isi_fark °C
+                     üstünde ya da bu fark saatte isi_egim °C'den hızlı büyüyor
+Filo medyanı min_guc altındaysa (gece) ya da aynı kovada min_cihaz'dan az
+cihaz varsa güç karşılaştırması yapılmaz. En az min_kova ardışık işaretli kova
+tek anomali dönemi olarak anomaliler tablosuna yazılır (pages/anomaliler.py).
+
+    python anomali.py                -> son ANOMALI['pencere_saat'] saat
+    python anomali.py --gun 2026-01-15
+"""
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import filo
+import veritabani
+
+# --- ANOMALİ AYARLARI ---
+ANOMALI = {
+    'tablo': 'olcumler_1dk',   # Hizalama kovası (özet tablosu)
+    'pencere_saat': 24,        # Periyodik analizde geriye bakılan süre
+    'aralik': 900,             # Collector içinden çalışırken iki analiz arası (sn)
+    'min_guc': 50,             # W, filo medyanı bunun altındaysa güç karşılaştırılmaz
+    'min_cihaz': 3,            # Karşılaştırma için kovada en az bu kadar cihaz
+    'oran_esik': 0.8,          # Filo medyanına oran
+    'ortalama_kova': 15,       # Oran ve sıcaklık farkının kayan ortalama penceresi (kova)
+    'z_kova': 60,              # z-skoru için geçmiş penceresi (kova)
+    'z_esik': 3.0,
+    'z_min_std': 0.02,         # Çok düzgün serilerde z-skoru patlamasın
+    'isi_fark': 10.0,          # °C, filo medyanının üstü
+    'isi_egim': 5.0,           # °C/saat, filo medyanına göre ısınma hızı
+    'isi_kova': 30,            # Eğim penceresi (kova)
+    'min_kova': 5,             # Anomali sayılması için en az ardışık işaretli kova
+}
+
+ANOMALI_TURLERI = {
+    'dusuk_verim': "Düşük verim (filo medyanına oran)",
+    'ani_dusus': "Ani güç düşüşü (z-skoru)",
+    'asiri_isinma': "Aşırı ısınma (filoya göre °C)",
+}
+
+BOS = pd.DataFrame(columns=["slave_id", "tur", "baslangic", "bitis", "deger"])
+
+def matrisler(df, bas, son, saniye):
+    """Uzun biçimli özet satırlarından kova × cihaz guc ve sicaklik matrisleri (eksik: NaN)."""
+    zamanlar = np.arange(bas, son + 1, saniye)
+    guc = df.pivot(index="zaman", columns="slave_id", values="guc").reindex(zamanlar)
+    sicaklik = df.pivot(index="zaman", columns="slave_id", values="sicaklik").reindex(zamanlar)
+    return guc, sicaklik
+
+def _kayan_egim(df, pencere):
+    # Eşit aralıklı x için en küçük kareler eğimi: cov(x, y) / var(x), kova başına
+    x = pd.Series(np.arange(len(df), dtype=float), index=df.index)
+    ort_x = x.rolling(pencere).mean()
+    ort_xy = df.mul(x, axis=0).rolling(pencere).mean()
+    ort_y = df.rolling(pencere).mean()
+    return (ort_xy - ort_y.mul(ort_x, axis=0)) / ((pencere ** 2 - 1) / 12)
+
+def gostergeler(guc, sicaklik, saniye):
+    """Kova × cihaz göstergeleri: {'oran', 'z', 'isi_fark', 'isi_egim'} (°C/saat)."""
+    medyan = guc.median(axis=1)
+    gecerli = (medyan >= ANOMALI['min_guc']) & (guc.notna().sum(axis=1) >= ANOMALI['min_cihaz'])
+    oran = guc.div(medyan, axis=0).where(gecerli, axis=0)
+
+    # z-skoru: kovanın oranı, cihazın önceki z_kova kovasındaki oranlarına göre
+    k = ANOMALI['z_kova']
+    gecmis = oran.shift(1).rolling(k, min_periods=k // 2)
+    z = (oran - gecmis.mean()) / gecmis.std().clip(lower=ANOMALI['z_min_std'])
+
+    isi_fark = sicaklik.sub(sicaklik.median(axis=1), axis=0)
+    isi_egim = _kayan_egim(isi_fark, ANOMALI['isi_kova']) * (3600 / saniye)
+    return {'oran': oran, 'z': z, 'isi_fark': isi_fark, 'isi_egim': isi_egim}
+
+def _donemler(isaret, deger, en_kotu, zamanlar, cihazlar, saniye, tur):
+    """Kova × cihaz bool matrisindeki ardışık işaretli dizileri dönemlere çevirir."""
+    # Cihaz satırları, iki ucu dolgulu: her dizi tam bir 0->1 ve 1->0 geçişi verir
+    dolgulu = np.pad(isaret.T.astype(np.int8), ((0, 0), (1, 1)))
+    gecis = np.diff(dolgulu, axis=1)
+    satir, bas = np.nonzero(gecis == 1)
+    _, son = np.nonzero(gecis == -1)
+    uzun = (son - bas) >= ANOMALI['min_kova']
+    satir, bas, son = satir[uzun], bas[uzun], son[uzun]
+    if not len(satir):
+        return BOS.copy()
+
+    # Dönem başına en kötü değer: düzleştirilmiş dizide [bas, son) dilimlerinin indirgenmesi
+    genislik = isaret.shape[0] + 1
+    degerler = np.pad(deger.T, ((0, 0), (0, 1))).ravel()
+    sinirlar = np.column_stack([satir * genislik + bas, satir * genislik + son]).ravel()
+    en_kotu_deger = en_kotu.reduceat(degerler, sinirlar)[::2]
+    return pd.DataFrame({
+        "slave_id": cihazlar[satir],
+        "tur": tur,
+        "baslangic": zamanlar[bas],
+        "bitis": zamanlar[son - 1] + pd.Timedelta(seconds=saniye),
+        "deger": en_kotu_deger,
+    })
+
+def analiz(guc, sicaklik, saniye):
+    """Hizalanmış matrislerden anomali dönemleri: DataFrame [slave_id, tur, baslangic, bitis, deger]"""
+    g = gostergeler(guc, sicaklik, saniye)
+    # Tek kovalık gürültü dönemleri bölmesin: eşikler kayan ortalamaya uygulanır
+    k = ANOMALI['ortalama_kova']
+    # (verisi olmayan kovalar ortalamadan değer almaz, dönem veri bitince biter)
+    oran_ort = g['oran'].rolling(k, min_periods=k // 2).mean().where(g['oran'].notna())
+    isi_ort = g['isi_fark'].rolling(k, min_periods=k // 2).mean().where(g['isi_fark'].notna())
+    isaretler = [
+        ('dusuk_verim', oran_ort < ANOMALI['oran_esik'], oran_ort, np.fmin),
+        ('ani_dusus', g['z'] < -ANOMALI['z_esik'], g['z'], np.fmin),
+        ('asiri_isinma', (isi_ort > ANOMALI['isi_fark'])
+            | ((g['isi_egim'] > ANOMALI['isi_egim']) & (isi_ort > 0)), isi_ort, np.fmax),
+    ]
+    zamanlar = pd.to_datetime(guc.index, unit='s')
+    cihazlar = guc.columns.to_numpy()
+    parcalar = [_donemler(isaret.to_numpy(), deger.to_numpy(), en_kotu, zamanlar, cihazlar, saniye, tur)
+                for tur, isaret, deger, en_kotu in isaretler]
+    return pd.concat(parcalar, ignore_index=True).sort_values(["baslangic", "slave_id"], ignore_index=True)
+
+def anomali_hesapla(baslangic=None, bitis=None):
+    """
+    [baslangic, bitis] (varsayılan: son pencere_saat) analizi, DB'ye yazmadan.
+    Dönüş: (kovalara yuvarlanmış başlangıç, bitiş, anomali DataFrame'i)
+    """
+    bitis = bitis or datetime.now()
+    baslangic = baslangic or bitis - timedelta(hours=ANOMALI['pencere_saat'])
+    tablo = ANOMALI['tablo']
+    saniye = dict(veritabani.OZET_TABLOLARI)[tablo]
+    bas = filo.kova_anahtari(baslangic, saniye)
+    son = filo.kova_anahtari(bitis, saniye)
+
+    df = veritabani.ozet_seri_getir(tablo, bas, son)
+    if df.empty:
+        anomaliler = BOS.copy()
+    else:
+        anomaliler = analiz(*matrisler(df, bas, son, saniye), saniye)
+    return pd.to_datetime(bas, unit='s'), pd.to_datetime(son, unit='s'), anomaliler
+
+def anomali_calistir(baslangic=None, bitis=None):
+    """anomali_hesapla + anomaliler tablosuna yazma; dönüş: yeni açılan dönem sayısı."""
+    bas, son, anomaliler = anomali_hesapla(baslangic, bitis)
+    return veritabani.anomali_yaz(bas, son, anomaliler, yuksek_kotu=('asiri_isinma',))
+
+def anomali_baslat(aralik=None):
+    """Collector içinde analizi arka planda periyodik çalıştıran iş parçacığını başlatır."""
+    aralik = aralik or ANOMALI['aralik']
+
+    def _dongu():
+        while True:
+            try:
+                adet = anomali_calistir()
+                if adet:
+                    print(f"🔎 Anomali analizi: {adet} yeni dönem")
+            except Exception as e:
+                logging.error(f"Anomali analizi hatası: {e}")
+            time.sleep(aralik)
+
+    is_parcacigi = threading.Thread(target=_dongu, name="Anomali", daemon=True)
+    is_parcacigi.start()
+    return is_parcacigi
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Filo anomali analizi")
+    p.add_argument("--gun", help="YYYY-MM-DD (varsayılan: son pencere_saat saat)")
+    a = p.parse_args()
+    veritabani.init_db()
+    if a.gun:
+        gun = datetime.strptime(a.gun, "%Y-%m-%d")
+        aralik = (gun, gun + timedelta(days=1) - timedelta(seconds=1))
+    else:
+        aralik = (None, None)
+    bas = time.perf_counter()
+    adet = anomali_calistir(*aralik)
+    print(f"🔎 {adet} yeni anomali dönemi ({time.perf_counter() - bas:.1f} sn)")
@@ -0,0 +1,273 @@
+"""
+solar_log.db saklama (retention) ve bakım motoru.
+
+- Ham ölçümler SAKLAMA['ham_gun'] günden eskiyse olcumler'den silinir.
+  Özet tabloları (1dk/15dk/gün) yazma sırasında dolduğundan eski veri
+  grafiklerde özet çözünürlükte görünmeye devam eder.
+- Silinmeden önce ham satırlar aylık arşiv dosyalarına taşınır
+  (arsiv/solar_log_2026_01.db). Dosya işlem sonunda DETACH edilir; taşınabilir,
+  sıkıştırılabilir ya da sorgu için tekrar bağlanabilir (arsiv_bagla).
+- Tüm silmeler küçük paketlerle ve ayrı transaction'larla yapılır; collector
+  yazmaya devam ederken çalıştırılabilir.
+- SAKLAMA['kompakt'] açıksa (varsayılan kapalı) ham satırlar olcumler_kompakt'a
+  da kopyalanır (satır başına ~20 byte, veritabani.kompakt_aralik_getir ile
+  okunur). Bu tablo da SAKLAMA['kompakt_gun'] günden eskiyse silinir; aksi
+  halde aynı örnek arşivde, Parquet'te ve kompakt tabloda üç kez tutulurdu.
+- SAKLAMA['parquet'] açıksa kapanmış (dünden eski) günler cihaz bazında
+  Parquet dosyalarına yazılır; uzun aralık analizleri SQLite yerine
+  veritabani.parquet_aralik_getir ile bu dosyalardan yapılır.
+- metrik_istatistik (metrikler.py) SAKLAMA['metrik_gun'] günden eskiyse silinir.
+- auto_vacuum=INCREMENTAL ise boşalan sayfalar parça parça diske geri verilir.
+"""
+import os
+import time
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+import veritabani
+
+# --- SAKLAMA AYARLARI ---
+SAKLAMA = {
+    'ham_gun': 30,                 # olcumler'de ham veri kaç gün tutulur
+    'kompakt': False,              # olcumler_kompakt'a da kopyala (veritabani.kompakt_goc)
+    'kompakt_gun': 365,            # olcumler_kompakt kaç gün tutulur (None: süresiz)
+    'parquet': True,               # Kapanmış günleri Parquet'e yaz (parquet_disa_aktar)
+    'ozet_gun': {                  # Özet tablolarının saklama süreleri (None: süresiz)
+        'olcumler_1dk': 180,
+        'olcumler_15dk': 730,
+        'olcumler_gunluk': None,
+    },
+    'metrik_gun': 30,              # metrik_istatistik kaç gün tutulur (None: süresiz)
+    # DB'nin yanındaki arsiv/ klasörü (Docker'da volume içinde kalsın). None: arşivlemeden sil
+    'arsiv_klasoru': os.path.join(os.path.dirname(veritabani.DB_NAME), 'arsiv'),
+    'silme_paketi': 5000,          # Tek transaction'da en fazla taşınan/silinen satır
+    'paket_arasi_bekleme': 0.05,   # Paketler arasında yazıcıya nefes aldır (sn)
+    'vacuum_sayfa': 2000,          # Her turda geri verilecek en fazla boş sayfa
+}
+BAKIM_ARALIGI = 3600  # Collector içinden çalışırken iki bakım arası (sn)
+
+def arsiv_dosyasi(ay, klasor=None):
+    """'2026-01' -> arsiv/solar_log_2026_01.db"""
+    klasor = klasor or SAKLAMA['arsiv_klasoru']
+    return os.path.join(klasor, f"solar_log_{ay.replace('-', '_')}.db")
+
+def arsiv_bagla(conn, ay, takma_ad='arsiv'):
+    """Bir aylık arşiv dosyasını sorgu için bağlantıya ATTACH eder."""
+    conn.execute("ATTACH DATABASE ? AS " + takma_ad, (arsiv_dosyasi(ay),))
+
+def _arsiv_tablosu_kur(conn):
+    # Arşivde özet yok, sadece ham satırlar (id korunur)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS arsiv.olcumler (
+            id INTEGER PRIMARY KEY,
+            slave_id INTEGER,
+            zaman TIMESTAMP,
+            guc REAL,
+            voltaj REAL,
+            akim REAL,
+            sicaklik REAL,
+            hata_kodu INTEGER DEFAULT 0,
+            hata_kodu_193 INTEGER DEFAULT 0
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS arsiv.idx_arsiv_slave_zaman ON olcumler(slave_id, zaman)")
+
+def _en_eski_zaman(conn):
+    # id sırası zaman sırasına çok yakın: MIN(zaman) gibi tam tarama yapmaz
+    row = conn.execute("SELECT zaman FROM olcumler ORDER BY id LIMIT 1").fetchone()
+    return row[0] if row else None
+
+def _sonraki_ay(ay):
+    yil, a = map(int, ay.split('-'))
+    return f"{yil + a // 12}-{a % 12 + 1:02d}"
+
+def ham_veriyi_temizle(conn, sinir):
+    """sinir'den eski ham ölçümleri (isteğe bağlı arşivleyerek) paket paket siler."""
+    paket = SAKLAMA['silme_paketi']
+    toplam = 0
+    while True:
+        en_eski = _en_eski_zaman(conn)
+        if en_eski is None or en_eski >= sinir:
+            break
+
+        # Bu turda en eski kaydın ayı işlenir: ay sonu ya da saklama sınırı
+        ay = en_eski[:7]
+        ust_sinir = min(sinir, _sonraki_ay(ay) + "-01 00:00:00")
+
+        arsivle = SAKLAMA['arsiv_klasoru'] is not None
+        if arsivle:
+            os.makedirs(SAKLAMA['arsiv_klasoru'], exist_ok=True)
+            arsiv_bagla(conn, ay)
+            _arsiv_tablosu_kur(conn)
+        try:
+            while True:
+                row = conn.execute('''
+                    SELECT MAX(id) FROM (
+                        SELECT id FROM olcumler WHERE zaman < ? ORDER BY id LIMIT ?
+                    )
+                ''', (ust_sinir, paket)).fetchone()
+                if row[0] is None:
+                    break
+                with conn:
+                    if arsivle:
+                        conn.execute('''
+                            INSERT OR IGNORE INTO arsiv.olcumler
+                            SELECT id, slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
+                            FROM main.olcumler WHERE id <= ? AND zaman < ?
+                        ''', (row[0], ust_sinir))
+                    silinen = conn.execute(
+                        "DELETE FROM main.olcumler WHERE id <= ? AND zaman < ?", (row[0], ust_sinir)).rowcount
+                toplam += silinen
+                time.sleep(SAKLAMA['paket_arasi_bekleme'])
+        finally:
+            if arsivle:
+                conn.execute("DETACH DATABASE arsiv")
+
+        # Ay sınırından sonra id sırası bozuk kayıtlar kalmışsa sonsuz döngüye girme
+        if _en_eski_zaman(conn) == en_eski:
+            break
+    return toplam
+
+def parquet_disa_aktar(conn, simdi=None):
+    """
+    Henüz yazılmamış kapanmış günleri gun/slave_id bölümlü Parquet dosyalarına yazar.
+    Son yazılan gün ayarlar tablosunda tutulur. Yazılan dosya sayısını döner.
+    """
+    simdi = simdi or datetime.now()
+    bugun = simdi.strftime('%Y-%m-%d')
+    son_gun = veritabani.ayar_oku('parquet_son_gun', None, conn)
+    if son_gun is None:
+        en_eski = _en_eski_zaman(conn)
+        if en_eski is None:
+            return 0
+        gun = datetime.strptime(en_eski[:10], '%Y-%m-%d')
+    else:
+        gun = datetime.strptime(son_gun, '%Y-%m-%d') + timedelta(days=1)
+
+    cihazlar = [r[0] for r in conn.execute("SELECT slave_id FROM son_durum")]
+    dosya_sayisi = 0
+    while gun.strftime('%Y-%m-%d') < bugun:
+        gun_str = gun.strftime('%Y-%m-%d')
+        ertesi = (gun + timedelta(days=1)).strftime('%Y-%m-%d')
+        for slave_id in cihazlar:
+            # (slave_id, zaman) index'i ile tek cihazın tek günü
+            df = pd.read_sql_query('''
+                SELECT zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
+                FROM olcumler WHERE slave_id = ? AND zaman >= ? AND zaman < ?
+                ORDER BY zaman
+            ''', conn, params=(slave_id, gun_str, ertesi))
+            if df.empty:
+                continue
+            df["zaman"] = pd.to_datetime(df["zaman"], format="ISO8601")
+            dosya = veritabani.parquet_dosyasi(gun_str, slave_id)
+            os.makedirs(os.path.dirname(dosya), exist_ok=True)
+            # Yarım dosya kalmasın: önce geçici dosyaya yaz, sonra yerine taşı
+            df.to_parquet(dosya + ".tmp", index=False)
+            os.replace(dosya + ".tmp", dosya)
+            dosya_sayisi += 1
+        with conn:
+            veritabani.ayar_yaz('parquet_son_gun', gun_str, conn)
+        gun += timedelta(days=1)
+    return dosya_sayisi
+
+def ozetleri_temizle(conn, simdi):
+    """Saklama süresi dolan özet satırlarını cihaz bazında (PK aralığıyla) siler."""
+    cihazlar = [r[0] for r in conn.execute("SELECT slave_id FROM son_durum")]
+    toplam = 0
+    for tablo, gun in SAKLAMA['ozet_gun'].items():
+        if gun is None:
+            continue
+        sinir = (simdi - timedelta(days=gun)).strftime('%Y-%m-%d %H:%M:%S')
+        for slave_id in cihazlar:
+            with conn:
+                toplam += conn.execute(
+                    f"DELETE FROM {tablo} WHERE slave_id = ? AND zaman < CAST(strftime('%s', ?) AS INTEGER)",
+                    (slave_id, sinir)).rowcount
+    return toplam
+
+def kompakt_temizle(conn, simdi):
+    """olcumler_kompakt'ta saklama süresi dolan satırları cihaz bazında (PK aralığıyla) siler."""
+    if SAKLAMA['kompakt_gun'] is None:
+        return 0
+    sinir_ms = int(pd.Timestamp(simdi - timedelta(days=SAKLAMA['kompakt_gun'])).value // 1_000_000)
+    cihazlar = [r[0] for r in conn.execute("SELECT DISTINCT slave_id FROM olcumler_kompakt")]
+    toplam = 0
+    for slave_id in cihazlar:
+        with conn:
+            toplam += conn.execute(
+                "DELETE FROM olcumler_kompakt WHERE slave_id = ? AND zaman_ms < ?",
+                (slave_id, sinir_ms)).rowcount
+    return toplam
+
+def metrikleri_temizle(conn, simdi):
+    """metrik_istatistik'te saklama süresi dolan satırları metrik bazında ((ad, zaman) index'i) siler."""
+    if SAKLAMA['metrik_gun'] is None:
+        return 0
+    sinir = (simdi - timedelta(days=SAKLAMA['metrik_gun'])).strftime('%Y-%m-%d %H:%M:%S')
+    toplam = 0
+    for (ad,) in conn.execute("SELECT DISTINCT ad FROM metrik_istatistik").fetchall():
+        with conn:
+            toplam += conn.execute(
+                "DELETE FROM metrik_istatistik WHERE ad = ? AND zaman < ?", (ad, sinir)).rowcount
+    return toplam
+
+def artimli_vacuum(conn):
+    """auto_vacuum=INCREMENTAL ise boş sayfaları sınırlı sayıda diske geri verir."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    bos = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    sayfa = min(bos, SAKLAMA['vacuum_sayfa'])
+    if sayfa:
+        conn.execute(f"PRAGMA incremental_vacuum({sayfa})").fetchall()
+    return sayfa
+
+def otomatik_vacuum_ac():
+    """
+    Mevcut (eski) bir veritabanını auto_vacuum=INCREMENTAL'a çevirir.
+    Tam VACUUM yapar: tüm dosyayı yeniden yazar, collector durmuşken çalıştırın.
+    """
+    conn = sqlite3.connect(veritabani.DB_NAME)
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+    conn.close()
+
+def bakim_calistir(simdi=None):
+    """Tek bir bakım turu: ham veri saklama + özet saklama + artımlı vacuum."""
+    simdi = simdi or datetime.now()
+    sinir = (simdi - timedelta(days=SAKLAMA['ham_gun'])).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    conn = veritabani.baglanti_ac()
+    try:
+        if SAKLAMA['kompakt']:
+            veritabani.kompakt_goc(conn)
+        if SAKLAMA['parquet']:
+            parquet_disa_aktar(conn, simdi)
+        ham = ham_veriyi_temizle(conn, sinir)
+        ozet = ozetleri_temizle(conn, simdi) + kompakt_temizle(conn, simdi) + metrikleri_temizle(conn, simdi)
+        sayfa = artimli_vacuum(conn)
+    finally:
+        conn.close()
+
+    if ham or ozet or sayfa:
+        print(f"🧹 Bakım: {ham} ham ölçüm arşivlendi/silindi, {ozet} özet/metrik satırı silindi, {sayfa} sayfa geri verildi")
+    return ham, ozet, sayfa
+
+def bakim_baslat(aralik=BAKIM_ARALIGI):
+    """Collector içinde bakımı arka planda periyodik çalıştıran iş parçacığını başlatır."""
+    def _dongu():
+        while True:
+            try:
+                bakim_calistir()
+            except Exception as e:
+                logging.error(f"Bakım hatası: {e}")
+            time.sleep(aralik)
+
+    is_parcacigi = threading.Thread(target=_dongu, name="Bakim", daemon=True)
+    is_parcacigi.start()
+    return is_parcacigi
+
+if __name__ == "__main__":
+    veritabani.init_db()
+    bakim_calistir()
@@ -0,0 +1,286 @@
+"""
+Sıcak yollar için performans ölçümü (benchmark).
+
+1. Döngü süresi : sanal_inverter filosu alt süreç olarak açılır, collector'ın
+                  okuma fonksiyonları artan cihaz sayılarıyla sürülür
+                  (collector'ın zamanlayıcılı async yolu gateway_planli_tara
+                  ve senkron read_device).
+2. Yazma hızı   : veri_ekle (tek satır), veri_ekle_toplu ve VeriYazici ile
+                  saniyede kaç ölçüm yazılabildiği.
+3. Sorgu süresi : 1M/10M/100M satırlık sentetik geçmişle doldurulmuş
+                  veritabanlarında tum_cihazlarin_son_durumu, son_verileri_getir,
+                  aralik_getir, son_kayit_id gecikmelerinin yüzdelikleri.
+
+Ölçüm veritabanları BENCH['klasor'] içinde tutulur (solar_log.db'ye dokunulmaz)
+ve tekrar çalıştırmada yeniden doldurulmaz. Rapor ekrana ve bench_output.txt'ye
+yazılır; iki çalıştırmanın çıktısı karşılaştırılarak gerilemeler yakalanır.
+
+Örnek: python benchmark.py --cihaz 10 50 200 --satir 1000000 10000000
+"""
+import os
+import sys
+import time
+import socket
+import random
+import asyncio
+import argparse
+import subprocess
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from pymodbus.client import ModbusTcpClient, AsyncModbusTcpClient
+import veritabani
+import collector
+import zamanlayici
+
+# --- AYARLAR ---
+BENCH = {
+    'klasor': 'bench_veri',            # Ölçüm veritabanları (git'e girmez)
+    'cikti': 'bench_output.txt',
+    'ip': '127.0.0.1',
+    'port': 5300,                      # Sanal filonun ilk portu
+    'gateway_sayisi': 4,               # Cihazlar bu kadar porta bölünür
+    'cihaz_sayilari': [10, 50, 200],
+    'tur': 5,                          # Cihaz sayısı başına ölçülen tur
+    'gecikme_ms': 5,                   # Sanal cihaz cevap gecikmesi
+    'satir_sayilari': [1_000_000],     # 10M/100M: --satir 10000000 100000000
+    'gecmis_cihaz': 50,                # Sentetik geçmişteki cihaz sayısı
+    'gecmis_aralik_sn': 2,             # Sentetik ölçümler arası süre (REFRESH_RATE)
+    'doldurma_paketi': 100_000,
+    'sorgu_tekrar': 200,
+    'yazma_satir': 20_000,
+}
+
+RAPOR = []
+
+def yaz(satir=""):
+    print(satir)
+    RAPOR.append(satir)
+
+def yuzdelik(sureler):
+    """Saniye listesi -> 'p50 / p95 / p99 / max' (ms)"""
+    ms = np.asarray(sureler) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return f"p50 {p50:8.2f} | p95 {p95:8.2f} | p99 {p99:8.2f} | max {ms.max():8.2f} ms"
+
+def db_sec(yol):
+    """veritabani modülünü verilen dosyaya yönlendirir ve şemayı kurar."""
+    veritabani.DB_NAME = yol
+    veritabani.init_db()
+
+def ornek_olcum(zaman=None):
+    return {'guc': random.randint(0, 3000), 'voltaj': random.uniform(218, 235),
+            'akim': random.uniform(0, 14), 'sicaklik': random.randint(15, 55),
+            'hata_kodu': 0, 'hata_kodu_193': 0, 'timestamp': zaman or datetime.now()}
+
+# --- 1. DÖNGÜ SÜRESİ ---
+def _port_bekle(port, zaman_asimi=15):
+    son = time.monotonic() + zaman_asimi
+    while time.monotonic() < son:
+        with socket.socket() as s:
+            if s.connect_ex((BENCH['ip'], port)) == 0:
+                return True
+        time.sleep(0.2)
+    return False
+
+def filo_baslat(cihaz_sayisi):
+    """sanal_inverter'ı alt süreçte açar; (süreç, gateway listesi) döner."""
+    gw_sayisi = min(BENCH['gateway_sayisi'], cihaz_sayisi)
+    port_basina = -(-cihaz_sayisi // gw_sayisi)
+    portlar = [BENCH['port'] + i for i in range(gw_sayisi)]
+    surec = subprocess.Popen(
+        [sys.executable, "sanal_inverter.py", "--portlar", *map(str, portlar),
+         "--cihaz", str(port_basina), "--ardisik-id", "--gecikme", str(BENCH['gecikme_ms']), "--sessiz"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not all(_port_bekle(p) for p in portlar):
+        surec.kill()
+        raise RuntimeError("Sanal inverter açılamadı")
+
+    gateways, kalan = [], cihaz_sayisi
+    for sira, port in enumerate(portlar):
+        adet = min(port_basina, kalan)
+        ilk = sira * port_basina + 1
+        gateways.append({'ip': BENCH['ip'], 'port': port,
+                         'slave_ids': list(range(ilk, ilk + adet)), 'seri_hat': True})
+        kalan -= adet
+    return surec, gateways
+
+async def _async_turlar(gateways, tur):
+    # Collector'ın çalıştırdığı yol: zamanlayıcı + gateway_planli_tara (hat bütçesi dahil).
+    # Her ölçülen turda tüm cihazların zamanı gelmiş sayılır (tam tur).
+    hatlar = [(gw, AsyncModbusTcpClient(gw['ip'], port=gw['port'], timeout=collector.CIHAZ_TIMEOUT),
+               asyncio.Lock() if gw.get('seri_hat', True) else None) for gw in gateways]
+    zaman = zamanlayici.Zamanlayici({collector.hat_adi(gw): gw['slave_ids'] for gw in gateways})
+    sureler, okunan = [], []
+    try:
+        # İlk tur ölçülmez: zamanlayıcı cihaz okuma sürelerini öğrenir (bütçe tahmini)
+        for i in range(tur + 1):
+            for d in zaman.cihazlar.values():
+                d.sonraki = 0.0
+            bas = time.perf_counter()
+            sonuc = await asyncio.gather(
+                *(collector.gateway_planli_tara(gw, c, k, zaman) for gw, c, k in hatlar))
+            if i == 0:
+                continue
+            sureler.append(time.perf_counter() - bas)
+            okunan.append(sum(data is not None for liste in sonuc for _, _, data in liste))
+    finally:
+        for _, client, _ in hatlar:
+            client.close()
+    return sureler, okunan
+
+def _senkron_tur(gateways):
+    # Zamanlayıcısız, tüm cihazların art arda okunduğu saf okuma süresi
+    bas = time.perf_counter()
+    okunan = 0
+    for gw in gateways:
+        client = ModbusTcpClient(gw['ip'], port=gw['port'], timeout=2.0)
+        for dev_id in gw['slave_ids']:
+            okunan += collector.read_device(client, dev_id) is not None
+        client.close()
+    return time.perf_counter() - bas, okunan
+
+def dongu_olc(cihaz_sayilari):
+    yaz("## Döngü süresi (Modbus okuma)")
+    yaz(f"   {BENCH['gecikme_ms']} ms cihaz gecikmesi, en fazla {BENCH['gateway_sayisi']} gateway, "
+        f"REFRESH_RATE {collector.REFRESH_RATE} sn")
+    for n in cihaz_sayilari:
+        surec, gateways = filo_baslat(n)
+        try:
+            sureler, okunan = asyncio.run(_async_turlar(gateways, BENCH['tur']))
+            senkron, s_okunan = _senkron_tur(gateways)
+        finally:
+            surec.kill()
+            surec.wait()
+        asiri = sum(s > collector.REFRESH_RATE for s in sureler)
+        yaz(f"   {n:5d} cihaz | async {yuzdelik(sureler)} | okunan {min(okunan)}/{n} | "
+            f"aşım {asiri}/{len(sureler)}")
+        yaz(f"   {'':5s}       | senkron tek tur {senkron * 1000:10.2f} ms | okunan {s_okunan}/{n}")
+    yaz()
+
+# --- 2. YAZMA HIZI ---
+def yazma_olc():
+    yaz("## Yazma hızı")
+    db_sec(os.path.join(BENCH['klasor'], "yazma.db"))
+    n = BENCH['yazma_satir']
+
+    adet = min(n, 2000)  # Tek satırlık yol bağlantı aç/kapa yaptığı için yavaş
+    bas = time.perf_counter()
+    for i in range(adet):
+        veritabani.veri_ekle(i % 50 + 1, ornek_olcum())
+    sure = time.perf_counter() - bas
+    yaz(f"   veri_ekle       : {adet / sure:10.0f} satır/sn ({adet} satır)")
+
+    paket = veritabani.TOPLU_YAZMA_BOYUTU
+    bas = time.perf_counter()
+    for i in range(0, n, paket):
+        veritabani.veri_ekle_toplu([(j % 50 + 1, ornek_olcum()) for j in range(i, min(i + paket, n))])
+    sure = time.perf_counter() - bas
+    yaz(f"   veri_ekle_toplu : {n / sure:10.0f} satır/sn ({paket} satırlık paketler)")
+
+    yazici = veritabani.VeriYazici().baslat()
+    bas = time.perf_counter()
+    for i in range(n):
+        yazici.ekle(i % 50 + 1, ornek_olcum())
+    yazici.durdur(zaman_asimi=600)
+    sure = time.perf_counter() - bas
+    yaz(f"   VeriYazici      : {yazici.yazilan / sure:10.0f} satır/sn (düşürülen {yazici.dusurulen})")
+    yaz()
+
+# --- 3. SENTETİK GEÇMİŞ VE SORGU SÜRESİ ---
+def gecmis_doldur(yol, satir):
+    """
+    Dosyayı `satir` ölçüme kadar doldurur (son_durum ve özetler dahil).
+    Ölçümler BENCH['gecmis_cihaz'] cihaza sırayla dağılır ve şimdiye kadar uzanır.
+    """
+    db_sec(yol)
+    conn = veritabani.baglanti_ac(yol)
+    mevcut = conn.execute("SELECT COALESCE(MAX(id), 0) FROM olcumler").fetchone()[0]
+    if mevcut >= satir:
+        conn.close()
+        return 0.0
+
+    cihaz = BENCH['gecmis_cihaz']
+    aralik = BENCH['gecmis_aralik_sn']
+    ilk = datetime.now() - timedelta(seconds=satir // cihaz * aralik)
+    if mevcut:
+        # Yarım kalmış doldurma kaldığı yerden, aynı zaman ekseninde devam eder
+        ilk = pd.Timestamp(conn.execute("SELECT zaman FROM olcumler ORDER BY id LIMIT 1").fetchone()[0])
+    bas = time.perf_counter()
+    try:
+        for i in range(mevcut, satir, BENCH['doldurma_paketi']):
+            idx = np.arange(i, min(i + BENCH['doldurma_paketi'], satir))
+            zaman = (pd.Timestamp(ilk) + pd.to_timedelta(idx // cihaz * aralik, unit='s')
+                     ).strftime('%Y-%m-%d %H:%M:%S.%f')
+            guc = np.random.randint(0, 3000, len(idx))
+            # Binde bir satırda alarm biti açık olsun
+            hata = np.where(np.random.random(len(idx)) < 0.001, 1 << np.random.randint(0, 24, len(idx)), 0)
+            satirlar = zip((idx % cihaz + 1).tolist(), zaman, guc.tolist(),
+                           np.random.uniform(218, 235, len(idx)).round(1).tolist(),
+                           (guc / 225).round(1).tolist(),
+                           np.random.randint(15, 55, len(idx)).tolist(),
+                           hata.tolist(), [0] * len(idx))
+            with conn:
+                veritabani.olcumleri_yaz(conn, list(satirlar))
+            print(f"   ... {idx[-1] + 1:,}/{satir:,}", end="\r")
+        print()
+    finally:
+        conn.close()
+    return time.perf_counter() - bas
+
+def _sure_olc(fonksiyon, tekrar):
+    sureler = []
+    for _ in range(tekrar):
+        bas = time.perf_counter()
+        fonksiyon()
+        sureler.append(time.perf_counter() - bas)
+    return sureler
+
+def sorgu_olc(satir_sayilari):
+    yaz("## Sorgu gecikmesi")
+    tekrar = BENCH['sorgu_tekrar']
+    cihaz = BENCH['gecmis_cihaz']
+    for satir in satir_sayilari:
+        yol = os.path.join(BENCH['klasor'], f"gecmis_{satir}.db")
+        doldurma = gecmis_doldur(yol, satir)
+        boyut = os.path.getsize(yol) / 1024 ** 2
+        yaz(f"   {satir:,} satır ({boyut:,.0f} MB"
+            + (f", doldurma {satir / doldurma:,.0f} satır/sn" if doldurma else "") + ")")
+
+        simdi = datetime.now()
+        sorgular = {
+            'tum_cihazlarin_son_durumu': lambda: veritabani.tum_cihazlarin_son_durumu(),
+            'son_verileri_getir(100)': lambda: veritabani.son_verileri_getir(random.randint(1, cihaz), 100),
+            'aralik_getir(1 saat)': lambda: veritabani.aralik_getir(
+                random.randint(1, cihaz), simdi - timedelta(hours=1), simdi),
+            'aralik_getir(7 gün)': lambda: veritabani.aralik_getir(
+                random.randint(1, cihaz), simdi - timedelta(days=7), simdi),
+            'son_kayit_id': lambda: veritabani.son_kayit_id(),
+        }
+        for ad, fonksiyon in sorgular.items():
+            yaz(f"     {ad:28s} {yuzdelik(_sure_olc(fonksiyon, tekrar))}")
+    yaz()
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="TCP_analiz performans ölçümü")
+    p.add_argument("--cihaz", type=int, nargs="*", default=BENCH['cihaz_sayilari'])
+    p.add_argument("--satir", type=int, nargs="*", default=BENCH['satir_sayilari'])
+    p.add_argument("--tur", type=int, default=BENCH['tur'])
+    p.add_argument("--atla", nargs="*", default=[], choices=['dongu', 'yazma', 'sorgu'])
+    a = p.parse_args()
+    BENCH['tur'] = a.tur
+    os.makedirs(BENCH['klasor'], exist_ok=True)
+
+    yaz(f"# TCP_analiz benchmark - {datetime.now():%Y-%m-%d %H:%M:%S}")
+    yaz()
+    if 'dongu' not in a.atla and a.cihaz:
+        dongu_olc(a.cihaz)
+    if 'yazma' not in a.atla:
+        yazma_olc()
+    if 'sorgu' not in a.atla and a.satir:
+        sorgu_olc(a.satir)
+
+    with open(BENCH['cikti'], "w", encoding="utf-8") as f:
+        f.write("\n".join(RAPOR) + "\n")
+    print(f"📄 Rapor: {BENCH['cikti']}")
@@ -1,7 +1,17 @@
+import sys
 import time
+import asyncio
 import logging
-from pymodbus.client import ModbusTcpClient
+from datetime import datetime
+from pymodbus.client import ModbusTcpClient, AsyncModbusTcpClient
 import veritabani
+import okuma_plani
+import anomali
+import bakim
+import alarm_kodlari
+import metrikler
+import zamanlayici
+import sikistirma
 
 # --- AYARLAR ---
 TARGET_IP = "10.35.14.10"
@@ -9,6 +19,23 @@ TARGET_PORT = 502
 REFRESH_RATE = 2  
 SLAVE_IDS = [1, 2, 3] 
 
+# Async mod (python collector.py --async): gateway'ler paralel taranır.
+# 'seri_hat': True -> arkası RS485 hattı, istekler sırayla gider (fiziksel zorunluluk)
+# 'seri_hat': False -> Modbus TCP cihaz/gateway, istekler aynı anda gönderilebilir
+# Ölçümler veritabanında slave_id ile tutulur: bir ID sadece BİR gateway'de olabilir.
+GATEWAYS = [
+    {'ip': TARGET_IP, 'port': TARGET_PORT, 'slave_ids': SLAVE_IDS, 'seri_hat': True},
+]
+CIHAZ_TIMEOUT = 1.0  # Tek bir Modbus isteğinin bekleme sınırı (sn)
+
+# Zamanlayıcı her TUR_SURESI'nde uyanır ve zamanı gelen cihazları okur.
+# Cihaz aralıkları zamanlayici.ZAMANLAMA'da (normal aralık = REFRESH_RATE).
+TUR_SURESI = 1.0
+# Senkron modda cihazlar arası bekleme (bazı RS485 gateway'leri istekler arası
+# boşluk ister). Cihazın ölçülen okuma süresine eklenir, hat bütçesine dahildir.
+CIHAZ_ARASI_BEKLEME = 0.0
+zamanlayici.ZAMANLAMA['normal'] = REFRESH_RATE
+
 # Okuma Ayarları
 CONFIG = {
     'start_addr': 70, 
@@ -18,92 +45,329 @@ CONFIG = {
         
         # Adres 193: 16-bit (1 Register) okunmalı (Senin ayarın)
         {'addr': 193, 'key': 'hata_kodu_193', 'count': 1} 
-    ]
+    ],
+    # Aralarında en fazla bu kadar boş register olan adresler tek istekte okunur.
+    # 115+ yapılırsa 70..193 tek istekte gelir (cihaz aradaki adresleri destekliyorsa)
+    'max_bosluk': 8
 }
 
-def read_device(client, slave_id):
+def config_alanlari(config=CONFIG):
+    """CONFIG'i okuma planlayıcısının alan listesine çevirir."""
+    bas = config['start_addr']
+    alanlar = [
+        {'key': 'guc', 'addr': bas, 'scale': 1.0, 'zorunlu': True},
+        {'key': 'voltaj', 'addr': bas + 1, 'scale': 0.1, 'zorunlu': True},
+        {'key': 'akim', 'addr': bas + 2, 'scale': 0.1, 'zorunlu': True},
+        {'key': 'sicaklik', 'addr': bas + 3, 'scale': 1.0, 'zorunlu': True},
+    ]
+    for reg in config['alarm_registers']:
+        alanlar.append({'key': reg['key'], 'addr': reg['addr'], 'count': reg.get('count', 2)})
+    return alanlar
+
+OKUMA_PLANI = okuma_plani.plan_olustur(config_alanlari(), max_bosluk=CONFIG['max_bosluk'])
+
+# Yavaş moddaki cihazlar için sadece alarm kelimeleri (189, 193).
+# Zorunlu işaretli: okunamazsa bitler 0 sanılıp sahte "bitti" olayı üretilmesin.
+ALARM_PLANI = okuma_plani.plan_olustur(
+    [dict(a, zorunlu=True) for a in config_alanlari() if a['key'] in alarm_kodlari.ALARM_REGISTERLARI],
+    max_bosluk=CONFIG['max_bosluk'])
+
+def plan_sec(tur):
+    return ALARM_PLANI if tur == zamanlayici.ALARM else OKUMA_PLANI
+
+def hat_adi(gateway):
+    return f"{gateway['ip']}:{gateway['port']}"
+
+def gateway_kontrol(gateways):
+    """
+    Aynı slave ID birden fazla gateway'de (ya da aynı listede iki kez) varsa
+    ValueError atar. olcumler, son_durum, özetler, sıkıştırıcı ve alarm
+    izleyicisi cihazı sadece slave_id ile tanır; çakışan ID'lerin verisi karışır.
+    """
+    goruldu = {}
+    cakisan = []
+    for gw in gateways:
+        for dev_id in gw['slave_ids']:
+            if dev_id in goruldu:
+                cakisan.append(f"ID {dev_id}: {goruldu[dev_id]} / {hat_adi(gw)}")
+            else:
+                goruldu[dev_id] = hat_adi(gw)
+    if cakisan:
+        raise ValueError("GATEWAYS içinde çakışan slave ID'ler (her ID tek gateway'de olmalı): "
+                         + "; ".join(cakisan))
+
+def _gateway_adi(client):
+    # Metrik etiketi: aynı slave ID farklı gateway'lerde tekrar edebilir
+    return f"{client.comm_params.host}:{client.comm_params.port}"
+
+def _istek_sonucu(rr, gateway):
+    if rr.isError():
+        metrikler.MODBUS_HATA.artir(tur="hata", gateway=gateway)
+    return rr
+
+def _olculu_istek(client, addr, count, slave_id, gateway):
+    """Senkron tek okuma isteği; süresi ve hatası metriklere yazılır."""
+    try:
+        with metrikler.sure_olc(metrikler.MODBUS_ISTEK, gateway=gateway):
+            rr = client.read_holding_registers(addr, count=count, slave=slave_id)
+    except Exception:
+        metrikler.MODBUS_HATA.artir(tur="baglanti", gateway=gateway)
+        raise
+    return _istek_sonucu(rr, gateway)
+
+def _cihaz_sonucu(veriler, slave_id, gateway, bas):
+    metrikler.CIHAZ_OKUMA.gozlemle(time.perf_counter() - bas, gateway=gateway, slave_id=slave_id)
+    if veriler is None:
+        metrikler.CIHAZ_CEVAPSIZ.artir(gateway=gateway, slave_id=slave_id)
+
+def read_device(client, slave_id, plan=OKUMA_PLANI):
+    gateway = _gateway_adi(client)
+    bas = time.perf_counter()
+    veriler = None
     try:
         if not client.connected: 
             client.connect()
             time.sleep(0.1)
-        
-        # 1. STANDART VERİLERİ OKU (Güç, Voltaj, Akım, Isı)
-        rr = client.read_holding_registers(CONFIG['start_addr'], count=4, slave=slave_id)
-        if rr.isError(): return None
-
-        veriler = {
-            "guc": rr.registers[0] * 1.0,
-            "voltaj": rr.registers[1] * 0.1,
-            "akim": rr.registers[2] * 0.1,
-            "sicaklik": rr.registers[3] * 1.0
-        }
-
-        # 2. ALARM REGİSTERLARINI OKU (Esnek Yapı: 189 ve 193)
-        for reg in CONFIG['alarm_registers']:
-            addr = reg['addr']
-            key = reg['key']
-            cnt = reg.get('count', 2) # Varsayılan 2, ama config'den 1 gelirse onu kullanır
-            
-            try:
-                time.sleep(0.05) # Hızlı sorgu çakışmasını önle
-                
-                # Dinamik count ile okuma
-                r_hata = client.read_holding_registers(addr, count=cnt, slave=slave_id)
-                
-                if not r_hata.isError():
-                    if cnt == 2:
-                        # 32-bit (2 Register) ise birleştir
-                        veriler[key] = (r_hata.registers[0] << 16) | r_hata.registers[1]
-                    else:
-                        # 16-bit (1 Register) ise direkt al
-                        veriler[key] = r_hata.registers[0]
-                else:
-                    veriler[key] = 0 # Okunamazsa 0 kabul et
-            except:
-                veriler[key] = 0 # Hata durumunda 0 kabul et
 
+        # Tüm register'lar (Güç, Voltaj, Akım, Isı, 189, 193) birleştirilmiş bloklarla okunur
+        veriler = okuma_plani.plani_oku(
+            lambda addr, cnt: _olculu_istek(client, addr, cnt, slave_id, gateway),
+            plan)
+        if veriler is None: return None
+
+        veriler["timestamp"] = datetime.now()
         return veriler
 
     except Exception as e:
         logging.error(f"ID {slave_id} Hata: {e}")
         client.close()
         return None
+    finally:
+        _cihaz_sonucu(veriler, slave_id, gateway, bas)
+
+def donguyu_kaydet(yazici, izleyici, dongu_verileri, alarm_verileri=()):
+    """
+    Turun ölçümlerini ve alarm bitlerindeki değişimleri yazıcı kuyruğuna bırakır.
+    alarm_verileri: sadece alarm register'ları okunan cihazlar (ölçüm satırı yazılmaz).
+    """
+    metrikler.OKUNAN_CIHAZ.ayarla(len(dongu_verileri))
+    yazici.ekle_toplu(dongu_verileri)
+    for dev_id, data in (*dongu_verileri, *alarm_verileri):
+        yazici.alarm_ekle(izleyici.guncelle(dev_id, data))
+
+def tur_ozeti(zaman, dongu_verileri, alarm_verileri, cevapsiz, elapsed, yazici):
+    modlar = ", ".join(f"{mod}: {adet}" for mod, adet in sorted(zaman.ozet().items()))
+    hatali = sorted({dev_id for dev_id, data in (*dongu_verileri, *alarm_verileri)
+                     if data.get('hata_kodu', 0) or data.get('hata_kodu_193', 0)})
+    return (f"📡 Tur: {len(dongu_verileri)} tam + {len(alarm_verileri)} alarm okuması | "
+            f"❌ Cevapsız: {cevapsiz or '-'} | ⚠️ Alarmlı: {hatali or '-'} | "
+            f"🗓️ {modlar} | 🗜️ %{yazici.sikistirici.oran() * 100:.0f} | ⏱️ {elapsed:.2f} sn")
+
+def dongu_olcumu(elapsed):
+    metrikler.DONGU_SURESI.gozlemle(elapsed)
+    if elapsed > REFRESH_RATE:
+        metrikler.DONGU_ASIMI.artir()
+
+# --- ASYNC MOD ---
+async def _hattaki_istek(client, addr, count, slave_id, gateway):
+    # Süre kilit alındıktan sonra başlar: hatta sıra beklemek cihaz süresine yazılmaz
+    try:
+        with metrikler.sure_olc(metrikler.MODBUS_ISTEK, gateway=gateway):
+            rr = await asyncio.wait_for(
+                client.read_holding_registers(addr, count=count, slave=slave_id), CIHAZ_TIMEOUT)
+    except asyncio.TimeoutError:
+        metrikler.MODBUS_HATA.artir(tur="timeout", gateway=gateway)
+        raise
+    except Exception:
+        metrikler.MODBUS_HATA.artir(tur="baglanti", gateway=gateway)
+        raise
+    return _istek_sonucu(rr, gateway)
+
+async def _istek(client, kilit, addr, count, slave_id):
+    """Tek okuma isteği. Seri hatta kilit alınır; timeout sadece hattaki süreyi sayar."""
+    gateway = _gateway_adi(client)
+    if kilit is None:
+        return await _hattaki_istek(client, addr, count, slave_id, gateway)
+    async with kilit:
+        return await _hattaki_istek(client, addr, count, slave_id, gateway)
+
+async def read_device_async(client, slave_id, kilit=None, plan=OKUMA_PLANI):
+    bas = time.perf_counter()
+    veriler = None
+    try:
+        # Zorunlu blok (telemetri) cevapsızsa alarm bloklarıyla hattı meşgul etmez
+        veriler = await okuma_plani.plani_oku_async(
+            lambda addr, cnt: _istek(client, kilit, addr, cnt, slave_id),
+            plan)
+        if veriler is None: return None
+
+        veriler["timestamp"] = datetime.now()
+        return veriler
+
+    except asyncio.TimeoutError:
+        logging.error(f"ID {slave_id} Hata: {CIHAZ_TIMEOUT} sn içinde cevap yok")
+        return None
+    except Exception as e:
+        logging.error(f"ID {slave_id} Hata: {e}")
+        return None
+    finally:
+        _cihaz_sonucu(veriler, slave_id, _gateway_adi(client), bas)
+
+async def gateway_planli_tara(gateway, client, kilit, zaman):
+    """
+    Zamanlayıcının bu tur seçtiği cihazları okur: [(slave_id, tur, data), ...]
+    Seri hatta okumalar zaten sırayla gittiği için tek tek beklenir; böylece
+    ölçülen süre kilit beklemesini değil hattaki gerçek süreyi gösterir.
+    """
+    hat = hat_adi(gateway)
+    secilen = zaman.siradakiler(hat, TUR_SURESI, seri_hat=kilit is not None)
+    if not secilen:
+        return []
+    if not client.connected:
+        if not await client.connect():
+            logging.error(f"Gateway {hat} bağlantı yok")
+            for dev_id, tur in secilen:
+                zaman.sonuc(hat, dev_id, tur, None, CIHAZ_TIMEOUT)
+            return [(dev_id, tur, None) for dev_id, tur in secilen]
+
+    async def oku(dev_id, tur):
+        bas = time.perf_counter()
+        data = await read_device_async(client, dev_id, kilit, plan_sec(tur))
+        zaman.sonuc(hat, dev_id, tur, data, time.perf_counter() - bas)
+        return dev_id, tur, data
+
+    if kilit is not None:
+        return [await oku(dev_id, tur) for dev_id, tur in secilen]
+    return await asyncio.gather(*(oku(dev_id, tur) for dev_id, tur in secilen))
+
+def sonuclari_ayir(sonuclar):
+    """[(slave_id, tur, data)] -> (tam okumalar, alarm okumaları, cevapsız ID'ler)"""
+    tam = [(dev_id, data) for dev_id, tur, data in sonuclar if data and tur == zamanlayici.TAM]
+    alarm = [(dev_id, data) for dev_id, tur, data in sonuclar if data and tur == zamanlayici.ALARM]
+    cevapsiz = [dev_id for dev_id, _, data in sonuclar if data is None]
+    return tam, alarm, cevapsiz
+
+async def toplama_dongusu(gateways, yazici, izleyici, etiket="ASYNC COLLECTOR"):
+    """Verilen gateway'leri zamanlayıcıyla sonsuza kadar okur, sonuçları yazici'ya bırakır."""
+    hatlar = []
+    for gw in gateways:
+        client = AsyncModbusTcpClient(gw['ip'], port=gw['port'], timeout=CIHAZ_TIMEOUT)
+        kilit = asyncio.Lock() if gw.get('seri_hat', True) else None
+        hatlar.append((gw, client, kilit))
+
+    zaman = zamanlayici.Zamanlayici({hat_adi(gw): gw['slave_ids'] for gw in gateways})
+
+    toplam_cihaz = sum(len(gw['slave_ids']) for gw in gateways)
+    print("-" * 50)
+    print(f"🚀 {etiket} BAŞLATILDI ({len(gateways)} gateway, {toplam_cihaz} cihaz)")
+    print("-" * 50)
+
+    try:
+        while True:
+            start_time = time.time()
+
+            # Gateway'ler birbirini beklemez; her hat kendi içinde sıralı
+            gw_sonuclari = await asyncio.gather(
+                *(gateway_planli_tara(gw, client, kilit, zaman) for gw, client, kilit in hatlar))
+            tam, alarm, cevapsiz = sonuclari_ayir([s for liste in gw_sonuclari for s in liste])
+            donguyu_kaydet(yazici, izleyici, tam, alarm)
+
+            elapsed = time.time() - start_time
+            if tam or alarm or cevapsiz:
+                dongu_olcumu(elapsed)
+                print(tur_ozeti(zaman, tam, alarm, cevapsiz, elapsed, yazici))
+
+            await asyncio.sleep(max(0, TUR_SURESI - elapsed))
+    finally:
+        for _, client, _ in hatlar:
+            client.close()
+
+async def start_collector_async():
+    gateway_kontrol(GATEWAYS)
+    veritabani.init_db()
+    metrikler.baslat()  # /metrics uç noktası (+ METRIK['tablo'] açıksa metrik_istatistik)
+    # Eşik altında kalan (değişmeyen) ölçümler kuyruğa girmez (sikistirma.py)
+    yazici = veritabani.VeriYazici(sikistirici=sikistirma.Sikistirici()).baslat()
+    izleyici = alarm_kodlari.AlarmIzleyici(veritabani.aktif_alarmlar())
+    bakim.bakim_baslat()  # Saklama/arşiv/vacuum, toplama durmadan arka planda
+    anomali.anomali_baslat()  # Filoya göre düşük verim / ısınma analizi (anomali.py)
+
+    try:
+        await toplama_dongusu(GATEWAYS, yazici, izleyici)
+    finally:
+        yazici.durdur()
 
 def start_collector():
     veritabani.init_db()
+    metrikler.baslat()  # /metrics uç noktası (+ METRIK['tablo'] açıksa metrik_istatistik)
+    # Kalıcı bağlantılı, kuyruklu yazıcı: disk gecikmesi döngüyü bekletmez
+    # Eşik altında kalan (değişmeyen) ölçümler kuyruğa girmez (sikistirma.py)
+    yazici = veritabani.VeriYazici(sikistirici=sikistirma.Sikistirici()).baslat()
+    izleyici = alarm_kodlari.AlarmIzleyici(veritabani.aktif_alarmlar())
+    bakim.bakim_baslat()  # Saklama/arşiv/vacuum, toplama durmadan arka planda
+    anomali.anomali_baslat()  # Filoya göre düşük verim / ısınma analizi (anomali.py)
     # Timeout süresini biraz uzun tutuyoruz (2.0 sn)
     client = ModbusTcpClient(TARGET_IP, port=TARGET_PORT, timeout=2.0)
     
+    hat = f"{TARGET_IP}:{TARGET_PORT}"
+    zaman = zamanlayici.Zamanlayici({hat: SLAVE_IDS})
+    
     print("-" * 50)
     print("🚀 COLLECTOR BAŞLATILDI (Dual Alarm Modu: 189[32bit] & 193[16bit])")
     print("-" * 50)
 
-    while True:
-        start_time = time.time()
-        for dev_id in SLAVE_IDS:
-            print(f"📡 ID {dev_id}...", end=" ")
-            time.sleep(0.5) # Cihazlar arası kısa bekleme
-            
-            data = read_device(client, dev_id)
-            if data:
-                veritabani.veri_ekle(dev_id, data)
+    try:
+        while True:
+            start_time = time.time()
+            dongu_verileri = []
+            alarm_verileri = []
+            for dev_id, tur in zaman.siradakiler(hat, TUR_SURESI):
+                print(f"📡 ID {dev_id}{' (alarm)' if tur == zamanlayici.ALARM else ''}...", end=" ")
+                bas = time.perf_counter()
+                time.sleep(CIHAZ_ARASI_BEKLEME)
+                data = read_device(client, dev_id, plan_sec(tur))
+                zaman.sonuc(hat, dev_id, tur, data, time.perf_counter() - bas)
+                if data:
+                    if tur == zamanlayici.ALARM:
+                        alarm_verileri.append((dev_id, data))
+                    else:
+                        dongu_verileri.append((dev_id, data))
                 
-                # Durum Mesajı Oluşturma
-                h189 = data.get('hata_kodu', 0)
-                h193 = data.get('hata_kodu_193', 0)
+                    # Durum Mesajı Oluşturma
+                    h189 = data.get('hata_kodu', 0)
+                    h193 = data.get('hata_kodu_193', 0)
                 
-                if h189 == 0 and h193 == 0:
-                    durum = "TEMİZ"
-                else:
-                    durum = f"⚠️ HATA (189:{h189}, 193:{h193})"
+                    if h189 == 0 and h193 == 0:
+                        durum = "TEMİZ"
+                    else:
+                        durum = f"⚠️ HATA (189:{h189}, 193:{h193})"
                 
-                print(f"✅ [OK] {durum}")
-            else:
-                print(f"❌ [YOK]")
+                    print(f"✅ [OK] {durum}")
+                else:
+                    print(f"❌ [YOK]")
+
+            # Turun tüm ölçümleri tek seferde kuyruğa (tek transaction ile diske)
+            donguyu_kaydet(yazici, izleyici, dongu_verileri, alarm_verileri)
         
-        elapsed = time.time() - start_time
-        time.sleep(max(0, REFRESH_RATE - elapsed))
+            elapsed = time.time() - start_time
+            if dongu_verileri or alarm_verileri:
+                dongu_olcumu(elapsed)
+            time.sleep(max(0, TUR_SURESI - elapsed))
+    finally:
+        # Kapanırken kuyrukta kalan ölçümleri diske yaz
+        yazici.durdur()
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.ERROR)
-    start_collector()
\ No newline at end of file
+    if "--kesif" in sys.argv:
+        # --async / --supervizor: cihaz listesi son ağ keşfinden (python kesif.py)
+        import kesif
+        GATEWAYS = kesif.gatewaylari() or GATEWAYS
+    if "--supervizor" in sys.argv:
+        # Gateway'ler ayrı süreçlerde, tek yazıcı süreci (supervizor.py)
+        import supervizor
+        supervizor.supervizor_calistir(GATEWAYS)
+    elif "--async" in sys.argv:
+        asyncio.run(start_collector_async())
+    else:
+        start_collector()
\ No newline at end of file
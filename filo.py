@@ -0,0 +1,121 @@
+"""
+Filo ısı haritası için cihaz × zaman matrisi (pages/filo_haritasi.py).
+
+Bir özet tablosunun (olcumler_1dk / olcumler_15dk) son MATRIS_KOVA kovası
+tüm cihazlar için NumPy matrislerinde tutulur:
+    guc[i, j]   -> cihazlar[i]'nin j. kovadaki zaman ağırlıklı ortalama gücü (yoksa NaN)
+    alarm[i, j] -> kovada 189/193 alarm biti var mı
+İlk güncellemede pencere tek sorguyla doldurulur. Sonrakilerde matris zaman
+kadar sola kaydırılır ve sadece değişmiş olabilecek son kovalar yeniden
+okunur (bir satırın süresi bir sonraki satır gelince, en geç tutma_suresi
+sn sonra, önceki kovalara işlenir). Bir pencereyi çizmek matrisin son
+sütunlarını almaktan ibarettir.
+"""
+import calendar
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import sikistirma
+import veritabani
+
+# Özet tablosu -> matriste tutulan kova sayısı (o çözünürlükteki en uzun pencere)
+MATRIS_KOVA = {
+    'olcumler_1dk': 6 * 60,     # 6 saat
+    'olcumler_15dk': 7 * 96,    # 7 gün
+}
+
+def kova_anahtari(zaman, saniye):
+    """Yerel saat -> özet tablolarındaki kova anahtarı (yerel saatin epoch sn'si, kova başı)."""
+    return calendar.timegm(zaman.timetuple()) // saniye * saniye
+
+class FiloMatrisi:
+    """
+    Tek özet tablosunun cihaz × kova matrisi. Streamlit'te st.cache_resource ile
+    oturumlar arasında paylaşılır; guncelle/pencere kilit altında çalışır.
+        m = FiloMatrisi('olcumler_15dk')
+        m.guncelle()
+        cihazlar, zamanlar, oran, alarm = m.pencere(96)   # son 24 saat
+    """
+
+    def __init__(self, tablo, kova_sayisi=None):
+        self.tablo = tablo
+        self.saniye = dict(veritabani.OZET_TABLOLARI)[tablo]
+        self.kova_sayisi = kova_sayisi or MATRIS_KOVA[tablo]
+        self.cihazlar = np.empty(0, dtype=np.int64)   # sıralı slave_id'ler (matris satırları)
+        self.guc = np.full((0, self.kova_sayisi), np.nan)
+        self.alarm = np.zeros((0, self.kova_sayisi), dtype=bool)
+        self.bas = None      # İlk sütunun kova anahtarı
+        self.son = None      # Son sütunun (içinde bulunulan kova) anahtarı
+        self._kilit = threading.Lock()
+
+    def _kaydir(self, bas):
+        kayma = (bas - self.bas) // self.saniye
+        if kayma >= self.kova_sayisi:
+            self.guc[:] = np.nan
+            self.alarm[:] = False
+        elif kayma > 0:
+            self.guc[:, :-kayma] = self.guc[:, kayma:]
+            self.guc[:, -kayma:] = np.nan
+            self.alarm[:, :-kayma] = self.alarm[:, kayma:]
+            self.alarm[:, -kayma:] = False
+        self.bas = bas
+
+    def _cihaz_ekle(self, ids):
+        yeni = np.setdiff1d(ids, self.cihazlar)
+        if not len(yeni):
+            return
+        cihazlar = np.union1d(self.cihazlar, yeni)
+        eski = np.searchsorted(cihazlar, self.cihazlar)
+        guc = np.full((len(cihazlar), self.kova_sayisi), np.nan)
+        alarm = np.zeros((len(cihazlar), self.kova_sayisi), dtype=bool)
+        guc[eski] = self.guc
+        alarm[eski] = self.alarm
+        self.cihazlar, self.guc, self.alarm = cihazlar, guc, alarm
+
+    def guncelle(self, simdi=None):
+        """Matrisi şimdiye getirir; okunan kova satırı sayısını döner."""
+        son = kova_anahtari(simdi or datetime.now(), self.saniye)
+        bas = son - (self.kova_sayisi - 1) * self.saniye
+        with self._kilit:
+            if self.bas is None:
+                sorgu_bas = bas
+                self.bas = bas
+            else:
+                geri = -(-sikistirma.SIKISTIRMA['tutma_suresi'] // self.saniye)
+                sorgu_bas = max(bas, self.son - geri * self.saniye)
+                self._kaydir(bas)
+            self.son = son
+
+            rows = veritabani.filo_ozet_getir(self.tablo, sorgu_bas, son)
+            ilk = (sorgu_bas - bas) // self.saniye
+            self.guc[:, ilk:] = np.nan
+            self.alarm[:, ilk:] = False
+            if not rows:
+                return 0
+            ids, zamanlar, guc, alarm = (np.array(s) for s in zip(*rows))
+            self._cihaz_ekle(np.unique(ids))
+            satir = np.searchsorted(self.cihazlar, ids)
+            sutun = (zamanlar - bas) // self.saniye
+            self.guc[satir, sutun] = np.array(guc, dtype=float)
+            self.alarm[satir, sutun] = alarm.astype(bool)
+            return len(rows)
+
+    def pencere(self, kova_sayisi):
+        """
+        Son kova_sayisi kova: (cihazlar, zamanlar, oran, alarm). oran her kovada
+        cihaz gücünün aynı kovadaki filo en yükseğine oranıdır (0..1); veri
+        yoksa ya da filonun tamamı 0 üretiyorsa NaN.
+        """
+        kova_sayisi = min(kova_sayisi, self.kova_sayisi)
+        with self._kilit:
+            if self.bas is None:
+                return self.cihazlar, pd.DatetimeIndex([]), self.guc[:, :0], self.alarm[:, :0]
+            guc = self.guc[:, -kova_sayisi:].copy()
+            alarm = self.alarm[:, -kova_sayisi:].copy()
+            cihazlar = self.cihazlar.copy()
+            son = self.son
+        zamanlar = pd.to_datetime(np.arange(son - (kova_sayisi - 1) * self.saniye, son + 1, self.saniye), unit='s')
+        tepe = np.fmax.reduce(guc, axis=0) if len(cihazlar) else np.full(kova_sayisi, np.nan)
+        oran = np.divide(guc, tepe, out=np.full_like(guc, np.nan), where=tepe > 0)
+        return cihazlar, zamanlar, oran, alarm
@@ -0,0 +1,178 @@
+"""
+Modbus ağ keşfi: gateway'lerin arkasında cevap veren slave ID'leri bulur.
+
+    python kesif.py                                 -> collector.GATEWAYS'teki gateway'ler
+    python kesif.py 10.35.14.10:502 10.35.14.11:502 --paralel
+    python kesif.py --liste                         -> son keşif (tarama yapmadan)
+    python collector.py --async --kesif             -> GATEWAYS son keşiften gelir
+
+- Her gateway'de 1..247 aralığı taranır; gateway'ler birbirini beklemez.
+- Hat başına eşzamanlılık sınırlıdır: seri hat (RS485) gateway'inde tek
+  bağlantı, istekler sırayla; Modbus TCP'de KESIF['tcp_baglanti'] ayrı
+  bağlantı (pymodbus tek bağlantıdaki istekleri zaten sıraya koyar).
+- Cevap veren ID register haritasıyla yoklanır (parmak izi): collector'ın
+  telemetri bloğu (70-73), alarm kelimeleri (189, 193) ve eski test haritası
+  (0-4). Telemetri bloğu okunabilen cihaz "uyumlu" sayılır.
+- Sonuç veritabanındaki kesif tablosuna yazılır; gatewaylari() son keşiften
+  collector.GATEWAYS biçiminde liste üretir.
+"""
+import time
+import asyncio
+import logging
+import argparse
+from pymodbus.client import AsyncModbusTcpClient
+import veritabani
+import collector
+
+# --- KEŞİF AYARLARI ---
+KESIF = {
+    'id_araligi': range(1, 248),   # Modbus'ta geçerli slave ID'ler
+    'timeout': 0.3,                # Tek yoklama isteğinin bekleme sınırı (sn)
+    'tcp_baglanti': 4,             # Modbus TCP gateway'ine aynı anda açılan bağlantı
+}
+
+# Gateway "hedefe yol yok" / "hedef cevap vermedi" istisnaları: o ID'de cihaz yok
+CIHAZ_YOK_KODLARI = (0x0A, 0x0B)
+
+def yoklamalar(config=None):
+    """Parmak izi için okunan bloklar: [(ad, adres, register sayısı), ...] (ilki varlık yoklaması)"""
+    config = config or collector.CONFIG
+    bloklar = [('telemetri', config['start_addr'], 4)]
+    bloklar += [(r['key'], r['addr'], r.get('count', 2)) for r in config['alarm_registers']]
+    bloklar.append(('eski_harita', 0, 5))   # sanal_inverter'ın eski test haritası (3: toplam üretim)
+    return bloklar
+
+async def _yokla(client, slave_id, addr, count):
+    """True: okundu, False: cihaz var ama bu adresleri tanımıyor, None: cevap yok"""
+    try:
+        rr = await asyncio.wait_for(
+            client.read_holding_registers(addr, count=count, slave=slave_id), KESIF['timeout'] * 2)
+    except Exception:
+        return None
+    if not rr.isError():
+        return True
+    if getattr(rr, 'exception_code', None) in CIHAZ_YOK_KODLARI:
+        return None
+    return False
+
+async def cihaz_yokla(client, slave_id, bloklar):
+    """Cihaz cevap veriyorsa {'slave_id', 'uyumlu', 'parmak_izi'}, vermiyorsa None."""
+    ad, addr, count = bloklar[0]
+    ilk = await _yokla(client, slave_id, addr, count)
+    if ilk is None:
+        return None
+    cevaplar = [ad] if ilk else []
+    for ad, addr, count in bloklar[1:]:
+        if await _yokla(client, slave_id, addr, count):
+            cevaplar.append(ad)
+    return {'slave_id': slave_id, 'uyumlu': bool(ilk), 'parmak_izi': ",".join(cevaplar)}
+
+async def gateway_tara(gateway, id_araligi=None, bloklar=None):
+    """
+    Tek gateway'in ID aralığını tarar. Bulunan cihazlar listesi ya da
+    gateway'e hiç bağlanılamadıysa None döner.
+    """
+    id_araligi = id_araligi or KESIF['id_araligi']
+    bloklar = bloklar or yoklamalar()
+    hat = collector.hat_adi(gateway)
+    baglanti = 1 if gateway.get('seri_hat', True) else KESIF['tcp_baglanti']
+    siradaki = iter(id_araligi)   # Bağlantılar ortak sıradan ID çeker
+    bulunanlar = []
+    baglanan = 0
+
+    async def isci():
+        nonlocal baglanan
+        client = AsyncModbusTcpClient(gateway['ip'], port=gateway['port'],
+                                      timeout=KESIF['timeout'], retries=0)
+        try:
+            if not await client.connect():
+                return
+            baglanan += 1
+            for slave_id in siradaki:
+                # pymodbus art arda cevapsız isteklerden sonra bağlantıyı kapatır
+                if not client.connected:
+                    await client.connect()
+                cihaz = await cihaz_yokla(client, slave_id, bloklar)
+                if cihaz:
+                    print(f"[+] {hat} ID {slave_id}: {cihaz['parmak_izi'] or 'harita tanınmadı'}"
+                          f"{'' if cihaz['uyumlu'] else ' (uyumsuz)'}")
+                    bulunanlar.append(cihaz)
+        finally:
+            client.close()
+
+    await asyncio.gather(*(isci() for _ in range(baglanti)))
+    if not baglanan:
+        logging.error(f"Gateway {hat} bağlantı yok")
+        return None
+    return sorted(bulunanlar, key=lambda c: c['slave_id'])
+
+async def tara(gateways, id_araligi=None):
+    """Tüm gateway'ler paralel: {hat: [cihaz, ...] ya da None}"""
+    sonuclar = await asyncio.gather(*(gateway_tara(gw, id_araligi) for gw in gateways))
+    return {collector.hat_adi(gw): s for gw, s in zip(gateways, sonuclar)}
+
+def kesfet(gateways=None, id_araligi=None):
+    """Tarar ve sonucu kesif tablosuna yazar (bağlanılamayan gateway'in eski kaydı korunur)."""
+    gateways = gateways or collector.GATEWAYS
+    id_araligi = id_araligi or KESIF['id_araligi']
+    veritabani.init_db()
+    sonuclar = asyncio.run(tara(gateways, id_araligi))
+    for gw in gateways:
+        cihazlar = sonuclar[collector.hat_adi(gw)]
+        if cihazlar is not None:
+            veritabani.kesif_yaz(gw, id_araligi, cihazlar)
+    return sonuclar
+
+def gatewaylari(sadece_uyumlu=True):
+    """Son keşiften collector.GATEWAYS biçiminde liste (cihazı olmayan gateway atlanır)."""
+    veritabani.init_db()
+    gateways = {}
+    for ip, port, slave_id, seri_hat, uyumlu, _, _ in veritabani.kesif_getir():
+        if sadece_uyumlu and not uyumlu:
+            continue
+        gw = gateways.setdefault((ip, port), {'ip': ip, 'port': port, 'slave_ids': [], 'seri_hat': bool(seri_hat)})
+        gw['slave_ids'].append(slave_id)
+    return list(gateways.values())
+
+def _gateway_coz(metin, seri_hat):
+    ip, _, port = metin.partition(":")
+    return {'ip': ip, 'port': int(port or 502), 'seri_hat': seri_hat}
+
+def gatewaylari_yazdir():
+    gateways = gatewaylari()
+    print("-" * 50)
+    if not gateways:
+        print("[SONUC] Keşif tablosunda uyumlu cihaz yok.")
+        return
+    print(f"[SONUC] {sum(len(gw['slave_ids']) for gw in gateways)} uyumlu cihaz. collector.GATEWAYS:")
+    for gw in gateways:
+        print(f"    {gw},")
+    try:
+        collector.gateway_kontrol(gateways)
+    except ValueError as e:
+        print(f"⚠️ {e}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    # Cevapsız ID'ler pymodbus'ta hata olarak loglanır; taramada beklenen durum
+    logging.getLogger("pymodbus").setLevel(logging.CRITICAL)
+    p = argparse.ArgumentParser(description="Modbus ağ keşfi")
+    p.add_argument("gateway", nargs="*", help="ip[:port] (varsayılan: collector.GATEWAYS)")
+    p.add_argument("--paralel", action="store_true", help="Verilen gateway'ler Modbus TCP (seri hat değil)")
+    p.add_argument("--ilk", type=int, default=KESIF['id_araligi'].start)
+    p.add_argument("--son", type=int, default=KESIF['id_araligi'].stop - 1)
+    p.add_argument("--timeout", type=float, default=KESIF['timeout'], help="sn")
+    p.add_argument("--baglanti", type=int, default=KESIF['tcp_baglanti'], help="TCP gateway başına bağlantı")
+    p.add_argument("--liste", action="store_true", help="Taramadan son keşfi göster")
+    a = p.parse_args()
+    KESIF.update({'timeout': a.timeout, 'tcp_baglanti': a.baglanti})
+
+    if not a.liste:
+        gateways = [_gateway_coz(g, not a.paralel) for g in a.gateway] or None
+        print(f"[*] Modbus ağı taranıyor (ID {a.ilk}-{a.son})...")
+        bas = time.perf_counter()
+        sonuclar = kesfet(gateways, range(a.ilk, a.son + 1))
+        for hat, cihazlar in sonuclar.items():
+            print(f"📡 {hat}: " + ("bağlantı yok" if cihazlar is None else f"{len(cihazlar)} cihaz"))
+        print(f"⏱️ {time.perf_counter() - bas:.1f} sn")
+    gatewaylari_yazdir()
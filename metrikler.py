@@ -0,0 +1,243 @@
+"""
+Collector zamanlama ölçümleri ve Prometheus uyumlu /metrics uç noktası.
+
+Sayac, Gosterge ve Histogram nesneleri modül seviyesinde tanımlıdır;
+collector.py ve veritabani.py ölçümleri buraya bırakır. Her şey bellekte
+toplanır, istek başına maliyet bir kilit + birkaç toplama işlemidir.
+
+    metrikler.sunucu_baslat()              -> http://0.0.0.0:9108/metrics
+    with metrikler.sure_olc(MODBUS_ISTEK, gateway="10.0.0.5:502"): ...
+
+METRIK['tablo'] açılırsa (varsayılan kapalı) özetler periyodik olarak
+veritabanındaki metrik_istatistik tablosuna da yazılır (Prometheus olmayan
+kurulumlar için). Maliyeti: her tablo_araligi sn'de metrik/etiket kümesi başına
+bir satır; bakim.py SAKLAMA['metrik_gun'] sonra siler.
+"""
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- AYARLAR ---
+METRIK = {
+    'port': 9108,            # 0: HTTP uç noktasını açma
+    'adres': '0.0.0.0',
+    'tablo': False,          # Özetleri metrik_istatistik tablosuna da yaz (aralık başına metrik/etiket × 1 satır)
+    'tablo_araligi': 60,     # ... kaç saniyede bir (sn)
+}
+
+# Modbus cevapları ms, tur süreleri saniyeler mertebesinde
+SURE_KOVALARI = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+_KAYIT = []
+
+def _etiket_metni(etiketler):
+    if not etiketler:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in etiketler) + "}"
+
+class _Metrik:
+    tur = None
+
+    def __init__(self, ad, aciklama):
+        self.ad = ad
+        self.aciklama = aciklama
+        self._kilit = threading.Lock()
+        self._seriler = {}
+        _KAYIT.append(self)
+
+    @staticmethod
+    def _anahtar(etiketler):
+        return tuple(sorted((k, str(v)) for k, v in etiketler.items()))
+
+    def metin(self):
+        satirlar = [f"# HELP {self.ad} {self.aciklama}", f"# TYPE {self.ad} {self.tur}"]
+        with self._kilit:
+            for anahtar, deger in sorted(self._seriler.items()):
+                satirlar.append(f"{self.ad}{_etiket_metni(anahtar)} {deger:g}")
+        return satirlar
+
+    def ozet(self):
+        """[(etiketler, adet, toplam)] - metrik_istatistik tablosu için"""
+        with self._kilit:
+            return [(anahtar, None, deger) for anahtar, deger in self._seriler.items()]
+
+class Sayac(_Metrik):
+    """Sadece artan sayaç (timeout sayısı, yazılan satır ...)."""
+    tur = "counter"
+
+    def artir(self, miktar=1, **etiketler):
+        anahtar = self._anahtar(etiketler)
+        with self._kilit:
+            self._seriler[anahtar] = self._seriler.get(anahtar, 0) + miktar
+
+class Gosterge(_Metrik):
+    """Anlık değer (kuyruk doluluğu, son turda okunan cihaz ...)."""
+    tur = "gauge"
+
+    def ayarla(self, deger, **etiketler):
+        with self._kilit:
+            self._seriler[self._anahtar(etiketler)] = deger
+
+class Histogram(_Metrik):
+    """Süre dağılımı; Prometheus'taki gibi birikimli kovalar + toplam + adet."""
+    tur = "histogram"
+
+    def __init__(self, ad, aciklama, kovalar=SURE_KOVALARI):
+        super().__init__(ad, aciklama)
+        self.kovalar = tuple(kovalar)
+
+    def gozlemle(self, deger, **etiketler):
+        anahtar = self._anahtar(etiketler)
+        with self._kilit:
+            seri = self._seriler.get(anahtar)
+            if seri is None:
+                # [kova sayıları..., +Inf], toplam
+                seri = self._seriler[anahtar] = [[0] * (len(self.kovalar) + 1), 0.0]
+            seri[0][bisect.bisect_left(self.kovalar, deger)] += 1
+            seri[1] += deger
+
+    def metin(self):
+        satirlar = [f"# HELP {self.ad} {self.aciklama}", f"# TYPE {self.ad} {self.tur}"]
+        with self._kilit:
+            for anahtar, (sayilar, toplam) in sorted(self._seriler.items()):
+                birikimli = 0
+                for sinir, adet in zip((*self.kovalar, "+Inf"), sayilar):
+                    birikimli += adet
+                    le = sinir if sinir == "+Inf" else f"{sinir:g}"
+                    satirlar.append(f"{self.ad}_bucket{_etiket_metni((*anahtar, ('le', le)))} {birikimli}")
+                satirlar.append(f"{self.ad}_sum{_etiket_metni(anahtar)} {toplam:g}")
+                satirlar.append(f"{self.ad}_count{_etiket_metni(anahtar)} {birikimli}")
+        return satirlar
+
+    def ozet(self):
+        with self._kilit:
+            return [(anahtar, sum(sayilar), toplam) for anahtar, (sayilar, toplam) in self._seriler.items()]
+
+@contextmanager
+def sure_olc(histogram, **etiketler):
+    """with bloğunun süresini (hata olsa da) histograma ekler."""
+    bas = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.gozlemle(time.perf_counter() - bas, **etiketler)
+
+# --- TANIMLI METRİKLER ---
+MODBUS_ISTEK = Histogram("tcp_analiz_modbus_istek_saniye",
+                         "Tek read_holding_registers isteginin suresi")
+MODBUS_HATA = Sayac("tcp_analiz_modbus_hata_total",
+                    "Basarisiz Modbus istekleri (tur: timeout, hata, baglanti)")
+CIHAZ_OKUMA = Histogram("tcp_analiz_cihaz_okuma_saniye",
+                        "Bir cihazin tum bloklarinin okunma suresi")
+CIHAZ_CEVAPSIZ = Sayac("tcp_analiz_cihaz_cevapsiz_total",
+                       "Zorunlu register'lari okunamayan cihaz okumalari")
+DONGU_SURESI = Histogram("tcp_analiz_dongu_saniye",
+                         "Tum cihazlarin okundugu bir turun suresi")
+DONGU_ASIMI = Sayac("tcp_analiz_dongu_asimi_total",
+                    "REFRESH_RATE'i asan turlar")
+OKUNAN_CIHAZ = Gosterge("tcp_analiz_okunan_cihaz",
+                        "Son turda basariyla okunan cihaz sayisi")
+DB_YAZMA = Histogram("tcp_analiz_db_yazma_saniye",
+                     "VeriYazici paketinin (tek transaction) commit suresi")
+DB_SATIR = Sayac("tcp_analiz_db_yazilan_satir_total",
+                 "Diske yazilan olcum satirlari")
+DB_DUSEN = Sayac("tcp_analiz_db_dusurulen_satir_total",
+                 "Kuyruk dolu ya da yazma hatasi nedeniyle dusurulen olcumler")
+DB_ATLANAN = Sayac("tcp_analiz_db_sikistirilan_satir_total",
+                   "Deadband esigi altinda kaldigi icin yazilmayan olcumler")
+YAZICI_HATA = Sayac("tcp_analiz_yazici_hata_total",
+                    "VeriYazici baglanti acma / yazma hatalari (tur: baglanti, yazma)")
+YAZICI_CALISIYOR = Gosterge("tcp_analiz_yazici_calisiyor",
+                            "VeriYazici is parcacigi ayakta mi (1/0)")
+TAMPON = Gosterge("tcp_analiz_tampon_kayit",
+                  "Tasma tamponunda veritabanina geri yazilmayi bekleyen kayit")
+KUYRUK = Gosterge("tcp_analiz_yazici_kuyruk",
+                  "VeriYazici kuyrugunda bekleyen kayit sayisi")
+
+def metin():
+    """Tüm metriklerin Prometheus text formatındaki hali."""
+    satirlar = []
+    for metrik in _KAYIT:
+        satirlar.extend(metrik.metin())
+    return "\n".join(satirlar) + "\n"
+
+# --- HTTP UÇ NOKTASI ---
+class _MetrikIstegi(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        govde = metin().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(govde)))
+        self.end_headers()
+        self.wfile.write(govde)
+
+    def log_message(self, format, *args):
+        pass  # Her scrape'i konsola basma
+
+def sunucu_baslat(port=None, adres=None):
+    """/metrics uç noktasını arka plan iş parçacığında açar. Port 0 ise açmaz."""
+    port = METRIK['port'] if port is None else port
+    if not port:
+        return None
+    try:
+        sunucu = ThreadingHTTPServer((adres or METRIK['adres'], port), _MetrikIstegi)
+    except OSError as e:
+        logging.error(f"Metrik sunucusu açılamadı ({port}): {e}")
+        return None
+    sunucu.daemon_threads = True
+    threading.Thread(target=sunucu.serve_forever, name="Metrikler", daemon=True).start()
+    print(f"📈 Metrikler: http://{adres or METRIK['adres']}:{port}/metrics")
+    return sunucu
+
+# --- İSTATİSTİK TABLOSU ---
+# Cihaz bazlı seriler tabloya gateway toplamı olarak yazılır (yüzlerce cihazda
+# her turda yüzlerce satır olmasın); cihaz ayrıntısı sadece /metrics'te.
+TABLODA_OLMAYAN_ETIKETLER = ('slave_id',)
+
+def istatistik_satirlari(zaman):
+    """metrik_istatistik tablosuna yazılacak (zaman, ad, etiketler, adet, toplam) satırları."""
+    satirlar = []
+    for metrik in _KAYIT:
+        toplamlar = {}
+        for anahtar, adet, toplam in metrik.ozet():
+            anahtar = tuple((k, v) for k, v in anahtar if k not in TABLODA_OLMAYAN_ETIKETLER)
+            onceki = toplamlar.get(anahtar)
+            if onceki is not None:
+                adet = None if adet is None else onceki[0] + adet
+                toplam = onceki[1] + toplam
+            toplamlar[anahtar] = (adet, toplam)
+        for anahtar, (adet, toplam) in toplamlar.items():
+            etiketler = ",".join(f"{k}={v}" for k, v in anahtar)
+            satirlar.append((zaman, metrik.ad, etiketler, adet, toplam))
+    return satirlar
+
+def istatistik_kaydet_baslat(aralik=None):
+    """Metrik özetlerini periyodik olarak veritabanına yazan iş parçacığını başlatır."""
+    import veritabani  # veritabani de bu modülü kullandığı için döngüsel import olmasın
+
+    aralik = aralik or METRIK['tablo_araligi']
+
+    def _dongu():
+        while True:
+            time.sleep(aralik)
+            try:
+                veritabani.metrik_istatistik_yaz(
+                    istatistik_satirlari(time.strftime('%Y-%m-%d %H:%M:%S')))
+            except Exception as e:
+                logging.error(f"Metrik istatistik yazma hatası: {e}")
+
+    is_parcacigi = threading.Thread(target=_dongu, name="MetrikTablosu", daemon=True)
+    is_parcacigi.start()
+    return is_parcacigi
+
+def baslat():
+    """Collector için: HTTP uç noktası + (ayarlıysa) istatistik tablosu."""
+    sunucu_baslat()
+    if METRIK['tablo']:
+        istatistik_kaydet_baslat()
@@ -0,0 +1,122 @@
+"""
+Modbus okuma planlayıcısı.
+
+Register haritasındaki alanları (güç, voltaj, alarm kelimeleri...) adres
+sırasına dizer; bitişik ya da birbirine yakın olanları 125 register sınırını
+aşmadan tek bir read_holding_registers isteğinde birleştirir. Böylece her
+cihaz için 3-6 ayrı istek yerine 1-2 istek gider.
+
+Alan tanımı (sözlük):
+    key      : Sonuç sözlüğündeki ad ('guc', 'hata_kodu' ...)
+    addr     : Başlangıç adresi
+    count    : 1 (16-bit) ya da 2 (32-bit, yüksek kelime önce). Varsayılan 1
+    scale    : Varsa ham değer bu çarpanla çarpılır
+    zorunlu  : True ise okunamadığında cihaz "cevap yok" sayılır
+"""
+
+MAX_BLOK = 125          # FC03 tek istekte okunabilecek en fazla register
+VARSAYILAN_BOSLUK = 8   # Arada bu kadar kullanılmayan register varsa yine birleştir
+
+ADRES_HATASI = 2        # Modbus exception: ILLEGAL DATA ADDRESS
+
+def plan_olustur(alanlar, max_bosluk=VARSAYILAN_BOSLUK, max_blok=MAX_BLOK):
+    """
+    Alanları en az sayıda okuma bloğuna böler.
+    Dönüş: [{'addr': .., 'count': .., 'alanlar': [...]}, ...]
+    Zorunlu alan içeren bloklar listenin başına konur; cevap vermeyen cihaz
+    için diğer bloklar hiç istenmez.
+    """
+    bloklar = []
+    for alan in sorted(alanlar, key=lambda a: a['addr']):
+        bitis = alan['addr'] + alan.get('count', 1)
+        if bloklar:
+            blok = bloklar[-1]
+            blok_sonu = blok['addr'] + blok['count']
+            if (alan['addr'] - blok_sonu <= max_bosluk
+                    and max(bitis, blok_sonu) - blok['addr'] <= max_blok):
+                blok['count'] = max(bitis, blok_sonu) - blok['addr']
+                blok['alanlar'].append(alan)
+                continue
+        bloklar.append({'addr': alan['addr'], 'count': bitis - alan['addr'], 'alanlar': [alan]})
+
+    bloklar.sort(key=lambda b: not blok_zorunlu_mu(b))
+    return bloklar
+
+def blok_zorunlu_mu(blok):
+    return any(a.get('zorunlu') for a in blok['alanlar'])
+
+def alan_coz(alan, registers):
+    """Tek alanın değerini (32/16-bit birleştirme + çarpan) hesaplar."""
+    if alan.get('count', 1) == 2:
+        deger = (registers[0] << 16) | registers[1]
+    else:
+        deger = registers[0]
+    if 'scale' in alan:
+        deger = deger * alan['scale']
+    return deger
+
+def blok_coz(blok, registers):
+    """Bir bloğun register listesini alan sözlüğüne çevirir."""
+    sonuc = {}
+    for alan in blok['alanlar']:
+        ofset = alan['addr'] - blok['addr']
+        sonuc[alan['key']] = alan_coz(alan, registers[ofset:ofset + alan.get('count', 1)])
+    return sonuc
+
+def _adres_hatasi_mi(rr):
+    # Birleştirilen aralıkta cihazın tanımadığı register varsa
+    # tek tek okumaya geri dönülür
+    return getattr(rr, 'exception_code', None) == ADRES_HATASI
+
+def _zorunlu_eksik(blok, degerler):
+    return any(a.get('zorunlu') and a['key'] not in degerler for a in blok['alanlar'])
+
+def _sonuclandir(plan, degerler):
+    # Okunamayan zorunlu olmayan alanlar (alarm kelimeleri vb.) 0 kabul edilir
+    for blok in plan:
+        for alan in blok['alanlar']:
+            degerler.setdefault(alan['key'], 0)
+    return degerler
+
+def plani_oku(oku, plan):
+    """
+    Planı senkron istemciyle okur.
+    oku(addr, count) -> pymodbus cevabı  (örn. lambda a, c: client.read_holding_registers(a, count=c, slave=id))
+    Dönüş: {key: değer} ya da zorunlu alan okunamadıysa None
+    Zorunlu bloktaki istisnalar (timeout, bağlantı) çağırana iletilir.
+    """
+    degerler = {}
+    for blok in plan:
+        try:
+            rr = oku(blok['addr'], blok['count'])
+            if not rr.isError():
+                degerler.update(blok_coz(blok, rr.registers))
+            elif _adres_hatasi_mi(rr) and len(blok['alanlar']) > 1:
+                for alan in blok['alanlar']:
+                    r_alan = oku(alan['addr'], alan.get('count', 1))
+                    if not r_alan.isError():
+                        degerler[alan['key']] = alan_coz(alan, r_alan.registers)
+        except Exception:
+            if blok_zorunlu_mu(blok): raise
+        if _zorunlu_eksik(blok, degerler):
+            return None
+    return _sonuclandir(plan, degerler)
+
+async def plani_oku_async(oku, plan):
+    """plani_oku'nun async karşılığı; oku(addr, count) bir coroutine döner."""
+    degerler = {}
+    for blok in plan:
+        try:
+            rr = await oku(blok['addr'], blok['count'])
+            if not rr.isError():
+                degerler.update(blok_coz(blok, rr.registers))
+            elif _adres_hatasi_mi(rr) and len(blok['alanlar']) > 1:
+                for alan in blok['alanlar']:
+                    r_alan = await oku(alan['addr'], alan.get('count', 1))
+                    if not r_alan.isError():
+                        degerler[alan['key']] = alan_coz(alan, r_alan.registers)
+        except Exception:
+            if blok_zorunlu_mu(blok): raise
+        if _zorunlu_eksik(blok, degerler):
+            return None
+    return _sonuclandir(plan, degerler)
@@ -0,0 +1,78 @@
+import streamlit as st
+import pandas as pd
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Üst dizindeki modülleri (veritabani.py) görebilmesi için yol ayarı
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import veritabani
+import alarm_kodlari
+
+st.set_page_config(page_title="Alarm Geçmişi", page_icon="📜", layout="wide")
+
+st.title("📜 Alarm Geçmişi")
+st.markdown("Tüm filoda arızaların başlangıç/bitiş olayları, süreleri ve sıklıkları.")
+
+# --- FİLTRELER ---
+son_durum = pd.DataFrame(veritabani.tum_cihazlarin_son_durumu(),
+                         columns=["slave_id", "zaman", "guc", "voltaj", "akim", "sicaklik",
+                                  "hata_kodu", "hata_kodu_193"])
+cihazlar = son_durum["slave_id"].tolist()
+
+col_tarih, col_cihaz = st.columns([1, 2])
+with col_tarih:
+    bugun = datetime.now().date()
+    tarih_araligi = st.date_input("Tarih Aralığı", value=(bugun - timedelta(days=7), bugun))
+with col_cihaz:
+    secili_cihazlar = st.multiselect("Cihazlar (boş: tümü)", cihazlar)
+
+if not isinstance(tarih_araligi, (list, tuple)) or len(tarih_araligi) != 2:
+    st.info("Başlangıç ve bitiş tarihini seçin.")
+    st.stop()
+
+# --- SON ÖLÇÜMDEKİ ARIZALAR (son_durum: cihaz başına tek satır, bitler tek seferde açılır) ---
+if secili_cihazlar:
+    son_durum = son_durum[son_durum["slave_id"].isin(secili_cihazlar)]
+son_durum["zaman"] = pd.to_datetime(son_durum["zaman"], format="ISO8601")
+aktif_bitler = alarm_kodlari.hata_tablosu(son_durum)
+if not aktif_bitler.empty:
+    with st.expander(f"🚨 Son ölçümde {len(aktif_bitler)} aktif arıza biti "
+                     f"({aktif_bitler['slave_id'].nunique()} cihaz)"):
+        anlik = aktif_bitler.sort_values(["slave_id", "register", "bit"]).copy()
+        anlik["zaman"] = anlik["zaman"].dt.strftime('%d.%m %H:%M:%S')
+        anlik.columns = ["ID", "Son Ölçüm", "Register", "Bit", "Arıza"]
+        st.dataframe(anlik, use_container_width=True, hide_index=True)
+
+baslangic = datetime.combine(tarih_araligi[0], datetime.min.time())
+bitis = datetime.combine(tarih_araligi[1], datetime.max.time())
+
+# --- OLAYLAR (alarm_olaylari tablosu: maliyet ölçüm değil olay sayısıyla orantılı) ---
+olaylar = veritabani.alarm_olaylari_getir(baslangic, bitis, secili_cihazlar or None)
+if olaylar.empty:
+    st.success("🎉 Seçilen aralıkta hiç arıza olayı yok.")
+    st.stop()
+
+ozet = alarm_kodlari.olay_ozeti(olaylar)
+
+m1, m2, m3 = st.columns(3)
+m1.metric("Arıza Olayı", f"{len(olaylar):,}")
+m2.metric("Hâlâ Aktif", int(olaylar['bitis'].isna().sum()))
+m3.metric("Etkilenen Cihaz", olaylar['slave_id'].nunique())
+
+# --- SIKLIK VE SÜRE ---
+st.subheader("📊 Cihaz / Arıza Bazında Sıklık")
+tablo = ozet.copy()
+tablo["toplam_sure"] = tablo["toplam_sure"].astype(str)
+tablo["ort_sure"] = tablo["ort_sure"].astype(str)
+tablo.columns = ["ID", "Register", "Arıza", "Adet", "Toplam Süre", "Ort. Süre", "Aktif"]
+st.dataframe(tablo, use_container_width=True, hide_index=True)
+
+st.bar_chart(ozet.groupby("mesaj")["adet"].sum().sort_values(ascending=False), color="#EF5350")
+
+# --- OLAY LİSTESİ ---
+st.subheader("🕒 Başlangıç / Bitiş Olayları")
+liste = olaylar.sort_values("baslangic", ascending=False).copy()
+liste["sure"] = liste["sure"].astype(str).replace("NaT", "Devam ediyor")
+liste.columns = ["ID", "Register", "Bit", "Arıza", "Başlangıç", "Bitiş", "Süre"]
+st.dataframe(liste, use_container_width=True, hide_index=True)
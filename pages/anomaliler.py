@@ -0,0 +1,81 @@
+import streamlit as st
+import pandas as pd
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Üst dizindeki modülleri (veritabani.py, anomali.py) görebilmesi için yol ayarı
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import veritabani
+import anomali
+
+st.set_page_config(page_title="Anomaliler", page_icon="🔎", layout="wide")
+
+st.title("🔎 Filo Anomalileri")
+st.markdown("Aynı anda filodan az üreten, aniden düşen ya da filoya göre ısınan cihazlar. "
+            f"Analiz collector içinde {anomali.ANOMALI['aralik'] // 60} dakikada bir çalışır ve kaydedilir.")
+
+# --- FİLTRELER ---
+cihazlar = [row[0] for row in veritabani.tum_cihazlarin_son_durumu()]
+
+col_tarih, col_cihaz, col_buton = st.columns([1, 2, 1])
+with col_tarih:
+    bugun = datetime.now().date()
+    tarih_araligi = st.date_input("Tarih Aralığı", value=(bugun - timedelta(days=7), bugun))
+with col_cihaz:
+    secili_cihazlar = st.multiselect("Cihazlar (boş: tümü)", cihazlar)
+with col_buton:
+    # Panel veritabanına yazmaz: anlık analiz sadece bu oturumda gösterilir
+    if st.button(f"🔄 Son {anomali.ANOMALI['pencere_saat']} Saati Şimdi Analiz Et"):
+        with st.spinner("Analiz ediliyor..."):
+            st.session_state['anlik_anomaliler'] = anomali.anomali_hesapla()[2]
+
+anlik = st.session_state.get('anlik_anomaliler')
+if anlik is not None:
+    with st.expander(f"⚡ Anlık analiz: {len(anlik)} dönem (kaydedilmez)", expanded=True):
+        tablo = anlik.assign(tur=anlik["tur"].map(anomali.ANOMALI_TURLERI).fillna(anlik["tur"]),
+                             deger=anlik["deger"].astype(float).round(2))
+        tablo.columns = ["ID", "Anomali", "Başlangıç", "Bitiş", "En Kötü Değer"]
+        st.dataframe(tablo, use_container_width=True, hide_index=True)
+
+if not isinstance(tarih_araligi, (list, tuple)) or len(tarih_araligi) != 2:
+    st.info("Başlangıç ve bitiş tarihini seçin.")
+    st.stop()
+
+baslangic = datetime.combine(tarih_araligi[0], datetime.min.time())
+bitis = datetime.combine(tarih_araligi[1], datetime.max.time())
+
+anomaliler = veritabani.anomalileri_getir(baslangic, bitis, secili_cihazlar or None)
+if anomaliler.empty:
+    st.success("🎉 Seçilen aralıkta anomali yok.")
+    st.stop()
+
+anomaliler["mesaj"] = anomaliler["tur"].map(anomali.ANOMALI_TURLERI).fillna(anomaliler["tur"])
+
+m1, m2, m3 = st.columns(3)
+m1.metric("Anomali Dönemi", f"{len(anomaliler):,}")
+m2.metric("Etkilenen Cihaz", anomaliler["slave_id"].nunique())
+m3.metric("Toplam Süre", str(anomaliler["sure"].sum()))
+
+# --- CİHAZ / TÜR ---
+st.subheader("📊 Cihaz / Anomali Türü")
+ozet = anomaliler.groupby(["slave_id", "mesaj"]).agg(adet=("tur", "size"), toplam_sure=("sure", "sum")).reset_index()
+ozet["toplam_sure"] = ozet["toplam_sure"].astype(str)
+ozet.columns = ["ID", "Anomali", "Adet", "Toplam Süre"]
+st.dataframe(ozet, use_container_width=True, hide_index=True)
+
+st.bar_chart(anomaliler.groupby("mesaj")["sure"].sum().dt.total_seconds().div(3600).rename("Saat"),
+             color="#FFA726")
+
+# --- DÖNEM LİSTESİ ---
+st.subheader("🕒 Anomali Dönemleri")
+liste = anomaliler.sort_values("baslangic", ascending=False)
+liste = pd.DataFrame({
+    "ID": liste["slave_id"],
+    "Anomali": liste["mesaj"],
+    "Başlangıç": liste["baslangic"].dt.strftime('%d.%m %H:%M'),
+    "Bitiş": liste["bitis"].dt.strftime('%d.%m %H:%M'),
+    "Süre": liste["sure"].astype(str),
+    "En Kötü Değer": liste["deger"].round(2),
+})
+st.dataframe(liste, use_container_width=True, hide_index=True)
@@ -0,0 +1,90 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import altair as alt
+import sys
+import os
+
+# Üst dizindeki modülleri (veritabani.py, filo.py) görebilmesi için yol ayarı
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import filo
+
+st.set_page_config(page_title="Filo Haritası", page_icon="🗺️", layout="wide")
+
+st.title("🗺️ Filo Isı Haritası")
+st.markdown("Tüm cihazların gücü (aynı andaki filo en yükseğine oranla) ve alarm durumu. "
+            "Koyu hücreler aynı anda filodan az üreten cihazlardır.")
+
+# Pencere -> (özet tablosu, kova sayısı). Aynı tablodaki pencereler tek matrisin dilimleridir.
+PENCERELER = {
+    "Son 1 Saat": ('olcumler_1dk', 60),
+    "Son 6 Saat": ('olcumler_1dk', 360),
+    "Son 24 Saat": ('olcumler_15dk', 96),
+    "Son 7 Gün": ('olcumler_15dk', 672),
+}
+
+# Matris tüm oturumlarda ortak: her açılış sadece son birkaç kovayı okur
+@st.cache_resource(show_spinner=False)
+def filo_matrisi(tablo):
+    return filo.FiloMatrisi(tablo)
+
+pencere_adi = st.selectbox("🕒 Zaman Aralığı:", list(PENCERELER), index=2)
+tablo, kova_sayisi = PENCERELER[pencere_adi]
+matris = filo_matrisi(tablo)
+matris.guncelle()
+cihazlar, zamanlar, oran, alarm = matris.pencere(kova_sayisi)
+
+if not len(cihazlar):
+    st.info("Seçilen aralıkta henüz özet verisi yok.")
+    st.stop()
+
+# --- ÖZET ---
+# Cihaz başına pencere ortalaması (sadece verisi olan kovalar)
+gecerli = np.isfinite(oran)
+adet = gecerli.sum(axis=1)
+ortalama = pd.Series(np.divide(np.where(gecerli, oran, 0).sum(axis=1), adet,
+                               out=np.full(len(cihazlar), np.nan), where=adet > 0), index=cihazlar)
+m1, m2, m3 = st.columns(3)
+m1.metric("Cihaz", len(cihazlar))
+m2.metric("Son Kovada Alarmlı", int(alarm[:, -1].sum()))
+m3.metric("Filo Ortalama Oran", f"{ortalama.mean():.0%}" if ortalama.notna().any() else "-")
+
+# --- ISI HARİTALARI ---
+adim = zamanlar[1] - zamanlar[0] if len(zamanlar) > 1 else pd.Timedelta(seconds=matris.saniye)
+uzun = pd.DataFrame({
+    "ID": np.repeat(cihazlar, len(zamanlar)),
+    "Zaman": np.tile(zamanlar, len(cihazlar)),
+    "Oran": oran.ravel(),
+    "Alarm": alarm.ravel(),
+})
+uzun["Bitis"] = uzun["Zaman"] + adim
+yukseklik = min(900, max(200, 14 * len(cihazlar)))
+# Kova anahtarları yerel saattir: tarayıcı saat dilimine göre kaydırılmasın
+x = alt.X("Zaman:T", title=None, scale=alt.Scale(type="utc"), axis=alt.Axis(format="%d.%m %H:%M"))
+y = alt.Y("ID:O", title="ID", sort="ascending")
+
+st.subheader("☀️ Güç (filo en yükseğine oran)")
+st.altair_chart(alt.Chart(uzun.dropna(subset=["Oran"])).mark_rect().encode(
+    x=x, x2="Bitis:T", y=y,
+    color=alt.Color("Oran:Q", scale=alt.Scale(scheme="redyellowgreen", domain=[0, 1]), legend=alt.Legend(format="%")),
+    tooltip=["ID", alt.Tooltip("Zaman:T", format="%d.%m %H:%M"), alt.Tooltip("Oran:Q", format=".0%")],
+).properties(height=yukseklik), use_container_width=True)
+
+st.subheader("🚨 Alarm Durumu")
+st.altair_chart(alt.Chart(uzun[uzun["Alarm"]]).mark_rect(color="#EF5350").encode(
+    x=x, x2="Bitis:T", y=alt.Y("ID:O", title="ID", sort="ascending", scale=alt.Scale(domain=list(cihazlar))),
+    tooltip=["ID", alt.Tooltip("Zaman:T", format="%d.%m %H:%M")],
+).properties(height=yukseklik), use_container_width=True)
+
+# --- EN DÜŞÜK PERFORMANS ---
+st.subheader("📉 Filoya Göre En Düşük Üreten Cihazlar")
+tablo_df = pd.DataFrame({
+    "ID": cihazlar,
+    "Ortalama Oran": ortalama.values,
+    "Alarmlı Kova": alarm.sum(axis=1),
+}).sort_values("Ortalama Oran", na_position="last")
+tablo_df["Ortalama Oran"] = tablo_df["Ortalama Oran"].map(lambda v: "-" if pd.isna(v) else f"{v:.0%}")
+st.dataframe(tablo_df, use_container_width=True, hide_index=True)
+
+if st.button("🔄 Yenile"):
+    st.rerun()
@@ -0,0 +1,66 @@
+import streamlit as st
+import pandas as pd
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Üst dizindeki modülleri (veritabani.py) görebilmesi için yol ayarı
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import veritabani
+
+st.set_page_config(page_title="Enerji Üretimi", page_icon="🔋", layout="wide")
+
+st.title("🔋 Enerji Üretimi")
+st.markdown("Cihaz ve santral bazında günlük / aylık üretim (kWh). Güç ölçümleri zaman "
+            "ağırlıklı entegre edilir; veri olmayan süreler üretime katılmaz (Kapsama).")
+
+# --- FİLTRELER ---
+cihazlar = [row[0] for row in veritabani.tum_cihazlarin_son_durumu()]
+
+col_tarih, col_donem, col_cihaz = st.columns([1, 1, 2])
+with col_tarih:
+    bugun = datetime.now().date()
+    tarih_araligi = st.date_input("Tarih Aralığı", value=(bugun - timedelta(days=30), bugun))
+with col_donem:
+    donem_adi = st.radio("Dönem", ["Günlük", "Aylık"], horizontal=True)
+with col_cihaz:
+    secili_cihazlar = st.multiselect("Cihazlar (boş: tümü)", cihazlar)
+
+if not isinstance(tarih_araligi, (list, tuple)) or len(tarih_araligi) != 2:
+    st.info("Başlangıç ve bitiş tarihini seçin.")
+    st.stop()
+
+# --- ÜRETİM (olcumler_gunluk: cihaz ve gün başına tek satır) ---
+donem = 'ay' if donem_adi == "Aylık" else 'gun'
+uretim = veritabani.uretim_getir(tarih_araligi[0], tarih_araligi[1], secili_cihazlar or None, donem)
+if uretim.empty:
+    st.info("Seçilen aralıkta üretim verisi yok.")
+    st.stop()
+
+santral = uretim.groupby("donem")["uretim_kwh"].sum()
+cihaz_toplam = uretim.groupby("slave_id")["uretim_kwh"].sum()
+
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Toplam Üretim", f"{santral.sum():,.1f} kWh")
+m2.metric(f"{donem_adi} Ortalama", f"{santral.mean():,.1f} kWh")
+m3.metric("En Çok Üreten", f"ID {cihaz_toplam.idxmax()}")
+m4.metric("Ort. Kapsama", f"{uretim['kapsama'].mean():.0%}")
+
+# --- SANTRAL ---
+st.subheader("🏭 Santral Üretimi (kWh)")
+st.bar_chart(santral, color="#FFD700")
+
+# --- CİHAZ × DÖNEM ---
+st.subheader("📋 Cihaz Bazında Üretim (kWh)")
+pivot = uretim.pivot(index="slave_id", columns="donem", values="uretim_kwh")
+pivot["Toplam"] = pivot.sum(axis=1)
+pivot.index.name = "ID"
+st.dataframe(pivot.round(2), use_container_width=True)
+
+dusuk = uretim[uretim["kapsama"] < 0.9]
+if not dusuk.empty:
+    with st.expander(f"⚠️ Eksik veri olan {len(dusuk)} cihaz/dönem"):
+        tablo = dusuk.rename(columns={"slave_id": "ID", "donem": "Dönem",
+                                      "uretim_kwh": "Üretim (kWh)", "kapsama": "Kapsama"})
+        tablo["Kapsama"] = tablo["Kapsama"].map(lambda v: f"{v:.0%}")
+        st.dataframe(tablo.round(2), use_container_width=True, hide_index=True)
@@ -1,9 +1,11 @@
 import streamlit as st
 import time
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 from pymodbus.client import ModbusTcpClient
 import veritabani 
+import okuma_plani
+import alarm_kodlari
 
 # --- SAYFA AYARLARI ---
 st.set_page_config(
@@ -13,8 +15,14 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# DB Başlat
-veritabani.init_db()
+# DB Başlat: şema/migration sunucu süreci başına BİR kez (her rerun'da değil).
+# Tablolar zaten collector tarafından kuruluyorsa bu sadece boş DB'de iş yapar.
+@st.cache_resource(show_spinner=False)
+def db_hazirla():
+    veritabani.init_db()
+    return True
+
+db_hazirla()
 
 # --- CSS TASARIMI ---
 st.markdown("""
@@ -31,6 +39,24 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# "Son 100 Kayıt" ızgarasının adımı (sn): collector'ın normal okuma aralığı
+VARSAYILAN_ADIM = 2
+CANLI_PENCERE = "Son 100 Kayıt"
+CANLI_NOKTA = 100
+
+# Grafik zaman aralıkları (None: son 100 ham kayıt)
+PENCERELER = {
+    CANLI_PENCERE: None,
+    "Son 1 Saat": timedelta(hours=1),
+    "Son 24 Saat": timedelta(days=1),
+    "Son 7 Gün": timedelta(days=7),
+    "Son 30 Gün": timedelta(days=30),
+    "Son 1 Yıl": timedelta(days=365),
+}
+
+# Karşılaştırma grafiğinde seçilebilen değerler (veritabani.OZET_ALANLARI)
+KARSILASTIRMA_ALANLARI = {"Güç (W)": "guc", "Voltaj (V)": "voltaj", "Akım (A)": "akim", "Isı (C)": "sicaklik"}
+
 # --- YARDIMCI FONKSİYONLAR ---
 def parse_id_list(id_string):
     ids = set()
@@ -49,56 +75,95 @@ def parse_id_list(id_string):
             except: pass
     return sorted(list(ids))
 
+# --- ORTAK OKUYUCU (Tüm sekmeler/oturumlar aynı bağlantıyı ve önbelleği paylaşır) ---
+# Salt okunur kalıcı bağlantı; sonuçlar son ölçüm id'si değişene kadar önbellekten
+# gelir, id'nin kendisi de saniyede en fazla bir kez sorgulanır (veritabani.VeriOkuyucu).
+@st.cache_resource(show_spinner=False)
+def veri_okuyucu():
+    return veritabani.VeriOkuyucu()
+
+okuyucu = veri_okuyucu()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def bugun_uretim(son_id):
+    # Günlük özet tablosundan cihaz başına tek satır: {slave_id: kWh}
+    bugun = datetime.now().date()
+    df = veritabani.uretim_getir(bugun, bugun)
+    return dict(zip(df["slave_id"], df["uretim_kwh"]))
+
+def yenileme_adimi(pencere_adi):
+    # "Şimdi"ye bağlı pencerelerin ızgara adımı: yeni satır gelmese de bu aralıkla yeniden çizilir
+    pencere = PENCERELER[pencere_adi]
+    return VARSAYILAN_ADIM if pencere is None else okuyucu.pencere_adimi(pencere)
+
+def detay_getir(slave_id, pencere_adi):
+    # Uzun aralıklarda veritabanı uygun özet tablosunu (1dk/15dk/gün) kendisi seçer
+    return okuyucu.son_pencere(slave_id, PENCERELER[pencere_adi])
+
+def karsilastirma_getir(slave_ids, alan_adi, pencere_adi):
+    # Canlı pencere: detay grafiğiyle aynı son CANLI_NOKTA okuma aralığı
+    pencere = PENCERELER[pencere_adi]
+    if pencere is None:
+        return okuyucu.coklu_son_pencere(slave_ids, timedelta(seconds=CANLI_NOKTA * VARSAYILAN_ADIM),
+                                         KARSILASTIRMA_ALANLARI[alan_adi], adim=VARSAYILAN_ADIM)
+    return okuyucu.coklu_son_pencere(slave_ids, pencere, KARSILASTIRMA_ALANLARI[alan_adi])
+
+# --- CANLI PENCERE (oturum başına, cihaz başına halka tampon) ---
+# Her yenilemede sadece tampondaki son zamandan sonraki noktalar sorgulanır ve
+# ayrıştırılır; tampon son CANLI_NOKTA noktayı tutar.
+def canli_tampon(slave_id):
+    tamponlar = st.session_state.setdefault('canli_tamponlar', {})
+    if slave_id not in tamponlar:
+        tamponlar[slave_id] = {'df': None, 'son_zaman': None}
+    return tamponlar[slave_id]
+
+def canli_guncelle(slave_id):
+    """Tampona sadece yeni noktaları ekler, yeni nokta sayısını döner."""
+    tampon = canli_tampon(slave_id)
+    if tampon['son_zaman'] is None:
+        yeni = okuyucu.son_veriler(slave_id, limit=CANLI_NOKTA, adim=VARSAYILAN_ADIM)
+    else:
+        yeni = okuyucu.son_veriler_since(
+            slave_id, tampon['son_zaman'], adim=VARSAYILAN_ADIM, limit=CANLI_NOKTA)
+    if len(yeni):
+        tampon['df'] = yeni if tampon['df'] is None else pd.concat([tampon['df'], yeni]).iloc[-CANLI_NOKTA:]
+        tampon['son_zaman'] = yeni.index[-1]
+    return len(yeni)
+
 @st.cache_resource
 def get_modbus_client(ip, port):
     return ModbusTcpClient(ip, port=port, timeout=1) 
 
+@st.cache_resource
+def get_alarm_izleyici():
+    # Doğrudan Modbus modunda da alarm başlangıç/bitişleri alarm_olaylari'na yazılsın
+    return alarm_kodlari.AlarmIzleyici(veritabani.aktif_alarmlar())
+
+def panel_alanlari(config):
+    """Yan menüdeki adres haritasını okuma planlayıcısının alan listesine çevirir."""
+    return [
+        {'key': 'guc', 'addr': config['guc_addr'], 'scale': config['guc_scale'], 'zorunlu': True},
+        {'key': 'voltaj', 'addr': config['volt_addr'], 'scale': config['volt_scale']},
+        {'key': 'akim', 'addr': config['akim_addr'], 'scale': config['akim_scale']},
+        {'key': 'sicaklik', 'addr': config['isi_addr'], 'scale': config['isi_scale']},
+        {'key': 'hata_kodu', 'addr': config.get('hata_addr', 189), 'count': 2},     # Register 189
+        {'key': 'hata_kodu_193', 'addr': 193, 'count': 2},                        # Register 193
+    ]
+
 def read_device(client, slave_id, config):
     try:
         if not client.connected: client.connect()
-        
-        # 1. Standart Veriler
-        r_guc = client.read_holding_registers(config['guc_addr'], 1, slave=slave_id)
-        if r_guc.isError(): return None, "No Response"
-        val_guc = r_guc.registers[0] * config['guc_scale']
-
-        r_volt = client.read_holding_registers(config['volt_addr'], 1, slave=slave_id)
-        val_volt = 0 if r_volt.isError() else r_volt.registers[0] * config['volt_scale']
-
-        r_akim = client.read_holding_registers(config['akim_addr'], 1, slave=slave_id)
-        val_akim = 0 if r_akim.isError() else r_akim.registers[0] * config['akim_scale']
-
-        r_isi = client.read_holding_registers(config['isi_addr'], 1, slave=slave_id)
-        val_isi = 0 if r_isi.isError() else r_isi.registers[0] * config['isi_scale']
-
-        # 2. Hata Kodu 1 (Register 189)
-        hata_addr_1 = config.get('hata_addr', 189)
-        hata_kodu_189 = 0
-        try:
-            r_hata = client.read_holding_registers(hata_addr_1, 2, slave=slave_id)
-            if not r_hata.isError():
-                hata_kodu_189 = (r_hata.registers[0] << 16) | r_hata.registers[1]
-        except: pass
-
-        # 3. Hata Kodu 2 (Register 193)
-        hata_kodu_193 = 0
-        try:
-            time.sleep(0.02) 
-            r_hata2 = client.read_holding_registers(193, 2, slave=slave_id)
-            if not r_hata2.isError():
-                hata_kodu_193 = (r_hata2.registers[0] << 16) | r_hata2.registers[1]
-        except: pass
-
-        return {
-            "slave_id": slave_id,
-            "guc": val_guc,
-            "voltaj": val_volt,
-            "akim": val_akim,
-            "sicaklik": val_isi,
-            "hata_kodu": hata_kodu_189,    
-            "hata_kodu_193": hata_kodu_193, 
-            "timestamp": datetime.now()
-        }, None
+
+        # 6 ayrı istek yerine birleştirilmiş bloklar (varsayılan haritada 2 istek)
+        plan = okuma_plani.plan_olustur(panel_alanlari(config), max_bosluk=config['max_bosluk'])
+        veriler = okuma_plani.plani_oku(
+            lambda addr, cnt: client.read_holding_registers(addr, count=cnt, slave=slave_id),
+            plan)
+        if veriler is None: return None, "No Response"
+
+        veriler["slave_id"] = slave_id
+        veriler["timestamp"] = datetime.now()
+        return veriler, None
 
     except Exception as e:
         return None, str(e)
@@ -120,6 +185,9 @@ with st.sidebar:
     st.divider()
     
     st.header("⏳ Zamanlayıcı")
+    # Salt okuma: veriyi sadece collector.py toplar, panel gateway'e hiç bağlanmaz
+    calisma_modu = st.radio("Çalışma Modu", ["📖 Salt Okuma (Collector)", "📡 Doğrudan Modbus"])
+    dogrudan_modbus = calisma_modu.startswith("📡")
     refresh_rate = st.number_input("Veri Çekme Sıklığı (Saniye)", value=30, min_value=1, step=1)
     
     st.markdown("---")
@@ -134,13 +202,16 @@ with st.sidebar:
         c_isi_adr = st.number_input("Isı Adresi", value=73)
         c_isi_sc = st.number_input("Isı Çarpan", value=1.0)
         c_hata_adr = st.number_input("Hata Adresi (DC Faults)", value=189)
+        c_bosluk = st.number_input("Birleştirme Boşluğu (Register)", value=okuma_plani.VARSAYILAN_BOSLUK,
+                                   min_value=0, max_value=okuma_plani.MAX_BLOK, step=1)
     
     config = {
         'guc_addr': c_guc_adr, 'guc_scale': c_guc_sc,
         'volt_addr': c_volt_adr, 'volt_scale': c_volt_sc,
         'akim_addr': c_akim_adr, 'akim_scale': c_akim_sc,
         'isi_addr': c_isi_adr, 'isi_scale': c_isi_sc,
-        'hata_addr': c_hata_adr
+        'hata_addr': c_hata_adr,
+        'max_bosluk': c_bosluk
     }
 
     if st.button("▶️ SİSTEMİ BAŞLAT", type="primary"):
@@ -154,6 +225,7 @@ with st.sidebar:
     st.header("🗑️ Veri Yönetimi")
     if st.button("Tüm Verileri Sil"):
         if veritabani.db_temizle():
+            st.session_state.pop('canli_tamponlar', None)
             st.success("Temizlendi!")
             time.sleep(1)
             st.rerun()
@@ -167,9 +239,11 @@ table_spot = st.empty()
 
 # Grafik Seçimi
 st.markdown("---")
-col_sel, col_info = st.columns([1, 3])
+col_sel, col_pencere, col_info = st.columns([1, 1, 2])
 with col_sel:
     selected_id = st.selectbox("📊 Detaylı Grafik İçin Cihaz Seç:", target_ids)
+with col_pencere:
+    secili_pencere = st.selectbox("🕒 Zaman Aralığı:", list(PENCERELER))
 with col_info:
     # Kullanıcıyı diğer sayfaya yönlendiren küçük bir bilgi notu
     st.info("⚠️ Detaylı arıza kodlarını görmek için sol menüden **alarmlar** sayfasına gidin.")
@@ -191,47 +265,95 @@ with row2_c2:
     st.markdown(f'<div class="chart-title" style="background:#2e0a0a; color:#EF5350;">🌡️ ID:{selected_id} - Sıcaklık</div>', unsafe_allow_html=True)
     chart_isi = st.empty()
 
+# --- CİHAZ KARŞILAŞTIRMA (tüm seçili cihazlar tek sorguda, geniş tablo) ---
+st.markdown("---")
+st.subheader("📊 Cihaz Karşılaştırma")
+col_k_ids, col_k_alan = st.columns([3, 1])
+with col_k_ids:
+    karsilastirma_ids = st.multiselect("Karşılaştırılacak Cihazlar:", target_ids, default=target_ids[:8])
+with col_k_alan:
+    karsilastirma_alan = st.selectbox("Değer:", list(KARSILASTIRMA_ALANLARI))
+chart_karsilastirma = st.empty()
+
 # --- DURUM ÇUBUĞU ---
 status_bar = st.empty()
 
+GRAFIKLER = [(chart_guc, "guc", "#FFD700"), (chart_volt, "voltaj", "#29B6F6"),
+             (chart_akim, "akim", "#66BB6A"), (chart_isi, "sicaklik", "#EF5350")]
+
+# Bu çalıştırmada ekrana basılan tablo/grafik: veri değişmedikçe yeniden çizilmez
+cizim = {'ozet': None, 'grafik': None, 'karsilastirma': None}
+
+def grafikleri_ciz(df_det):
+    for yer, sutun, renk in GRAFIKLER:
+        yer.line_chart(df_det[sutun], color=renk)
+
 def ui_refresh():
     # 1. TABLO GÜNCELLEME
-    summary_data = veritabani.tum_cihazlarin_son_durumu()
-    if summary_data:
-        df_sum = pd.DataFrame([row[:6] for row in summary_data], columns=["ID", "Son Zaman", "Güç (W)", "Voltaj (V)", "Akım (A)", "Isı (C)"])
-        df_sum["Son Zaman"] = pd.to_datetime(df_sum["Son Zaman"]).dt.strftime('%H:%M:%S')
+    son_id = okuyucu.son_id()
+    df_sum = okuyucu.son_durum().iloc[:, :6] if cizim['ozet'] != son_id else None
+    if df_sum is not None and not df_sum.empty:
+        cizim['ozet'] = son_id
+        df_sum.columns = ["ID", "Son Zaman", "Güç (W)", "Voltaj (V)", "Akım (A)", "Isı (C)"]
+        df_sum["Son Zaman"] = df_sum["Son Zaman"].dt.strftime('%H:%M:%S')
+        df_sum["Bugün (kWh)"] = df_sum["ID"].map(bugun_uretim(son_id)).round(2)
         table_spot.dataframe(df_sum.set_index("ID"), use_container_width=True)
 
-    # 2. GRAFİK GÜNCELLEME
-    detail_data = veritabani.son_verileri_getir(selected_id, limit=100)
-    if detail_data:
-        try:
-            df_det = pd.DataFrame(detail_data, columns=["timestamp", "guc", "voltaj", "akim", "sicaklik", "hata_kodu", "hata_kodu_193"])
-        except:
-            df_det = pd.DataFrame(detail_data, columns=["timestamp", "guc", "voltaj", "akim", "sicaklik", "hata_kodu"])
-            
-        df_det["timestamp"] = pd.to_datetime(df_det["timestamp"])
-        df_det = df_det.set_index("timestamp")
-        
-        chart_guc.line_chart(df_det["guc"], color="#FFD700")
-        chart_volt.line_chart(df_det["voltaj"], color="#29B6F6")
-        chart_akim.line_chart(df_det["akim"], color="#66BB6A")
-        chart_isi.line_chart(df_det["sicaklik"], color="#EF5350")
+    # 2. KARŞILAŞTIRMA: N cihaz için tek sorgu (yeni veri ya da yeni ızgara adımı gelmedikçe yeniden çizilmez)
+    kova = okuyucu.zaman_kovasi(yenileme_adimi(secili_pencere))
+    anahtar = (tuple(karsilastirma_ids), karsilastirma_alan, secili_pencere, son_id, kova)
+    if karsilastirma_ids and cizim['karsilastirma'] != anahtar:
+        genis = karsilastirma_getir(karsilastirma_ids, karsilastirma_alan, secili_pencere)
+        chart_karsilastirma.line_chart(genis.rename(columns=lambda i: f"ID {i}"))
+        cizim['karsilastirma'] = anahtar
+
+    # 3. GRAFİK GÜNCELLEME
+    if secili_pencere == CANLI_PENCERE:
+        # Canlı pencere: DB'den ve ayrıştırmadan sadece yeni noktalar geçer
+        yeni = canli_guncelle(selected_id)
+        df_det = canli_tampon(selected_id)['df']
+        anahtar = (selected_id, secili_pencere)
+        if df_det is not None and (yeni or cizim['grafik'] != anahtar):
+            grafikleri_ciz(df_det)
+            cizim['grafik'] = anahtar
+        return
+
+    # Uzun pencereler: yeni veri (son_id) ya da yeni ızgara adımı gelmedikçe yeniden çizilmez
+    anahtar = (selected_id, secili_pencere, son_id, kova)
+    if cizim['grafik'] != anahtar:
+        df_det = detay_getir(selected_id, secili_pencere)
+        if not df_det.empty:
+            grafikleri_ciz(df_det)
+            cizim['grafik'] = anahtar
 
 # --- ANA DÖNGÜ ---
-if st.session_state.monitoring:
+if st.session_state.monitoring and not dogrudan_modbus:
+    status_bar.success(f"✅ Canlı İzleme (Collector verisi, {refresh_rate} sn'de bir)")
+
+    while st.session_state.monitoring:
+        # rerun yok: sayfanın geri kalanı her yenilemede baştan kurulmaz, değişmeyen
+        # grafik yeniden çizilmez. Yan menüdeki her değişiklik zaten yeni çalıştırma başlatır.
+        ui_refresh()
+        time.sleep(refresh_rate)
+elif st.session_state.monitoring:
     client = get_modbus_client(target_ip, target_port)
     status_bar.success(f"✅ Sistem Aktif")
     
     while st.session_state.monitoring:
+        dongu_verileri = []
         for dev_id in target_ids:
             data, err = read_device(client, dev_id, config)
             if data:
-                veritabani.veri_ekle(dev_id, data)
+                dongu_verileri.append((dev_id, data))
+
+        # Turun ölçümleri tek transaction'da (özetler paket başına bir kez güncellenir)
+        veritabani.veri_ekle_toplu(dongu_verileri)
+        izleyici = get_alarm_izleyici()
+        veritabani.alarm_olaylari_yaz(
+            [olay for dev_id, data in dongu_verileri for olay in izleyici.guncelle(dev_id, data)])
         
         ui_refresh()
-        time.sleep(2) 
-        st.rerun()
+        time.sleep(2)
 else:
     ui_refresh()
     status_bar.info("Sistem Beklemede. Grafikleri görmek için BAŞLAT'a basın.")
\ No newline at end of file
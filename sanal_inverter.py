@@ -1,4 +1,22 @@
+"""
+Sanal inverter filosu (yük testi simülatörü).
+
+Her port ayrı bir gateway gibi davranır ve arkasında birden çok slave ID
+barındırır. Register haritası collector.py'nin okuduğu gerçek haritayla
+aynıdır:
+    70 guc (W), 71 voltaj x10, 72 akim x10, 73 sicaklik (C)
+    189-190 hata_kodu (32-bit, yüksek kelime önce), 193 hata_kodu_193
+    0-4 eski test haritası [voltaj, akim_x10, guc, toplam_uretim, sicaklik]
+
+Arıza bitleri rastgele açılıp kapanır; cevaplara gecikme, timeout (cevabı
+client timeout'undan geç verme) ve hiç cevap vermeme (düşen paket)
+eklenebilir. Seri hat modunda bir porttaki istekler RS485'teki gibi
+sırayla cevaplanır.
+
+Örnek: python sanal_inverter.py --portlar 5020 5021 --cihaz 100 --gecikme 15 --timeout-orani 0.01
+"""
 import asyncio
+import argparse
 import logging
 import math
 import random
@@ -6,126 +24,260 @@ from datetime import datetime
 from pymodbus.server import StartAsyncTcpServer
 from pymodbus.datastore import ModbusSequentialDataBlock
 from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext
+from pymodbus.exceptions import NoSuchSlaveException
+import alarm_kodlari
 
 # --- AYARLAR ---
 TEST_IP = "127.0.0.1"
 TEST_PORT = 5020
 
+# Filo ve hata enjeksiyonu (komut satırından ezilebilir)
+SIMULASYON = {
+    'portlar': [TEST_PORT],     # Her port bir gateway
+    'cihaz_sayisi': 3,          # Port başına slave ID sayısı (1..N)
+    'ardisik_id': False,        # True: ID'ler portlar boyunca devam eder (1..N, N+1..2N, ...)
+    'seri_hat': True,           # True: porttaki istekler sırayla cevaplanır (RS485)
+    'gecikme_ms': 0,            # Her cevaba eklenen ortalama gecikme
+    'gecikme_sapma_ms': 0,      # Gecikmeye eklenen rastgele sapma (+/-)
+    'timeout_orani': 0.0,       # İsteklerin bu kadarı timeout_sn kadar geç cevaplanır
+    'timeout_sn': 3.0,          # Collector'ın CIHAZ_TIMEOUT'undan uzun olmalı
+    'dusme_orani': 0.0,         # İsteklerin bu kadarına hiç cevap verilmez
+    'olu_cihaz_orani': 0.0,     # Bu orandaki ID'ler hiç cevap vermez (ağda yok)
+    'ariza_olasiligi': 0.002,   # Her saniye bir cihazda yeni arıza biti açılma olasılığı
+    'ariza_temizlenme': 0.05,   # Her saniye açık bir arıza bitinin kapanma olasılığı
+    'log': True,                # Her saniye filo özeti yaz
+}
+
 # Simülasyon Parametreleri
 MAX_GUC_KAPASITESI = 3000  # 3000 Watt (3kW) panel
 TOPLAM_URETIM_WH = 12500   # Sayac 12.5 kWh'den baslasin
+REGISTER_SAYISI = 200      # 0..199 (193'ü kapsamalı)
 
 # --- FIZIKSEL SIMULASYON MANTIGI ---
-def veri_uret():
-    global TOPLAM_URETIM_WH
-    
+def gunes_hesapla():
     simdi = datetime.now()
-    
+
     # --- YENİ ZAMAN ALGORİTMASI (6 DAKİKALIK DÖNGÜ) ---
     # Hedef: Gerçek hayattaki 6 dakika (360 saniye) = Sanal 24 saat (1440 dakika)
-    DONGU_SURESI_SN = 360 
-    
+    DONGU_SURESI_SN = 360
+
     # Şu anki zamanı saniye cinsinden alıp 360'a göre modunu alıyoruz.
     # Bu bize 0 ile 359 arasında sürekli dönen bir sayaç verir.
     toplam_saniye = simdi.minute * 60 + simdi.second
     dongu_saniyesi = toplam_saniye % DONGU_SURESI_SN
-    
+
     # Gerçek saniyeyi sanal dakikaya çevir (Oran: 1440 / 360 = 4)
     # Yani gerçekte 1 saniye geçince, simülasyonda 4 dakika geçecek.
-    sanal_zaman = dongu_saniyesi * 4 
-    
+    sanal_zaman = dongu_saniyesi * 4
+
     # --- UZUN GÜNDÜZ AYARLARI ---
     # Güneş 04:00 (240. dk) doğsun, 20:00 (1200. dk) batsın.
     # Gündüz süresi 16 saat, Gece süresi 8 saat olur.
     GUN_DOGUSU = 240  # 04:00
     GUN_BATIMI = 1200 # 20:00
-    
+
     gunes_faktoru = 0
-    
+
     # Eğer sanal saat gündüz aralığındaysa
     if GUN_DOGUSU < sanal_zaman < GUN_BATIMI:
         # Sinüs dalgası oluştur (0'dan başla, 1'e çık, 0'a in)
         radyan = math.pi * (sanal_zaman - GUN_DOGUSU) / (GUN_BATIMI - GUN_DOGUSU)
         gunes_faktoru = math.sin(radyan)
-    
+
+    # Sanal Saati Hesapla (Ekrana yazdırmak için)
+    sanal_saat = int(sanal_zaman // 60)
+    sanal_dakika = int(sanal_zaman % 60)
+    return gunes_faktoru, f"{sanal_saat:02}:{sanal_dakika:02}"
+
+def veri_uret(gunes_faktoru=None, kapasite=MAX_GUC_KAPASITESI, cihaz=None):
+    """Tek cihazın anlık değerleri. cihaz verilirse kendi üretim sayacını kullanır."""
+    global TOPLAM_URETIM_WH
+
+    if gunes_faktoru is None:
+        gunes_faktoru, _ = gunes_hesapla()
+
     # Bulut etkisi (Ara sira gunes kapansin - %10 dalgalanma)
-    bulut = random.uniform(0.9, 1.0) 
-    
+    bulut = random.uniform(0.9, 1.0)
+
     # --- DEGERLERI HESAPLA ---
-    
+
     # GUC (Watt): Kapasite x Gunes x Bulut
-    anlik_guc_w = int(MAX_GUC_KAPASITESI * gunes_faktoru * bulut)
-    
+    anlik_guc_w = int(kapasite * gunes_faktoru * bulut)
+
     # VOLTAJ (V): 220V etrafinda hafif oynar
     voltaj = int(random.uniform(218, 235))
-    
+
     # AKIM (A): Guc / Voltaj (P=V*I)
     if voltaj > 0:
-        akim_x10 = int((anlik_guc_w / voltaj) * 10) 
+        akim_x10 = int((anlik_guc_w / voltaj) * 10)
     else:
         akim_x10 = 0
-        
-    # SICAKLIK (C): 
+
+    # SICAKLIK (C):
     # Gece soğusun (15C), Gündüz ısınsın (Maks 55C)
     if anlik_guc_w > 0:
-        sicaklik = 25 + int((anlik_guc_w / MAX_GUC_KAPASITESI) * 30)
+        sicaklik = 25 + int((anlik_guc_w / kapasite) * 30)
     else:
         sicaklik = 15 # Gece ortam sıcaklığı
-    
+
     # TOPLAM URETIM (Watt-Saat)
     # Hızlı döngü olduğu için üretimi biraz abartarak ekleyelim ki sayaç dönsün
-    TOPLAM_URETIM_WH += anlik_guc_w / 1000 
-    
-    # Sanal Saati Hesapla (Ekrana yazdırmak için)
-    sanal_saat = int(sanal_zaman // 60)
-    sanal_dakika = int(sanal_zaman % 60)
-    
-    # Listeye sanal saati de ekleyelim (Log için)
-    return [voltaj, akim_x10, anlik_guc_w, int(TOPLAM_URETIM_WH), sicaklik, f"{sanal_saat:02}:{sanal_dakika:02}"]
+    if cihaz is None:
+        TOPLAM_URETIM_WH += anlik_guc_w / 1000
+        toplam = TOPLAM_URETIM_WH
+    else:
+        cihaz.toplam_wh += anlik_guc_w / 1000
+        toplam = cihaz.toplam_wh
+
+    return [voltaj, akim_x10, anlik_guc_w, int(toplam), sicaklik]
+
+# --- SANAL CİHAZ ---
+class SanalCihaz(ModbusSlaveContext):
+    """
+    Tek slave ID'nin hafızası. Okuma isteklerine SIMULASYON ayarlarına göre
+    gecikme/timeout/düşme ekler. NoSuchSlaveException fırlatmak
+    (ignore_missing_slaves=True ile) cevabın hiç gönderilmemesini sağlar.
+    """
+    def __init__(self, slave_id, hat_kilidi=None):
+        super().__init__(hr=ModbusSequentialDataBlock(0, [0] * REGISTER_SAYISI))
+        self.slave_id = slave_id
+        self.hat_kilidi = hat_kilidi
+        # Cihazlar birbirinin kopyası olmasın: kapasite ve sayaç farklı
+        self.kapasite = int(MAX_GUC_KAPASITESI * random.uniform(0.8, 1.1))
+        self.toplam_wh = TOPLAM_URETIM_WH * random.uniform(0.5, 1.5)
+        self.hata_189 = 0
+        self.hata_193 = 0
+
+    def guncelle(self, gunes_faktoru):
+        voltaj, akim_x10, guc, toplam, sicaklik = veri_uret(gunes_faktoru, self.kapasite, self)
+        self._arizalari_guncelle()
+
+        # Eski test haritası (0-4) + collector'ın okuduğu gerçek harita
+        self.setValues(3, 0, [voltaj, akim_x10, guc, toplam & 0xFFFF, sicaklik])
+        self.setValues(3, 70, [guc, voltaj * 10, akim_x10, sicaklik])
+        self.setValues(3, 189, [(self.hata_189 >> 16) & 0xFFFF, self.hata_189 & 0xFFFF])
+        self.setValues(3, 193, [self.hata_193 & 0xFFFF])
+
+    def _arizalari_guncelle(self):
+        # Haritada tanımlı bitlerden rastgele biri açılır; açık bitler zamanla kapanır
+        for sutun, (_, fault_map) in alarm_kodlari.ALARM_REGISTERLARI.items():
+            kelime = self.hata_189 if sutun == 'hata_kodu' else self.hata_193
+            for bit in range(32):
+                if kelime >> bit & 1 and random.random() < SIMULASYON['ariza_temizlenme']:
+                    kelime &= ~(1 << bit)
+            if random.random() < SIMULASYON['ariza_olasiligi']:
+                kelime |= 1 << random.choice(list(fault_map))
+            if sutun == 'hata_kodu':
+                self.hata_189 = kelime
+            else:
+                self.hata_193 = kelime
+
+    async def _cevap_gecikmesi(self):
+        if random.random() < SIMULASYON['dusme_orani']:
+            raise NoSuchSlaveException(f"ID {self.slave_id} cevap düşürüldü")
+        gecikme = SIMULASYON['gecikme_ms'] + random.uniform(
+            -SIMULASYON['gecikme_sapma_ms'], SIMULASYON['gecikme_sapma_ms'])
+        if random.random() < SIMULASYON['timeout_orani']:
+            gecikme = SIMULASYON['timeout_sn'] * 1000
+        if gecikme > 0:
+            await asyncio.sleep(gecikme / 1000)
+
+    async def async_getValues(self, fc_as_hex, address, count=1):
+        if self.hat_kilidi is None:
+            await self._cevap_gecikmesi()
+        else:
+            # Seri hatta bir cihaz cevap verirken diğerleri bekler
+            async with self.hat_kilidi:
+                await self._cevap_gecikmesi()
+        return self.getValues(fc_as_hex, address, count)
+
+def filo_olustur():
+    """Port başına ModbusServerContext ve tüm sanal cihazların listesini kurar."""
+    contextler = {}
+    cihazlar = []
+    n = SIMULASYON['cihaz_sayisi']
+    for sira, port in enumerate(SIMULASYON['portlar']):
+        kilit = asyncio.Lock() if SIMULASYON['seri_hat'] else None
+        slaves = {}
+        ilk = sira * n + 1 if SIMULASYON['ardisik_id'] else 1
+        for slave_id in range(ilk, ilk + n):
+            cihaz = SanalCihaz(slave_id, kilit)
+            cihazlar.append(cihaz)
+            # Ölü cihazlar hafızada üretmeye devam eder ama sunucuda yoktur
+            if random.random() >= SIMULASYON['olu_cihaz_orani']:
+                slaves[slave_id] = cihaz
+        contextler[port] = ModbusServerContext(slaves=slaves, single=False)
+    return contextler, cihazlar
 
 # --- MODBUS SUNUCU GOREVI ---
-async def veri_guncelleyici(context):
-    """Bu fonksiyon her saniye arkaplanda calisip inverter hafizasini gunceller"""
+async def veri_guncelleyici(cihazlar):
+    """Bu fonksiyon her saniye arkaplanda calisip inverter hafizalarini gunceller"""
     while True:
-        veriler = veri_uret()
-        
-        # Inverter hafizasina (Holding Register) yaz
-        slave_id = 1
-        register_adresi = 0
-        
-        # Modbus'a yazilacak sayisal veriler (Son eleman string oldugu icin onu almiyoruz)
-        modbus_verisi = veriler[:5] 
-        
-        store = context[slave_id]
-        store.setValues(3, register_adresi, modbus_verisi)
-        
+        gunes_faktoru, sanal_saat = gunes_hesapla()
+        for cihaz in cihazlar:
+            cihaz.guncelle(gunes_faktoru)
+
         # Log basalim (Sanal saati de gösterelim)
-        print(f"🕒 {veriler[5]} | ☀️  Guc: {veriler[2]} W | 🌡️  Isi: {veriler[4]} C | ⚡ {veriler[0]} V")
-        
+        if SIMULASYON['log']:
+            toplam_guc = sum(c.getValues(3, 70, 1)[0] for c in cihazlar)
+            alarmli = sum(1 for c in cihazlar if c.hata_189 or c.hata_193)
+            print(f"🕒 {sanal_saat} | ☀️  Filo Gucu: {toplam_guc / 1000:.1f} kW | "
+                  f"🖥️  {len(cihazlar)} cihaz | ⚠️  Alarmlı: {alarmli}")
+
         await asyncio.sleep(1)
 
 async def sunucuyu_calistir():
-    # Hafiza olustur
-    store = ModbusSlaveContext(
-        hr=ModbusSequentialDataBlock(0, [0]*100)
-    )
-    context = ModbusServerContext(slaves=store, single=True)
+    contextler, cihazlar = filo_olustur()
 
-    print(f"✅ AKILLI INVERTER DEVREDE ({TEST_IP}:{TEST_PORT})")
+    print(f"✅ SANAL INVERTER FILOSU DEVREDE ({TEST_IP}: {', '.join(map(str, contextler))})")
+    print(f"🖥️  Port başına {SIMULASYON['cihaz_sayisi']} cihaz | "
+          f"{'Seri hat' if SIMULASYON['seri_hat'] else 'Paralel'} | "
+          f"Gecikme {SIMULASYON['gecikme_ms']}±{SIMULASYON['gecikme_sapma_ms']} ms | "
+          f"Timeout %{SIMULASYON['timeout_orani'] * 100:g} | Düşme %{SIMULASYON['dusme_orani'] * 100:g}")
     print("⏳ DÖNGÜ: 6 Dakika (16 Saat Gündüz / 8 Saat Gece)")
     print("-" * 50)
 
     # Arka plan gorevini baslat (Veri uretimi)
-    task = asyncio.create_task(veri_guncelleyici(context))
-    
-    # Serveri baslat
-    await StartAsyncTcpServer(context, address=(TEST_IP, TEST_PORT))
+    task = asyncio.create_task(veri_guncelleyici(cihazlar))
+
+    # Serverleri baslat (her port bağımsız bir gateway)
+    await asyncio.gather(*(
+        StartAsyncTcpServer(context, address=(TEST_IP, port), ignore_missing_slaves=True)
+        for port, context in contextler.items()))
+
+def argumanlari_oku(argv=None):
+    p = argparse.ArgumentParser(description="Sanal inverter filosu")
+    p.add_argument("--portlar", type=int, nargs="+", default=SIMULASYON['portlar'])
+    p.add_argument("--cihaz", type=int, default=SIMULASYON['cihaz_sayisi'], help="Port başına slave ID sayısı")
+    p.add_argument("--ardisik-id", action="store_true",
+                   help="ID'ler portlar boyunca devam etsin (collector.GATEWAYS'te ID çakışmasın)")
+    p.add_argument("--paralel", action="store_true", help="Seri hat kilidi olmadan cevapla (Modbus TCP cihaz)")
+    p.add_argument("--gecikme", type=float, default=SIMULASYON['gecikme_ms'], help="ms")
+    p.add_argument("--sapma", type=float, default=SIMULASYON['gecikme_sapma_ms'], help="ms")
+    p.add_argument("--timeout-orani", type=float, default=SIMULASYON['timeout_orani'])
+    p.add_argument("--timeout-sn", type=float, default=SIMULASYON['timeout_sn'])
+    p.add_argument("--dusme-orani", type=float, default=SIMULASYON['dusme_orani'])
+    p.add_argument("--olu-oran", type=float, default=SIMULASYON['olu_cihaz_orani'])
+    p.add_argument("--ariza", type=float, default=SIMULASYON['ariza_olasiligi'])
+    p.add_argument("--sessiz", action="store_true", help="Saniyelik özeti yazma")
+    a = p.parse_args(argv)
+    SIMULASYON.update({
+        'portlar': a.portlar, 'cihaz_sayisi': a.cihaz, 'ardisik_id': a.ardisik_id,
+        'seri_hat': not a.paralel,
+        'gecikme_ms': a.gecikme, 'gecikme_sapma_ms': a.sapma,
+        'timeout_orani': a.timeout_orani, 'timeout_sn': a.timeout_sn,
+        'dusme_orani': a.dusme_orani, 'olu_cihaz_orani': a.olu_oran,
+        'ariza_olasiligi': a.ariza, 'log': not a.sessiz,
+    })
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.ERROR)
+    # Düşürülen cevaplar pymodbus'ta "slave does not exist" hatası olarak loglanır
+    logging.getLogger("pymodbus").setLevel(logging.CRITICAL)
+    argumanlari_oku()
     try:
         if asyncio.get_event_loop_policy().__class__.__name__ == 'WindowsProactorEventLoopPolicy':
              asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
         asyncio.run(sunucuyu_calistir())
     except KeyboardInterrupt:
-        print("\nKapatildi.")
\ No newline at end of file
+        print("\nKapatildi.")
@@ -0,0 +1,83 @@
+"""
+Ölçüm sıkıştırma (deadband) aşaması.
+
+read_device ile veritabanı arasında durur: bir cihazın yeni ölçümü, o cihaz
+için EN SON YAZILAN ölçümden eşikleri aşacak kadar farklı değilse yazılmaz.
+    - Her büyüklük için mutlak ve yüzde eşik (büyük olan geçerli)
+    - Alarm kelimelerindeki her değişim (her bit geçişi) yazılır
+    - kalp_atisi saniyedir yazılmamışsa değer aynı olsa da yazılır
+
+Okuyucular seriyi "adım tutarak" geri kurar: bir değer, cihazın bir sonraki
+yazılan satırına kadar geçerlidir (veritabani.adimli_seri; özet tabloları da
+aynı kuralla zaman ağırlıklı ortalama tutar). kalp_atisi'ndan
+(+ okuma aralığı) uzun boşluk "cihaz cevap vermedi" demektir, üzerinden taşınmaz.
+
+Karşılaştırma hep son yazılan değere yapıldığı için yavaş kayma birikip
+kaybolmaz; eşik kadar kaydığında yeni satır yazılır.
+"""
+from datetime import datetime
+
+# --- SIKIŞTIRMA AYARLARI ---
+SIKISTIRMA = {
+    'acik': True,
+    'esikler': {             # büyüklük: (mutlak, yüzde). None: o eşik kullanılmaz
+        'guc': (10, 1.0),        # W
+        'voltaj': (0.5, 0.2),    # V
+        'akim': (0.1, 1.0),      # A
+        'sicaklik': (1, None),   # C
+    },
+    'kalp_atisi': 60,        # sn; değişmese de en az bu aralıkla bir satır yazılır
+    # Okuyucuların bir değeri en fazla taşıdığı süre: kalp_atisi + en yavaş okuma
+    # aralığı (zamanlayici.ZAMANLAMA['yavas']). Daha uzun boşluk = veri yok.
+    'tutma_suresi': 120,
+}
+ALARM_ALANLARI = ('hata_kodu', 'hata_kodu_193')
+
+def esik_asildi_mi(yeni, eski, mutlak, yuzde):
+    esik = mutlak or 0
+    if yuzde is not None:
+        esik = max(esik, abs(eski) * yuzde / 100)
+    return abs(yeni - eski) > esik
+
+class Sikistirici:
+    """
+    Cihaz başına son yazılan ölçümü tutar. yazilmali() sadece karar verir;
+    ölçüm gerçekten yazıcı kuyruğuna girdiyse kaydet() ile son yazılan olur
+    (kuyruk doluyken düşen ölçüm sonrakilerin karşılaştırma tabanı olmasın).
+    """
+
+    def __init__(self, ayarlar=None):
+        self.ayarlar = ayarlar or SIKISTIRMA
+        self.son_yazilan = {}   # slave_id -> data
+        self.gelen = 0
+        self.atlanan = 0
+
+    def yazilmali(self, slave_id, data):
+        self.gelen += 1
+        if not self.ayarlar['acik']:
+            return True
+        onceki = self.son_yazilan.get(slave_id)
+        if onceki is None or self._farkli(data, onceki, data.get('timestamp') or datetime.now()):
+            return True
+        self.atlanan += 1
+        return False
+
+    def kaydet(self, slave_id, data):
+        """Kuyruğa giren ölçümü bu cihazın karşılaştırma tabanı yapar."""
+        if self.ayarlar['acik']:
+            self.son_yazilan[slave_id] = dict(data, timestamp=data.get('timestamp') or datetime.now())
+
+    def _farkli(self, data, onceki, zaman):
+        if (zaman - onceki['timestamp']).total_seconds() >= self.ayarlar['kalp_atisi']:
+            return True
+        if any(data.get(a, 0) != onceki.get(a, 0) for a in ALARM_ALANLARI):
+            return True
+        for alan, (mutlak, yuzde) in self.ayarlar['esikler'].items():
+            if alan in data and esik_asildi_mi(data[alan], onceki.get(alan, 0), mutlak, yuzde):
+                return True
+        return False
+
+    def oran(self):
+        """Yazılmayan ölçüm oranı (0..1)"""
+        return self.atlanan / self.gelen if self.gelen else 0.0
+
@@ -0,0 +1,159 @@
+"""
+Çok süreçli toplama (python collector.py --supervizor).
+
+- Cihaz listesi parçalara bölünür: seri hat (RS485) gateway'leri tek parça
+  kalır (aynı hatta iki süreç istek gönderemez), Modbus TCP gateway'leri
+  PARCA_BOYUTU'luk ID aralıklarına bölünür. Her parça ayrı bir süreçte
+  collector.toplama_dongusu ile okunur.
+- Toplayıcılar ölçümleri ve alarm olaylarını ortak multiprocessing kuyruğuna
+  bırakır; diske sadece TEK yazıcı süreç yazar (SQLite kilit yarışı olmaz).
+  Bakım (saklama/arşiv/vacuum) ve anomali analizi de yazıcı süreçte çalışır.
+- Çöken süreç artan beklemeyle (en fazla YENIDEN_BASLATMA_MAX sn) yeniden
+  başlatılır. Yazıcı çökerse kuyruk supervizörde durduğu için bekleyen kayıtlar kaybolmaz.
+- Metrikler: yazıcı METRIK['port'], toplayıcı i METRIK['port'] + 1 + i.
+
+veritabani'nın okuyucu fonksiyonları değişmez; panel aynı DB'yi okur.
+"""
+import time
+import signal
+import asyncio
+import logging
+import multiprocessing as mp
+import veritabani
+import metrikler
+import sikistirma
+import alarm_kodlari
+import anomali
+import bakim
+import collector
+
+# --- SUPERVİZÖR AYARLARI ---
+PARCA_BOYUTU = 50             # Modbus TCP gateway'lerinde süreç başına en fazla cihaz
+YENIDEN_BASLATMA_MAX = 60     # Art arda çöken süreç için en uzun bekleme (sn)
+SAGLIKLI_SURE = 300           # Bu kadar sn ayakta kalan sürecin çökme sayacı sıfırlanır
+KONTROL_ARALIGI = 1.0         # Süreçlerin yoklanma aralığı (sn)
+
+def parcala(gateways, parca_boyutu=None):
+    """GATEWAYS listesini süreç başına bir gateway listesine böler: [[gw, ...], ...]"""
+    parca_boyutu = parca_boyutu or PARCA_BOYUTU
+    parcalar = []
+    for gw in gateways:
+        if gw.get('seri_hat', True):
+            parcalar.append([gw])
+            continue
+        ids = gw['slave_ids']
+        for i in range(0, len(ids), parca_boyutu):
+            parcalar.append([dict(gw, slave_ids=ids[i:i + parca_boyutu])])
+    return parcalar
+
+def _sonlandir(signum, frame):
+    # Normal çıkış: multiprocessing kuyruğunun tamponu kapanırken boşaltılır
+    raise SystemExit(0)
+
+def _cocuk_sinyalleri():
+    # Ctrl+C'yi sadece supervizör işler; çocuklar SIGTERM ile düzenli kapatılır
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _sonlandir)
+
+def toplayici_sureci(sira, gateways, kuyruk):
+    """Bir parçanın cihazlarını okur; diske yazmaz, sadece ortak kuyruğa bırakır."""
+    _cocuk_sinyalleri()
+    logging.basicConfig(level=logging.ERROR)
+    metrikler.METRIK['tablo'] = False  # Tabloya yazmak yazıcı sürecin işi
+    metrikler.sunucu_baslat(metrikler.METRIK['port'] + 1 + sira if metrikler.METRIK['port'] else 0)
+
+    yazici = veritabani.VeriYazici(sikistirici=sikistirma.Sikistirici(), kuyruk=kuyruk)
+    izleyici = alarm_kodlari.AlarmIzleyici(veritabani.aktif_alarmlar())
+    asyncio.run(collector.toplama_dongusu(gateways, yazici, izleyici, etiket=f"TOPLAYICI {sira}"))
+
+def yazici_sureci(kuyruk, dur):
+    """Ortak kuyruğu tek bağlantıyla diske yazar; dur set edilince kuyruğu boşaltıp çıkar."""
+    _cocuk_sinyalleri()
+    logging.basicConfig(level=logging.ERROR)
+    metrikler.baslat()
+    bakim.bakim_baslat()
+    anomali.anomali_baslat()
+    yazici = veritabani.VeriYazici(kuyruk=kuyruk)
+    yazici.calistir(dur)
+    print(f"💾 Yazıcı kapandı ({yazici.yazilan} ölçüm yazıldı)")
+
+class _Surec:
+    """Yeniden başlatılabilir süreç tanımı ve çökme geçmişi."""
+
+    def __init__(self, ad, hedef, argumanlar):
+        self.ad = ad
+        self.hedef = hedef
+        self.argumanlar = argumanlar
+        self.surec = None
+        self.cokme = 0
+        self.baslama = 0.0
+        self.sonraki_deneme = 0.0
+
+    def baslat(self):
+        self.surec = mp.Process(target=self.hedef, args=self.argumanlar, name=self.ad, daemon=True)
+        self.surec.start()
+        self.baslama = time.monotonic()
+
+    def kontrol(self, simdi):
+        """Süreç ölmüşse beklemeyi hesaplar, zamanı gelince yeniden başlatır."""
+        if self.surec.is_alive():
+            if self.cokme and simdi - self.baslama > SAGLIKLI_SURE:
+                self.cokme = 0
+            return
+        if self.sonraki_deneme == 0.0:
+            self.cokme += 1
+            bekleme = min(YENIDEN_BASLATMA_MAX, 2 ** (self.cokme - 1))
+            self.sonraki_deneme = simdi + bekleme
+            logging.error(f"{self.ad} çöktü (çıkış kodu {self.surec.exitcode}), {bekleme} sn sonra yeniden başlatılacak")
+        elif simdi >= self.sonraki_deneme:
+            self.sonraki_deneme = 0.0
+            print(f"🔁 {self.ad} yeniden başlatılıyor ({self.cokme}. kez)")
+            self.baslat()
+
+def supervizor_calistir(gateways=None):
+    gateways = gateways or collector.GATEWAYS
+    # Tüm toplayıcılar tek slave_id uzayına yazar: çakışan ID başlatılmaz
+    collector.gateway_kontrol(gateways)
+    veritabani.init_db()
+
+    kuyruk = mp.Queue(maxsize=veritabani.KUYRUK_KAPASITESI)
+    dur = mp.Event()
+    yazici = _Surec("Yazıcı", yazici_sureci, (kuyruk, dur))
+    toplayicilar = [_Surec(f"Toplayıcı {i}", toplayici_sureci, (i, parca, kuyruk))
+                    for i, parca in enumerate(parcala(gateways))]
+
+    print("-" * 50)
+    print(f"🧭 SUPERVİZÖR: {len(toplayicilar)} toplayıcı süreç + 1 yazıcı süreç")
+    for i, parca in enumerate(parcala(gateways)):
+        print(f"   {i}: " + ", ".join(f"{collector.hat_adi(gw)} ({len(gw['slave_ids'])} cihaz)" for gw in parca))
+    print("-" * 50)
+
+    # docker stop (SIGTERM) da Ctrl+C gibi düzenli kapatma yapsın
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    yazici.baslat()
+    for t in toplayicilar:
+        t.baslat()
+    try:
+        while True:
+            time.sleep(KONTROL_ARALIGI)
+            simdi = time.monotonic()
+            for s in (yazici, *toplayicilar):
+                s.kontrol(simdi)
+    except KeyboardInterrupt:
+        print("\n⏹️ Kapatılıyor: toplayıcılar durduruluyor, kuyruk diske yazılıyor...")
+    finally:
+        for t in toplayicilar:
+            if t.surec.is_alive():
+                t.surec.terminate()
+        for t in toplayicilar:
+            t.surec.join(5)
+        dur.set()
+        if not yazici.surec.is_alive():
+            # Yazıcı tam o an çökmüşse kuyruğu boşaltmak için son bir kez aç
+            yazici.baslat()
+        yazici.surec.join(30)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    supervizor_calistir()
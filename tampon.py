@@ -0,0 +1,131 @@
+"""
+Diske yazılamayan kayıtlar için kalıcı taşma tamponu (store-and-forward).
+
+VeriYazici bir paketi SQLite'a yazamazsa (DB kilitli, disk dolu, volume
+yavaş/kopuk) paketi kaybetmek yerine buraya ekler; DB düzelince tampondaki
+kayıtlar sırayla, paket paket geri yazılır. Tampon boşalana kadar yeni
+paketler de tampona eklenir, böylece kayıtların yazılma sırası korunur.
+
+Dosya sabit boyutlu bir halka (ring) olarak mmap ile açılır:
+    [başlık 48 byte][veri bölgesi: kapasite byte]
+    kayıt = 4 byte uzunluk + pickle; uzunluk 0 = "başa dön" işareti
+Başlık (bas, son, dolu, adet) veriden sonra güncellenir ve flush edilir;
+yarıda kesilen bir ekleme sadece o paketi kaybettirir, dosyayı bozmaz.
+Tampon doluysa yeni kayıt eklenmez (eskiler korunur).
+"""
+import os
+import mmap
+import struct
+import pickle
+
+SIHIR = b"TCPTMP01"
+BASLIK = struct.Struct("<8sQQQQQ")   # sihir, kapasite, bas, son, dolu (byte), adet
+UZUNLUK = struct.Struct("<I")
+
+class TamponDolu(Exception):
+    pass
+
+class DiskTamponu:
+    """
+    Tek iş parçacığından (yazıcı) kullanılır.
+        t.ekle([kayit, ...])          -> dosyaya kalıcı ekler
+        kayitlar, imlec = t.oku(500)  -> en eski kayıtlar (tampondan silinmez)
+        t.onayla(imlec)               -> DB'ye yazıldıktan sonra tampondan düşer
+    """
+
+    def __init__(self, yol, kapasite):
+        self.yol = yol
+        klasor = os.path.dirname(yol)
+        if klasor:
+            os.makedirs(klasor, exist_ok=True)
+
+        yeni = not os.path.exists(yol) or os.path.getsize(yol) < BASLIK.size
+        if not yeni:
+            with open(yol, "rb") as f:
+                sihir, eski_kapasite, _, _, _, adet = BASLIK.unpack(f.read(BASLIK.size))
+            if sihir != SIHIR:
+                raise ValueError(f"{yol} bir taşma tamponu dosyası değil")
+            if adet:
+                kapasite = eski_kapasite   # Bekleyen kayıt varken boyut değiştirilmez
+            elif eski_kapasite != kapasite:
+                yeni = True
+
+        self._dosya = open(yol, "w+b" if yeni else "r+b")
+        if yeni:
+            self._dosya.truncate(BASLIK.size + kapasite)
+        self._mm = mmap.mmap(self._dosya.fileno(), BASLIK.size + kapasite)
+        if yeni:
+            self.kapasite, self.bas, self.son, self.dolu, self.adet = kapasite, 0, 0, 0, 0
+            self._baslik_yaz()
+        else:
+            _, self.kapasite, self.bas, self.son, self.dolu, self.adet = BASLIK.unpack(self._mm[:BASLIK.size])
+
+    def _baslik_yaz(self):
+        self._mm[:BASLIK.size] = BASLIK.pack(SIHIR, self.kapasite, self.bas, self.son, self.dolu, self.adet)
+        self._mm.flush()
+
+    def _yaz(self, konum, veri):
+        bas = BASLIK.size + konum
+        self._mm[bas:bas + len(veri)] = veri
+
+    def _kayit_ekle(self, govde):
+        gerekli = UZUNLUK.size + len(govde)
+        if gerekli > self.kapasite:
+            raise TamponDolu(f"kayıt ({gerekli} byte) tampondan büyük")
+        son, dolu = self.son, self.dolu
+        if son + gerekli > self.kapasite:
+            # Sona sığmıyor: kalan kısım boşa harcanır, başa dönülür
+            if self.kapasite - son >= UZUNLUK.size:
+                self._yaz(son, UZUNLUK.pack(0))
+            dolu += self.kapasite - son
+            son = 0
+        if dolu + gerekli > self.kapasite:
+            raise TamponDolu("tampon dolu")
+        self._yaz(son, UZUNLUK.pack(len(govde)) + govde)
+        self.son, self.dolu, self.adet = son + gerekli, dolu + gerekli, self.adet + 1
+
+    def ekle(self, kayitlar):
+        """Kayıtları sırayla ekler, eklenen sayısını döner (dolunca kalanlar eklenmez)."""
+        eklenen = 0
+        for kayit in kayitlar:
+            try:
+                self._kayit_ekle(pickle.dumps(kayit, protocol=pickle.HIGHEST_PROTOCOL))
+            except TamponDolu:
+                break
+            eklenen += 1
+        self._baslik_yaz()
+        return eklenen
+
+    def oku(self, en_fazla):
+        """En eski en_fazla kaydı döner: (kayitlar, imlec). Tampondan düşmek için onayla(imlec)."""
+        kayitlar = []
+        konum, serbest = self.bas, 0
+        while len(kayitlar) < min(en_fazla, self.adet):
+            kalan = self.kapasite - konum
+            uzunluk = UZUNLUK.unpack(self._mm[BASLIK.size + konum:BASLIK.size + konum + UZUNLUK.size])[0] \
+                if kalan >= UZUNLUK.size else 0
+            if uzunluk == 0:
+                serbest += kalan
+                konum = 0
+                continue
+            bas = BASLIK.size + konum + UZUNLUK.size
+            kayitlar.append(pickle.loads(self._mm[bas:bas + uzunluk]))
+            konum += UZUNLUK.size + uzunluk
+            serbest += UZUNLUK.size + uzunluk
+        return kayitlar, (konum, serbest, len(kayitlar))
+
+    def onayla(self, imlec):
+        konum, serbest, adet = imlec
+        self.bas, self.dolu, self.adet = konum, self.dolu - serbest, self.adet - adet
+        if self.adet == 0:
+            self.bas = self.son = self.dolu = 0
+        self._baslik_yaz()
+
+    def doluluk(self):
+        """0..1"""
+        return self.dolu / self.kapasite
+
+    def kapat(self):
+        self._mm.flush()
+        self._mm.close()
+        self._dosya.close()
@@ -1,39 +1,29 @@
 import time
-from pymodbus.client import ModbusTcpClient
+import kesif
 
 # AYARLAR
 TARGET_IP = "10.35.14.10"
 PORT = 502
-TARAMA_ARALIGI = range(1, 10) # 1'den 9'a kadar olan ID'leri tara
+TARAMA_ARALIGI = range(1, 248) # Tüm Modbus adres uzayı (1-247)
+SERI_HAT = True                # RS485 gateway: istekler sırayla (False: paralel bağlantılar)
 
 def cihazlari_tara():
     print(f"[*] Modbus Agi Taraniyor ({TARGET_IP})...")
     print("-" * 40)
-    
-    client = ModbusTcpClient(TARGET_IP, port=PORT, timeout=0.5) # Kisa timeout
-    client.connect()
 
-    bulunanlar = []
+    # Tarama kesif.py ile: cevap veren ID'ler register haritasıyla yoklanır,
+    # sonuç kesif tablosuna yazılır (python collector.py --async --kesif)
+    gateway = {'ip': TARGET_IP, 'port': PORT, 'seri_hat': SERI_HAT}
+    bas = time.perf_counter()
+    bulunanlar = kesif.kesfet([gateway], TARAMA_ARALIGI)[f"{TARGET_IP}:{PORT}"]
 
-    for slave_id in TARAMA_ARALIGI:
-        print(f"Sorgulaniyor: ID {slave_id}...", end=" ")
-        
-        # Basit bir okuma denemesi (Orn: Voltaj adresi 71)
-        try:
-            rr = client.read_holding_registers(71, count=1, slave=slave_id)
-            if not rr.isError():
-                print("[+] BULUNDU!")
-                bulunanlar.append(slave_id)
-            else:
-                print("[-] Cevap Yok")
-        except Exception as e:
-            print(f"Hata: {e}")
-            
-    client.close()
-    
     print("-" * 40)
-    print(f"[SONUC] Toplam {len(bulunanlar)} cihaz bulundu.")
-    print(f"[LISTE] Bulunan ID'ler: {bulunanlar}")
+    if bulunanlar is None:
+        print(f"[SONUC] {TARGET_IP}:{PORT} adresine baglanilamadi.")
+        return
+    print(f"[SONUC] Toplam {len(bulunanlar)} cihaz bulundu ({time.perf_counter() - bas:.1f} sn).")
+    print(f"[LISTE] Bulunan ID'ler: {[c['slave_id'] for c in bulunanlar]}")
+    print(f"[UYUMLU] Collector'a uygun ID'ler: {[c['slave_id'] for c in bulunanlar if c['uyumlu']]}")
 
 if __name__ == "__main__":
-    cihazlari_tara()
\ No newline at end of file
+    cihazlari_tara()
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Modüller depo kökünde düz duruyor (paket değil)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import veritabani
+
+
+@pytest.fixture
+def gecici_db(tmp_path, monkeypatch):
+    """init_db ile kurulmuş boş bir veritabanı; DB_NAME test süresince ona yönlenir."""
+    yol = str(tmp_path / "solar_log.db")
+    monkeypatch.setattr(veritabani, "DB_NAME", yol)
+    veritabani.init_db()
+    return yol
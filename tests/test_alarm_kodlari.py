@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+import alarm_kodlari
+from alarm_kodlari import bitleri_ac
+
+
+def test_bitleri_ac_bit_sirasi():
+    bitler = bitleri_ac([0, 1, 1 << 5, (1 << 31) | 2, 0xFFFFFFFF])
+    assert bitler.shape == (5, 32)
+    assert bitler.dtype == bool
+    assert [np.flatnonzero(satir).tolist() for satir in bitler[:4]] == [[], [0], [5], [1, 31]]
+    assert bitler[4].all()
+
+
+def test_bitleri_ac_dongulu_cozumle_ayni():
+    kelimeler = np.random.default_rng(1).integers(0, 2 ** 32, 1000)
+    beklenen = np.array([[(int(k) >> b) & 1 for b in range(32)] for k in kelimeler], dtype=bool)
+    assert (bitleri_ac(kelimeler) == beklenen).all()
+
+
+def test_hata_tablosu_sadece_aktif_bitler():
+    df = pd.DataFrame({
+        'slave_id': [1, 2, 3],
+        'zaman': pd.to_datetime(['2026-01-15 10:00', '2026-01-15 10:00', '2026-01-15 10:01']),
+        'hata_kodu': [0, (1 << 1) | (1 << 23), 0],
+        'hata_kodu_193': [1 << 11, 0, 0],
+    })
+    tablo = alarm_kodlari.hata_tablosu(df).sort_values(['slave_id', 'register', 'bit'])
+    assert tablo[['slave_id', 'register', 'bit']].values.tolist() == [[1, 193, 11], [2, 189, 1], [2, 189, 23]]
+    assert tablo['mesaj'].tolist() == [
+        "PV Overvoltage[12]", "DC Overcurrent Fault [1-2]", "DC Overcurrent Fault [12-2]"]
+
+
+def test_alarm_olaylari_baslangic_bitis_eslesir():
+    zaman = pd.date_range('2026-01-15 10:00', periods=6, freq='2s')
+    df = pd.DataFrame({
+        'slave_id': [7] * 6,
+        'zaman': zaman,
+        'hata_kodu': [0, 4, 4, 0, 4, 4],
+        'hata_kodu_193': [0, 0, 0, 0, 0, 0],
+    })
+    olaylar = alarm_kodlari.alarm_olaylari(df)
+    assert olaylar[['register', 'bit']].values.tolist() == [[189, 2], [189, 2]]
+    assert olaylar['baslangic'].tolist() == [zaman[1], zaman[4]]
+    assert olaylar['bitis'].iloc[0] == zaman[3]
+    assert pd.isna(olaylar['bitis'].iloc[1])   # hâlâ aktif
+
+
+def test_alarm_izleyici_sadece_degisen_bitler():
+    izleyici = alarm_kodlari.AlarmIzleyici()
+    zaman = pd.Timestamp('2026-01-15 10:00').to_pydatetime()
+
+    assert izleyici.guncelle(1, {'hata_kodu': 0, 'hata_kodu_193': 0}, zaman) == []
+    olaylar = izleyici.guncelle(1, {'hata_kodu': 0b101, 'hata_kodu_193': 0}, zaman)
+    assert [(o['tur'], o['register'], o['bit']) for o in olaylar] == [('baslangic', 189, 0), ('baslangic', 189, 2)]
+    # Aynı kelime tekrar okununca olay yok
+    assert izleyici.guncelle(1, {'hata_kodu': 0b101, 'hata_kodu_193': 0}, zaman) == []
+    olaylar = izleyici.guncelle(1, {'hata_kodu': 0b100, 'hata_kodu_193': 1 << 3}, zaman)
+    assert [(o['tur'], o['register'], o['bit']) for o in olaylar] == [('bitis', 189, 0), ('baslangic', 193, 3)]
+    # Cihazlar birbirinden bağımsız izlenir
+    assert [o['slave_id'] for o in izleyici.guncelle(2, {'hata_kodu': 1}, zaman)] == [2]
+
+
+def test_alarm_izleyici_acik_alarmlarla_baslar():
+    # Yeniden başlatmada veritabani.aktif_alarmlar() ile gelen açık arızalar tekrar başlamaz
+    izleyici = alarm_kodlari.AlarmIzleyici([(1, 189, 2, '2026-01-15 09:00:00'), (1, 193, 0, '2026-01-15 09:00:00')])
+    assert izleyici.guncelle(1, {'hata_kodu': 1 << 2, 'hata_kodu_193': 1}) == []
+    olaylar = izleyici.guncelle(1, {'hata_kodu': 0, 'hata_kodu_193': 1})
+    assert [(o['tur'], o['register'], o['bit']) for o in olaylar] == [('bitis', 189, 2)]
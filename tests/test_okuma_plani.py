@@ -0,0 +1,83 @@
+import okuma_plani
+from okuma_plani import plan_olustur, plani_oku
+
+# collector.okuma_alanlari ile aynı düzen: telemetri 70-73, alarm kelimeleri 189 (32-bit) ve 193
+TELEMETRI = [
+    {'key': 'guc', 'addr': 70, 'scale': 1.0, 'zorunlu': True},
+    {'key': 'voltaj', 'addr': 71, 'scale': 0.1, 'zorunlu': True},
+    {'key': 'akim', 'addr': 72, 'scale': 0.1, 'zorunlu': True},
+    {'key': 'sicaklik', 'addr': 73, 'scale': 1.0, 'zorunlu': True},
+]
+ALARMLAR = [
+    {'key': 'hata_kodu', 'addr': 189, 'count': 2},
+    {'key': 'hata_kodu_193', 'addr': 193, 'count': 1},
+]
+
+
+class Cevap:
+    def __init__(self, registers=None, exception_code=None):
+        self.registers = registers
+        self.exception_code = exception_code
+
+    def isError(self):
+        return self.exception_code is not None
+
+
+def _bloklar(plan):
+    return [(b['addr'], b['count'], [a['key'] for a in b['alanlar']]) for b in plan]
+
+
+def test_bitisik_ve_yakin_alanlar_tek_blokta():
+    plan = plan_olustur(TELEMETRI + ALARMLAR)
+    assert _bloklar(plan) == [
+        (70, 4, ['guc', 'voltaj', 'akim', 'sicaklik']),
+        (189, 5, ['hata_kodu', 'hata_kodu_193']),   # 191-192 boşluğu birleştirilir
+    ]
+
+
+def test_bosluk_esigi_asilinca_yeni_blok():
+    plan = plan_olustur(ALARMLAR, max_bosluk=1)
+    assert _bloklar(plan) == [(189, 2, ['hata_kodu']), (193, 1, ['hata_kodu_193'])]
+
+
+def test_blok_boyu_max_blok_ile_sinirli():
+    alanlar = [{'key': 'a', 'addr': 0, 'count': 2}, {'key': 'b', 'addr': 124, 'count': 2}]
+    assert _bloklar(plan_olustur(alanlar, max_bosluk=200)) == [(0, 2, ['a']), (124, 2, ['b'])]
+    assert _bloklar(plan_olustur(alanlar, max_bosluk=200, max_blok=126)) == [(0, 126, ['a', 'b'])]
+
+
+def test_zorunlu_bloklar_once_okunur():
+    alanlar = [{'key': 'bilgi', 'addr': 10}, {'key': 'guc', 'addr': 70, 'zorunlu': True}]
+    assert [b['addr'] for b in plan_olustur(alanlar)] == [70, 10]
+
+
+def test_blok_coz_32_bit_ve_carpan():
+    blok = plan_olustur(TELEMETRI + ALARMLAR)[1]
+    assert okuma_plani.blok_coz(blok, [0x0001, 0x0002, 0, 0, 7]) == {'hata_kodu': 0x10002, 'hata_kodu_193': 7}
+    blok = plan_olustur(TELEMETRI)[0]
+    assert okuma_plani.blok_coz(blok, [1500, 2301, 65, 41]) == {
+        'guc': 1500.0, 'voltaj': 2301 * 0.1, 'akim': 65 * 0.1, 'sicaklik': 41.0}
+
+
+def test_adres_hatasinda_alanlar_tek_tek_okunur():
+    istekler = []
+
+    def oku(addr, count):
+        istekler.append((addr, count))
+        if addr == 189 and count == 5:
+            return Cevap(exception_code=okuma_plani.ADRES_HATASI)
+        if addr == 193:
+            return Cevap(exception_code=okuma_plani.ADRES_HATASI)   # cihazda 193 yok
+        return Cevap(list(range(1, count + 1)))
+
+    degerler = plani_oku(oku, plan_olustur(TELEMETRI + ALARMLAR))
+    assert istekler == [(70, 4), (189, 5), (189, 2), (193, 1)]
+    assert degerler['hata_kodu'] == (1 << 16) | 2
+    assert degerler['hata_kodu_193'] == 0   # okunamayan zorunlu olmayan alan 0 sayılır
+
+
+def test_zorunlu_alan_okunamazsa_cihaz_cevapsiz():
+    def oku(addr, count):
+        return Cevap(exception_code=4)
+
+    assert plani_oku(oku, plan_olustur(TELEMETRI + ALARMLAR)) is None
@@ -0,0 +1,100 @@
+import random
+import shutil
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import veritabani
+
+TABLOLAR = [tablo for tablo, _ in veritabani.OZET_TABLOLARI] + ['son_durum']
+
+
+def _satirlar(cihaz=5, adet=300, tohum=7):
+    # Cihaz başına artan zaman: düzenli okumalar, tutma_suresi'nden uzun boşluklar,
+    # ms yuvarlamasında saniye değiştiren (.9996) kesirler ve gece yarısı geçişi
+    rnd = random.Random(tohum)
+    bas = datetime(2026, 1, 14, 23, 40)
+    satirlar = []
+    for slave_id in range(1, cihaz + 1):
+        t = bas
+        for _ in range(adet):
+            t += timedelta(seconds=rnd.choice([1, 2, 2, 2, 7, 61, 150, 900]))
+            zaman = t + timedelta(microseconds=rnd.choice([0, 999600, rnd.randrange(10 ** 6)]))
+            satirlar.append((slave_id, zaman.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                             rnd.uniform(0, 5000), rnd.uniform(218, 235), rnd.uniform(0, 20),
+                             rnd.randint(15, 55), rnd.choice([0, 0, 0, 1 << 3, 1 << 20]), rnd.choice([0, 2])))
+    # Yazıcı turları gibi: zaman sırasında, her pakette birçok cihaz
+    return sorted(satirlar, key=lambda r: r[1])
+
+
+def _tablo(yol, tablo):
+    conn = sqlite3.connect(yol)
+    rows = conn.execute(f"SELECT * FROM {tablo} ORDER BY 1, 2").fetchall()
+    conn.close()
+    return rows
+
+
+def _geri_doldur(yol, tmp_path, monkeypatch):
+    # Aynı ham veriden özetleri ve son_durum'u init_db'nin SQL doldurmasıyla yeniden kurar
+    kopya = str(tmp_path / "doldurma.db")
+    shutil.copy(yol, kopya)
+    conn = sqlite3.connect(kopya)
+    for tablo in TABLOLAR:
+        conn.execute(f"DROP TABLE {tablo}")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(veritabani, "DB_NAME", kopya)
+    veritabani.init_db()
+    return kopya
+
+
+def _esit(a, b):
+    assert len(a) == len(b)
+    for satir_a, satir_b in zip(a, b):
+        assert satir_a == pytest.approx(satir_b, rel=1e-9, abs=1e-6)
+
+
+def test_paket_yazimi_geri_doldurmayla_ayni(gecici_db, tmp_path, monkeypatch):
+    satirlar = _satirlar()
+    conn = veritabani.baglanti_ac(gecici_db)
+    for i in range(0, len(satirlar), 137):
+        veritabani.veri_ekle_toplu(satirlar[i:i + 137], conn)
+    conn.close()
+
+    kopya = _geri_doldur(gecici_db, tmp_path, monkeypatch)
+    for tablo in TABLOLAR:
+        _esit(_tablo(gecici_db, tablo), _tablo(kopya, tablo))
+
+
+def test_tek_satir_yazimi_geri_doldurmayla_ayni(gecici_db, tmp_path, monkeypatch):
+    for slave_id, zaman, guc, voltaj, akim, sicaklik, hk, hk_193 in _satirlar(cihaz=2, adet=60, tohum=3):
+        veritabani.veri_ekle(slave_id, {
+            'guc': guc, 'voltaj': voltaj, 'akim': akim, 'sicaklik': sicaklik,
+            'hata_kodu': hk, 'hata_kodu_193': hk_193, 'timestamp': datetime.fromisoformat(zaman)})
+
+    kopya = _geri_doldur(gecici_db, tmp_path, monkeypatch)
+    for tablo in TABLOLAR:
+        _esit(_tablo(gecici_db, tablo), _tablo(kopya, tablo))
+
+
+def test_gec_gelen_paket_son_durumu_geri_almaz(gecici_db):
+    veritabani.veri_ekle_toplu([(1, '2026-01-15 10:00:00.000000', 100.0, 230.0, 1.0, 30, 0, 0)])
+    # Sırası bozulmuş eski satır: kendi kovasına girer, son_durum yeni satırda kalır
+    veritabani.veri_ekle_toplu([(1, '2026-01-15 09:59:00.000000', 50.0, 229.0, 0.5, 29, 4, 0)])
+
+    assert _tablo(gecici_db, 'son_durum') == [(1, '2026-01-15 10:00:00.000000', 100.0, 230.0, 1.0, 30.0, 0, 0)]
+    conn = sqlite3.connect(gecici_db)
+    assert conn.execute("SELECT SUM(adet), MAX(hata_kodu), MIN(guc_min) FROM olcumler_1dk").fetchone() == (2, 4, 50.0)
+    conn.close()
+
+
+def test_init_db_eski_triggerlari_kaldirir(gecici_db):
+    conn = sqlite3.connect(gecici_db)
+    conn.execute("CREATE TRIGGER trg_son_durum AFTER INSERT ON olcumler BEGIN SELECT 1; END")
+    conn.commit()
+    conn.close()
+    veritabani.init_db()
+    conn = sqlite3.connect(gecici_db)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall() == []
+    conn.close()
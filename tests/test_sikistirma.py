@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import sikistirma
+from sikistirma import Sikistirici
+
+T0 = datetime(2026, 1, 15, 12, 0)
+
+
+def _olcum(saniye, guc=1000.0, voltaj=230.0, akim=4.3, sicaklik=40, hata_kodu=0):
+    return {'guc': guc, 'voltaj': voltaj, 'akim': akim, 'sicaklik': sicaklik,
+            'hata_kodu': hata_kodu, 'hata_kodu_193': 0, 'timestamp': T0 + timedelta(seconds=saniye)}
+
+
+def _yaz(s, slave_id, data):
+    # Yazıcının yaptığı gibi: yazılacaksa kuyruğa girdiği varsayılıp taban yapılır
+    if s.yazilmali(slave_id, data):
+        s.kaydet(slave_id, data)
+        return True
+    return False
+
+
+def test_ilk_olcum_her_zaman_yazilir():
+    assert Sikistirici().yazilmali(1, _olcum(0))
+
+
+def test_esik_alti_atlanir_ustu_yazilir():
+    s = Sikistirici()
+    _yaz(s, 1, _olcum(0))
+    assert not _yaz(s, 1, _olcum(2, guc=1009))       # guc eşiği: max(10 W, %1) = 10 W
+    assert _yaz(s, 1, _olcum(4, guc=1011))
+    assert not _yaz(s, 1, _olcum(6, guc=1011, voltaj=230.4))   # voltaj: max(0.5 V, %0.2) = 0.5 V
+    assert _yaz(s, 1, _olcum(8, guc=1011, sicaklik=41.5))
+    assert s.oran() == 2 / 5
+
+
+def test_yuzde_esigi_buyuk_degerde_gecerli():
+    s = Sikistirici()
+    _yaz(s, 1, _olcum(0, guc=5000))
+    assert not _yaz(s, 1, _olcum(2, guc=5049))   # %1 = 50 W > 10 W
+    assert _yaz(s, 1, _olcum(4, guc=5051))
+
+
+def test_yavas_kayma_son_yazilana_gore_birikir():
+    s = Sikistirici()
+    _yaz(s, 1, _olcum(0, guc=1000))
+    yazilan = [_yaz(s, 1, _olcum(2 * i, guc=1000 + 3 * i)) for i in range(1, 5)]
+    assert yazilan == [False, False, False, True]   # 12 W kayınca yazılır
+
+
+def test_alarm_bit_degisimi_her_zaman_yazilir():
+    s = Sikistirici()
+    _yaz(s, 1, _olcum(0))
+    assert _yaz(s, 1, _olcum(2, hata_kodu=1 << 4))
+    assert not _yaz(s, 1, _olcum(4, hata_kodu=1 << 4))
+    assert _yaz(s, 1, _olcum(6))
+
+
+def test_kalp_atisi_sabit_degeri_yazar():
+    s = Sikistirici()
+    _yaz(s, 1, _olcum(0))
+    kalp = sikistirma.SIKISTIRMA['kalp_atisi']
+    assert not _yaz(s, 1, _olcum(kalp - 1))
+    assert _yaz(s, 1, _olcum(kalp))
+
+
+def test_kaydedilmeyen_olcum_taban_olmaz():
+    # Kuyruk doluyken düşen ölçüm: yazilmali True ama kaydet çağrılmadı
+    s = Sikistirici()
+    _yaz(s, 1, _olcum(0, guc=1000))
+    assert s.yazilmali(1, _olcum(2, guc=1100))
+    assert s.yazilmali(1, _olcum(4, guc=1005)) is False   # taban hâlâ 1000 W
+    assert s.yazilmali(1, _olcum(6, guc=1100))
+
+
+def test_cihazlar_ayri_ve_kapali_ayar():
+    s = Sikistirici()
+    _yaz(s, 1, _olcum(0))
+    assert _yaz(s, 2, _olcum(0))
+    kapali = Sikistirici(dict(sikistirma.SIKISTIRMA, acik=False))
+    assert all(_yaz(kapali, 1, _olcum(0)) for _ in range(3))
+    assert kapali.son_yazilan == {}
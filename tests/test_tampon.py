@@ -0,0 +1,78 @@
+import pickle
+
+import pytest
+
+import tampon
+from tampon import DiskTamponu
+
+# 4 byte uzunluk + pickle; tüm test kayıtları aynı boyda olsun
+KAYIT_BOYU = tampon.UZUNLUK.size + len(pickle.dumps(('olcum', 0), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+@pytest.fixture
+def yol(tmp_path):
+    return str(tmp_path / "tampon.bin")
+
+
+def test_sirayla_okunur_onaylaninca_duser(yol):
+    t = DiskTamponu(yol, 1024)
+    assert t.ekle([('olcum', i) for i in range(5)]) == 5
+    kayitlar, imlec = t.oku(3)
+    assert kayitlar == [('olcum', 0), ('olcum', 1), ('olcum', 2)]
+    # Onaylanmadan tekrar okununca aynı kayıtlar gelir (DB yazımı başarısız olabilir)
+    assert t.oku(3)[0] == kayitlar
+    t.onayla(imlec)
+    assert t.oku(10)[0] == [('olcum', 3), ('olcum', 4)]
+    t.kapat()
+
+
+def test_halka_basa_doner(yol):
+    # Kapasite 3.5 kayıt: 4. kayıt sona sığmaz, kalan yarım kayıt boşa harcanıp başa yazılır
+    t = DiskTamponu(yol, KAYIT_BOYU * 3 + KAYIT_BOYU // 2)
+    assert t.ekle([('olcum', i) for i in range(3)]) == 3
+    assert t.ekle([('olcum', 3)]) == 0            # dolu
+    t.onayla(t.oku(2)[1])
+    assert t.ekle([('olcum', 3), ('olcum', 4), ('olcum', 5)]) == 2
+    assert t.son == 2 * KAYIT_BOYU                 # başa dönüldü
+
+    kayitlar, imlec = t.oku(10)
+    assert kayitlar == [('olcum', 2), ('olcum', 3), ('olcum', 4)]
+    t.onayla(imlec)
+    assert (t.adet, t.dolu, t.bas, t.son) == (0, 0, 0, 0)
+    t.kapat()
+
+
+def test_yeniden_acilinca_bekleyenler_korunur(yol):
+    t = DiskTamponu(yol, KAYIT_BOYU * 3 + KAYIT_BOYU // 2)
+    t.ekle([('olcum', i) for i in range(3)])
+    t.onayla(t.oku(2)[1])
+    t.ekle([('olcum', 3), ('olcum', 4)])
+    t.kapat()
+
+    # Bekleyen kayıt varken kapasite değiştirilmez
+    t = DiskTamponu(yol, 4096)
+    assert t.kapasite == KAYIT_BOYU * 3 + KAYIT_BOYU // 2
+    assert t.oku(10)[0] == [('olcum', 2), ('olcum', 3), ('olcum', 4)]
+    assert t.doluluk() == pytest.approx((3 * KAYIT_BOYU + KAYIT_BOYU // 2) / t.kapasite)
+    t.kapat()
+
+
+def test_bos_tampon_yeni_kapasiteyle_kurulur(yol):
+    DiskTamponu(yol, 1024).kapat()
+    t = DiskTamponu(yol, 2048)
+    assert t.kapasite == 2048
+    t.kapat()
+
+
+def test_baska_dosya_reddedilir(yol):
+    with open(yol, "wb") as f:
+        f.write(b"x" * 100)
+    with pytest.raises(ValueError):
+        DiskTamponu(yol, 1024)
+
+
+def test_tampondan_buyuk_kayit_eklenmez(yol):
+    t = DiskTamponu(yol, 64)
+    assert t.ekle([('olcum', 'x' * 100)]) == 0
+    assert t.adet == 0
+    t.kapat()
@@ -0,0 +1,71 @@
+from zamanlayici import ALARM, TAM, ZAMANLAMA, Zamanlayici
+
+HAT = '10.0.0.5:502'
+NORMAL = {'guc': 1000, 'hata_kodu': 0, 'hata_kodu_193': 0}
+
+
+def test_cevapsiz_cihaz_ustel_geri_cekilir():
+    z = Zamanlayici({HAT: [1]})
+    araliklar = []
+    for _ in range(12):
+        z.sonuc(HAT, 1, TAM, None, 0.5, simdi=0.0)
+        araliklar.append(z.cihazlar[(HAT, 1)].aralik)
+    assert araliklar[:4] == [ZAMANLAMA['normal'] * 2 ** k for k in range(1, 5)]
+    assert araliklar[-1] == ZAMANLAMA['geri_cekilme_max']
+    assert z.cihazlar[(HAT, 1)].mod == 'geri_cekilme'
+
+    # Geri çekilme süresi dolmadan sorulmaz; cevap gelince normal aralığa döner
+    assert z.siradakiler(HAT, 2.0, simdi=ZAMANLAMA['geri_cekilme_max'] - 1) == []
+    assert z.siradakiler(HAT, 2.0, simdi=ZAMANLAMA['geri_cekilme_max']) == [(1, TAM)]
+    z.sonuc(HAT, 1, TAM, NORMAL, 0.1, simdi=0.0)
+    d = z.cihazlar[(HAT, 1)]
+    assert (d.hata, d.mod, d.aralik) == (0, 'normal', ZAMANLAMA['normal'])
+
+
+def test_sabit_cihaz_yavaslar_alarm_okumasi_surer():
+    z = Zamanlayici({HAT: [1]})
+    simdi = 0.0
+    for _ in range(ZAMANLAMA['sabit_tur'] + 1):
+        z.sonuc(HAT, 1, TAM, NORMAL, 0.1, simdi=simdi)
+    d = z.cihazlar[(HAT, 1)]
+    assert (d.mod, d.aralik) == ('yavas', ZAMANLAMA['yavas'])
+
+    # Tam okuma zamanı gelmeden alarm register'ları normal aralıkla sorulur
+    assert z.siradakiler(HAT, 2.0, simdi=simdi + ZAMANLAMA['normal']) == [(1, ALARM)]
+    # Alarm görülünce tam okuma hemen öne çekilir
+    z.sonuc(HAT, 1, ALARM, dict(NORMAL, hata_kodu=4), 0.05, simdi=simdi + ZAMANLAMA['normal'])
+    assert (d.mod, d.aralik) == ('hizli', ZAMANLAMA['hizli'])
+    assert z.siradakiler(HAT, 2.0, simdi=simdi + ZAMANLAMA['normal']) == [(1, TAM)]
+
+
+def test_seri_hat_butcesi_ve_oncelik():
+    z = Zamanlayici({HAT: list(range(1, 11))})
+    for dev_id in range(1, 11):
+        # Okuma süresi ortalaması 0.7 * tahmini + 0.3 * 0.5 = 0.22 sn
+        z.sonuc(HAT, dev_id, TAM, dict(NORMAL, hata_kodu=1 if dev_id == 9 else 0), 0.5, simdi=0.0)
+    simdi = ZAMANLAMA['normal']
+
+    secilen = z.siradakiler(HAT, 2.0, simdi=simdi)
+    # Bütçe 0.8 * 2 sn = 1.6 sn -> 7 cihaz; alarmlı cihaz (9) en önde
+    assert len(secilen) == 7
+    assert secilen[0] == (9, TAM)
+
+    # Paralel (seri olmayan) hatta bütçe uygulanmaz
+    assert len(z.siradakiler(HAT, 2.0, seri_hat=False, simdi=simdi)) == 10
+
+
+def test_butce_en_az_bir_cihaz_okur():
+    z = Zamanlayici({HAT: [1, 2]})
+    for dev_id in (1, 2):
+        z.sonuc(HAT, dev_id, TAM, NORMAL, 10.0, simdi=0.0)
+    assert len(z.siradakiler(HAT, 1.0, simdi=ZAMANLAMA['normal'])) == 1
+
+
+def test_hatlar_birbirinden_bagimsiz():
+    z = Zamanlayici({HAT: [1], '10.0.0.6:502': [1]})
+    z.sonuc(HAT, 1, TAM, None, 0.5, simdi=0.0)
+    z.sonuc('10.0.0.6:502', 1, TAM, NORMAL, 0.1, simdi=0.0)
+    assert z.siradakiler(HAT, 2.0, simdi=ZAMANLAMA['normal']) == []
+    assert z.siradakiler('10.0.0.6:502', 2.0, simdi=ZAMANLAMA['normal']) == [(1, TAM)]
+    assert z.ozet() == {'geri_cekilme': 1, 'normal': 1}
+
@@ -1,11 +1,84 @@
+import os
+import queue
 import sqlite3
-from datetime import datetime
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+import alarm_kodlari
+import metrikler
+import sikistirma
+import tampon
 
-DB_NAME = "solar_log.db"
+# Docker'da WAL dosyaları (-wal, -shm) DB ile aynı klasörde durmalı,
+# bu yüzden yol ortam değişkeniyle bir klasör volume'una yönlendirilebilir.
+DB_NAME = os.environ.get("SOLAR_DB", "solar_log.db")
+
+# --- YAZICI AYARLARI ---
+KUYRUK_KAPASITESI = 20000   # Bellekte bekleyebilecek en fazla ölçüm
+TOPLU_YAZMA_BOYUTU = 500    # Bu kadar kayıt birikince hemen diske yaz
+TOPLU_YAZMA_SURESI = 1.0    # ...ya da en geç bu kadar saniyede bir yaz
+BAGLANTI_BEKLEME_MAX = 30   # DB'ye yazılamazsa yeniden deneme beklemesi en fazla (sn)
+
+# --- TAŞMA TAMPONU (tampon.py) ---
+# DB'ye yazılamayan paketler bu dosyaya eklenir, DB düzelince sırayla geri yazılır.
+TAMPON = {
+    'acik': True,
+    'dosya': os.environ.get("SOLAR_TAMPON"),   # None: DB'nin yanında tampon.bin
+    'boyut': 64 * 1024 * 1024,                 # byte (~500 bin ölçüm)
+    'geri_yazma_paketi': 5000,                 # Tampondan tek transaction'da yazılan kayıt
+}
+
+# --- ÖZET (ROLLUP) TABLOLARI ---
+# (tablo, kova süresi sn). Kova anahtarı: yerel saatin epoch saniyesi, kovanın başı.
+OZET_TABLOLARI = [
+    ('olcumler_1dk', 60),
+    ('olcumler_15dk', 900),
+    ('olcumler_gunluk', 86400),
+]
+OZET_ALANLARI = ['guc', 'voltaj', 'akim', 'sicaklik']
+HEDEF_NOKTA = 300   # aralik_getir için grafik başına yaklaşık nokta sayısı
+HAM_ADIM = 2        # Özetsiz (kısa) aralıkların ızgara adımı, sn (collector.REFRESH_RATE)
+
+# --- KOMPAKT DEPOLAMA ---
+# olcumler_kompakt: epoch-ms INTEGER zaman + ham register tamsayıları.
+# Değer = ham * ölçek (collector.CONFIG'deki register çarpanları)
+KOMPAKT_OLCEK = {'guc': 1.0, 'voltaj': 0.1, 'akim': 0.1, 'sicaklik': 1.0}
+KOMPAKT_PAKET = 50000   # kompakt_goc'un tek transaction'da taşıdığı satır
+
+# --- PARQUET ARŞİVİ ---
+# Kapanmış günler gun=YYYY-MM-DD/slave_id=N/veri.parquet düzeninde yazılır (bakim.parquet_disa_aktar)
+PARQUET_KLASORU = os.path.join(os.path.dirname(DB_NAME), 'parquet')
+
+# Ölçüm okuma fonksiyonlarının sütun sırası (zaman + değerler + alarm kelimeleri)
+OLCUM_SUTUNLARI = ["zaman", "guc", "voltaj", "akim", "sicaklik", "hata_kodu", "hata_kodu_193"]
+
+INSERT_SQL = '''
+    INSERT INTO olcumler (slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def baglanti_ac(db_yolu=None):
+    """Uzun ömürlü bağlantılar için ayarlı (WAL + pragma) bağlantı açar."""
+    conn = sqlite3.connect(db_yolu or DB_NAME, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")      # Okuyucular yazıcıyı bloklamasın
+    conn.execute("PRAGMA synchronous=NORMAL")    # WAL'da her commit'te fsync gerekmez
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-16000")     # ~16 MB sayfa önbelleği
+    return conn
 
 def init_db():
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
+
+    # 0. Yeni veritabanında silinen sayfalar parça parça geri verilebilsin (bakim.py)
+    # (Tablo oluşturulmadan önce ayarlanmalı; mevcut DB için bakim.otomatik_vacuum_ac)
+    if not cursor.execute("SELECT 1 FROM sqlite_master WHERE name='olcumler'").fetchone():
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
     
     # 1. Tabloyu Oluştur (Temel Sütunlar)
     cursor.execute('''
@@ -35,60 +108,1365 @@ def init_db():
     if 'hata_kodu_193' not in mevcut_sutunlar:
         print("⚠️ Tablo güncelleniyor: 'hata_kodu_193' sütunu ekleniyor...")
         cursor.execute("ALTER TABLE olcumler ADD COLUMN hata_kodu_193 INTEGER DEFAULT 0")
-        
+
+    # 3. INDEX (Cihaz bazlı zaman aralığı sorguları tüm tabloyu taramasın)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_slave_zaman ON olcumler(slave_id, zaman)")
+
+    # 4. SON DURUM TABLOSU (Her cihazın en son ölçümü, tek satır)
+    son_durum_var = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='son_durum'").fetchone()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS son_durum (
+            slave_id INTEGER PRIMARY KEY,
+            zaman TIMESTAMP,
+            guc REAL,
+            voltaj REAL,
+            akim REAL,
+            sicaklik REAL,
+            hata_kodu INTEGER DEFAULT 0,
+            hata_kodu_193 INTEGER DEFAULT 0
+        )
+    ''')
+    if not son_durum_var:
+        print("⚠️ 'son_durum' tablosu mevcut ölçümlerden dolduruluyor...")
+        cursor.execute('''
+            INSERT OR REPLACE INTO son_durum
+            SELECT o.slave_id, o.zaman, o.guc, o.voltaj, o.akim, o.sicaklik, o.hata_kodu, o.hata_kodu_193
+            FROM olcumler o
+            JOIN (SELECT slave_id, MAX(zaman) AS son_zaman FROM olcumler GROUP BY slave_id) m
+              ON o.slave_id = m.slave_id AND o.zaman = m.son_zaman
+            ORDER BY o.id
+        ''')
+
+    # son_durum artık yazıcı tarafında paket başına güncelleniyor (olcumleri_yaz)
+    cursor.execute("DROP TRIGGER IF EXISTS trg_son_durum")
+
+    # 5. ÖZET TABLOLARI (1 dk / 15 dk / günlük min-max-ort + OR'lanmış alarm bitleri)
+    for tablo, saniye in OZET_TABLOLARI:
+        _ozet_tablosu_kur(cursor, tablo, saniye)
+
+    # 6. KOMPAKT TABLO (slave_id + zaman'a göre kümelenmiş, satır başına ~20 byte)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS olcumler_kompakt (
+            slave_id INTEGER,
+            zaman_ms INTEGER,       -- Yerel saat, epoch milisaniye
+            guc INTEGER,            -- Ham register değerleri (KOMPAKT_OLCEK ile çarpılır)
+            voltaj INTEGER,
+            akim INTEGER,
+            sicaklik INTEGER,
+            hata_kodu INTEGER DEFAULT 0,
+            hata_kodu_193 INTEGER DEFAULT 0,
+            PRIMARY KEY (slave_id, zaman_ms)
+        ) WITHOUT ROWID
+    ''')
+
+    # 7. ALARM OLAYLARI (Sadece başlangıç/bitiş anları; sorgular olay sayısıyla orantılı)
+    olaylar_var = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='alarm_olaylari'").fetchone()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alarm_olaylari (
+            id INTEGER PRIMARY KEY,
+            slave_id INTEGER,
+            register INTEGER,       -- 189 / 193
+            bit INTEGER,
+            baslangic TIMESTAMP,
+            bitis TIMESTAMP         -- NULL: arıza hâlâ aktif
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarm_cihaz ON alarm_olaylari(slave_id, register, bit, baslangic)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarm_baslangic ON alarm_olaylari(baslangic)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarm_aktif ON alarm_olaylari(slave_id) WHERE bitis IS NULL")
+    if not olaylar_var:
+        print("⚠️ 'alarm_olaylari' tablosu mevcut ölçümlerden dolduruluyor...")
+        _alarm_olaylarini_doldur(conn)
+
+    # 8. METRİK İSTATİSTİKLERİ (metrikler.istatistik_kaydet_baslat; birikimli değerler)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metrik_istatistik (
+            zaman TIMESTAMP,
+            ad TEXT,
+            etiketler TEXT,
+            adet INTEGER,           -- Histogram gözlem sayısı (sayaç/göstergede NULL)
+            toplam REAL             -- Histogram süre toplamı ya da sayaç/gösterge değeri
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrik_ad_zaman ON metrik_istatistik(ad, zaman)")
+
+    # 9. AĞ KEŞFİ (kesif.py; gateway başına cevap veren slave ID'ler ve parmak izleri)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS kesif (
+            ip TEXT,
+            port INTEGER,
+            slave_id INTEGER,
+            seri_hat INTEGER,       -- Gateway RS485 hattı mı (collector.GATEWAYS 'seri_hat')
+            uyumlu INTEGER,         -- Collector'ın telemetri bloğu (70-73) okunabiliyor
+            parmak_izi TEXT,        -- Cevap veren bloklar: telemetri,hata_kodu,...
+            zaman TIMESTAMP,
+            PRIMARY KEY (ip, port, slave_id)
+        )
+    ''')
+
+    # 10. ANOMALİLER (anomali.py; filoya göre düşük verim / ani düşüş / aşırı ısınma dönemleri)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS anomaliler (
+            id INTEGER PRIMARY KEY,
+            slave_id INTEGER,
+            tur TEXT,               -- anomali.ANOMALI_TURLERI anahtarı
+            baslangic TIMESTAMP,
+            bitis TIMESTAMP,        -- Son işaretli kovanın sonu
+            deger REAL              -- Dönemdeki en kötü değer (oran / z / °C farkı)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_anomali_baslangic ON anomaliler(baslangic)")
+
     conn.commit()
     conn.close()
 
-def veri_ekle(slave_id, data):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    simdi = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
-    
+def _alarm_olaylarini_doldur(conn):
+    # Geçmişteki alarm kelimelerinden olayları cihaz cihaz (bellek sınırlı) çıkarır
+    cihazlar = [r[0] for r in conn.execute("SELECT DISTINCT slave_id FROM son_durum")]
+    for slave_id in cihazlar:
+        df = pd.read_sql_query('''
+            SELECT slave_id, zaman, hata_kodu, hata_kodu_193 FROM olcumler
+            WHERE slave_id = ? ORDER BY zaman
+        ''', conn, params=(slave_id,))
+        df["zaman"] = pd.to_datetime(df["zaman"], format="ISO8601")
+        olaylar = alarm_kodlari.alarm_olaylari(df)
+        conn.executemany(
+            "INSERT INTO alarm_olaylari (slave_id, register, bit, baslangic, bitis) VALUES (?, ?, ?, ?, ?)",
+            [(int(o.slave_id), int(o.register), int(o.bit), o.baslangic.strftime('%Y-%m-%d %H:%M:%S.%f'),
+              None if pd.isna(o.bitis) else o.bitis.strftime('%Y-%m-%d %H:%M:%S.%f'))
+             for o in olaylar.itertuples(index=False)])
+
+def _bit_or(sutun):
+    # SQLite'ta BIT_OR toplama fonksiyonu yok: her bit için MAX alınıp birleştirilir
+    return " | ".join(f"(MAX(({sutun} >> {b}) & 1) << {b})" for b in range(32))
+
+def _epoch(sutun):
+    # Yerel saat metni -> epoch sn (ms'ye yuvarlı). Tam kısmı strftime('%s') ile birebir
+    # aynı olmalı (kova sınırları doldurmada ve olcumleri_yaz'da aynı düşsün)
+    return f"(ROUND((julianday({sutun}) - 2440587.5) * 86400000.0) / 1000.0)"
+
+def _ozet_tablosu_kur(cursor, tablo, saniye):
+    """
+    Özet tablosunu ve geçmiş veriden ilk doldurmayı kurar; sonraki satırlar
+    olcumleri_yaz ile paket başına aynı kurallarla eklenir.
+
+    Ortalamalar zaman ağırlıklıdır (sıkıştırmayla uyumlu, adım tutarak):
+    bir satırın değeri bir sonraki satırına kadar, en fazla tutma_suresi sn
+    geçerlidir ve bu süre kesiştiği her kovaya {alan}_toplam += değer * sn,
+    sure += sn olarak eklenir. Ortalama = {alan}_toplam / sure. Böylece sık
+    yazılan (değişken) dönemler sabit dönemlerden ağır basmaz, hiç satır
+    yazılmamış ama değeri taşınan kovalar da oluşur. Bir satırın süresi bir
+    sonraki satırı geldiğinde işlenir (kalp atışı ile en geç ~1 dk sonra).
+    adet: kovada yazılmış satır sayısı; min/max/alarm bitleri taşınan değerleri de kapsar.
+    """
+    tablo_var = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (tablo,)).fetchone()
+
+    sutunlar = ",\n".join(f"{a}_min REAL, {a}_max REAL, {a}_toplam REAL" for a in OZET_ALANLARI)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {tablo} (
+            slave_id INTEGER,
+            zaman INTEGER,          -- Kova başlangıcı (epoch sn)
+            adet INTEGER,           -- Kovada yazılmış satır
+            sure REAL,              -- Kovada değeri bilinen süre (sn)
+            {sutunlar},             -- toplam: değer * sn
+            hata_kodu INTEGER DEFAULT 0,
+            hata_kodu_193 INTEGER DEFAULT 0,
+            PRIMARY KEY (slave_id, zaman)
+        ) WITHOUT ROWID
+    ''')
+
+    if not tablo_var:
+        print(f"⚠️ '{tablo}' özet tablosu mevcut ölçümlerden dolduruluyor...")
+        tutma = sikistirma.SIKISTIRMA['tutma_suresi']
+        # tutma sn'lik bir parça en fazla bu kadar kovaya değer
+        ks = " UNION ALL ".join(f"SELECT {k} AS k" for k in range(-(-tutma // saniye) + 1))
+        kolonlar = ", ".join(f"{a}_min, {a}_max, {a}_toplam" for a in OZET_ALANLARI)
+        alanlar = ", ".join(OZET_ALANLARI)
+        toplamlar = ", ".join(f"MIN({a}), MAX({a}), SUM({a} * MAX(ortusme, 0))" for a in OZET_ALANLARI)
+        cursor.execute(f'''
+            INSERT INTO {tablo} (slave_id, zaman, adet, sure, {kolonlar}, hata_kodu, hata_kodu_193)
+            SELECT slave_id, kova, SUM(k = 0), SUM(MAX(ortusme, 0)), {toplamlar},
+                   {_bit_or('hata_kodu')}, {_bit_or('hata_kodu_193')}
+            FROM (
+                SELECT p.*, n.k, (CAST(bas AS INTEGER) / {saniye} + n.k) * {saniye} AS kova,
+                       MIN(son, (CAST(bas AS INTEGER) / {saniye} + n.k + 1) * {saniye})
+                         - MAX(bas, (CAST(bas AS INTEGER) / {saniye} + n.k) * {saniye}) AS ortusme
+                FROM (
+                    SELECT slave_id, {alanlar}, hata_kodu, hata_kodu_193, bas,
+                           MIN(COALESCE(sonraki, bas), bas + {tutma}) AS son
+                    FROM (
+                        SELECT *, {_epoch('zaman')} AS bas,
+                               LEAD({_epoch('zaman')}) OVER (PARTITION BY slave_id ORDER BY zaman) AS sonraki
+                        FROM olcumler
+                    )
+                ) p, ({ks}) n
+            )
+            WHERE k = 0 OR ortusme > 0
+            GROUP BY slave_id, kova
+        ''')
+
+    # Eski sürümlerin satır başına trigger'ı (özetler artık olcumleri_yaz'da güncelleniyor)
+    cursor.execute(f"DROP TRIGGER IF EXISTS trg_{tablo}")
+
+def _ozet_ekle_sql(tablo):
+    # Kova katkısını mevcut satırla birleştirir: adet/süre/toplam eklenir, min/max ve bitler birleşir
+    kolonlar = ", ".join(f"{a}_min, {a}_max, {a}_toplam" for a in OZET_ALANLARI)
+    guncelle = ",\n".join(
+        f"{a}_min = MIN({a}_min, excluded.{a}_min), {a}_max = MAX({a}_max, excluded.{a}_max), "
+        f"{a}_toplam = {a}_toplam + excluded.{a}_toplam" for a in OZET_ALANLARI)
+    yer = ", ".join("?" * (4 + 3 * len(OZET_ALANLARI) + 2))
+    return f'''
+        INSERT INTO {tablo} (slave_id, zaman, adet, sure, {kolonlar}, hata_kodu, hata_kodu_193)
+        VALUES ({yer})
+        ON CONFLICT(slave_id, zaman) DO UPDATE SET
+            adet = adet + excluded.adet,
+            sure = sure + excluded.sure,
+            {guncelle},
+            hata_kodu = hata_kodu | excluded.hata_kodu,
+            hata_kodu_193 = hata_kodu_193 | excluded.hata_kodu_193
+    '''
+
+OZET_EKLE_SQL = {tablo: _ozet_ekle_sql(tablo) for tablo, _ in OZET_TABLOLARI}
+
+SON_DURUM_YAZ_SQL = '''
+    INSERT INTO son_durum (slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(slave_id) DO UPDATE SET
+        zaman = excluded.zaman, guc = excluded.guc, voltaj = excluded.voltaj,
+        akim = excluded.akim, sicaklik = excluded.sicaklik,
+        hata_kodu = excluded.hata_kodu, hata_kodu_193 = excluded.hata_kodu_193
+    WHERE excluded.zaman >= son_durum.zaman
+'''
+
+ONCEKI_SATIR_SQL = '''
+    SELECT zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193 FROM olcumler
+    WHERE slave_id = ? AND zaman < ?
+    ORDER BY zaman DESC LIMIT 1
+'''
+
+def olcumleri_yaz(conn, satirlar):
+    """
+    INSERT_SQL sırasındaki satırları yazar; son_durum ve özet tabloları da
+    paket başına bir kez (cihaz × kova için tek upsert) güncellenir.
+    Transaction çağırandadır. Özet kuralları: _ozet_tablosu_kur.
+    """
+    if not satirlar:
+        return 0
+    # Cihaz + zaman sırasında her satırın öncülü ya paketteki bir önceki satırdır ya DB'deki son satır
+    sirali = sorted(satirlar, key=lambda r: (r[0], r[1]))
+    oncekiler = _oncekiler(conn, sirali)
+    conn.executemany(INSERT_SQL, satirlar)
+
+    # son_durum: cihazın paketteki en yeni satırı
+    sonlar = [r for i, r in enumerate(sirali) if i + 1 == len(sirali) or sirali[i + 1][0] != r[0]]
+    conn.executemany(SON_DURUM_YAZ_SQL, sonlar)
+
+    for tablo, katkilar in _ozet_katkilari(sirali, oncekiler).items():
+        conn.executemany(OZET_EKLE_SQL[tablo], katkilar)
+    return len(satirlar)
+
+def _oncekiler(conn, sirali):
+    # Paketten önceki son satır son_durum'dan okunur (cihaz sayısı kadar satır). Paket
+    # cihazın son durumundan eskiyse (tampondan geç gelen satır) olcumler'e bakılır.
+    cihazlar = sorted({r[0] for r in sirali})
+    son = {}
+    for i in range(0, len(cihazlar), 500):
+        parca = cihazlar[i:i + 500]
+        son.update((r[0], r[1:]) for r in conn.execute(f'''
+            SELECT slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
+            FROM son_durum WHERE slave_id IN ({",".join("?" * len(parca))})
+        ''', parca))
+
+    oncekiler = []
+    for i, r in enumerate(sirali):
+        onceki = sirali[i - 1][1:] if i and sirali[i - 1][0] == r[0] else None
+        db = son.get(r[0])
+        if db is not None and db[0] >= r[1]:
+            db = conn.execute(ONCEKI_SATIR_SQL, (r[0], r[1])).fetchone()
+        if db is not None and (onceki is None or db[0] > onceki[0]):
+            onceki = db
+        oncekiler.append(onceki)
+    return oncekiler
+
+def _zaman_ms(zamanlar):
+    # Yerel saat metni -> epoch ms; _epoch ve strftime('%s') gibi ms'ye yuvarlanır
+    us = pd.to_datetime(zamanlar, format="ISO8601").as_unit('us').asi8
+    return (us + 500) // 1000
+
+def _ozet_katkilari(sirali, oncekiler):
+    """
+    Sıralı paket satırlarının özet tablolarına katkıları: {tablo: [OZET_EKLE_SQL satırı, ...]}.
+    Yeni satır kendi kovasına adet 1 / süre 0 ile, öncülün [öncül, yeni) süresi
+    (en fazla tutma_suresi) kesiştiği kovalara süre ve değer * süre olarak girer.
+    """
+    tutma = sikistirma.SIKISTIRMA['tutma_suresi']
+    n = len(sirali)
+    var = [i for i, p in enumerate(oncekiler) if p is not None]
+    ms = _zaman_ms([r[1] for r in sirali] + [oncekiler[i][0] for i in var])
+    sid = np.array([r[0] for r in sirali] + [sirali[i][0] for i in var], dtype=np.int64)
+    degerler = np.array([r[2:6] for r in sirali] + [oncekiler[i][1:5] for i in var],
+                        dtype=float).reshape(-1, len(OZET_ALANLARI))
+    bitler = np.array([r[6:8] for r in sirali] + [oncekiler[i][5:7] for i in var],
+                      dtype=np.int64).reshape(-1, 2)
+    bas = ms[n:] / 1000
+    bitis = np.minimum(ms[:n][var] / 1000, bas + tutma)
+
+    katkilar = {}
+    for tablo, saniye in OZET_TABLOLARI:
+        k = np.arange(-(-tutma // saniye) + 1)
+        kovalar = (ms[n:, None] // 1000 // saniye + k) * saniye
+        ortusme = np.minimum(bitis[:, None], kovalar + saniye) - np.maximum(bas[:, None], kovalar)
+        satir, sutun = np.nonzero(ortusme > 0)
+        o = n + satir   # öncül satırının birleşik dizilerdeki yeri
+
+        idx = np.concatenate([np.arange(n), o])
+        kova = np.concatenate([ms[:n] // 1000 // saniye * saniye, kovalar[satir, sutun]])
+        sure = np.concatenate([np.zeros(n), ortusme[satir, sutun]])
+        adet = np.concatenate([np.ones(n, dtype=np.int64), np.zeros(len(o), dtype=np.int64)])
+
+        # Aynı (cihaz, kova) katkıları tek satırda birleşir (anahtar: cihaz << 32 | kova no)
+        anahtar, grup = np.unique((sid[idx] << 32) | (kova // saniye), return_inverse=True)
+        g = len(anahtar)
+        toplu_adet = np.bincount(grup, adet, g)
+        toplu_sure = np.bincount(grup, sure, g)
+        sutunlar = []
+        for j in range(len(OZET_ALANLARI)):
+            d = degerler[idx, j]
+            en_kucuk = np.full(g, np.inf)
+            en_buyuk = np.full(g, -np.inf)
+            np.minimum.at(en_kucuk, grup, d)
+            np.maximum.at(en_buyuk, grup, d)
+            sutunlar += [en_kucuk, en_buyuk, np.bincount(grup, d * sure, g)]
+        hk = np.zeros((g, 2), dtype=np.int64)
+        np.bitwise_or.at(hk, grup, bitler[idx])
+
+        katkilar[tablo] = list(zip(
+            (anahtar >> 32).tolist(), ((anahtar & 0xFFFFFFFF) * saniye).tolist(),
+            toplu_adet.astype(np.int64).tolist(),
+            toplu_sure.tolist(), *[s.tolist() for s in sutunlar], hk[:, 0].tolist(), hk[:, 1].tolist()))
+    return katkilar
+
+def kayit_hazirla(slave_id, data, zaman=None):
+    """Ölçüm sözlüğünü INSERT_SQL sırasına göre tuple'a çevirir."""
+    # Okuma anı biliniyorsa onu kullan (kuyrukta bekleme süresi zamana yansımasın)
+    zaman = zaman or data.get('timestamp') or datetime.now()
+    simdi = zaman.strftime('%Y-%m-%d %H:%M:%S.%f')
+
     # Verileri sözlükten al (Yoksa 0 yaz)
     hk_189 = data.get('hata_kodu', 0)
     hk_193 = data.get('hata_kodu_193', 0)
 
-    cursor.execute('''
-        INSERT INTO olcumler (slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (slave_id, simdi, data['guc'], data['voltaj'], data['akim'], data['sicaklik'], hk_189, hk_193))
-    
-    conn.commit()
+    return (slave_id, simdi, data['guc'], data['voltaj'], data['akim'], data['sicaklik'], hk_189, hk_193)
+
+def veri_ekle(slave_id, data):
+    conn = sqlite3.connect(DB_NAME)
+    with conn:
+        olcumleri_yaz(conn, [kayit_hazirla(slave_id, data)])
     conn.close()
 
-def son_verileri_getir(slave_id, limit=100):
+def veri_ekle_toplu(kayitlar, conn=None):
+    """
+    Bir tur boyunca okunan tüm ölçümleri TEK transaction ile yazar.
+    kayitlar: [(slave_id, data), ...] ya da kayit_hazirla() çıktısı tuple'lar.
+    """
+    satirlar = [k if len(k) == 8 else kayit_hazirla(*k) for k in kayitlar]
+    if not satirlar:
+        return 0
+
+    kendi_baglantisi = conn is None
+    if kendi_baglantisi:
+        conn = baglanti_ac()
+    try:
+        with conn:  # Hata olursa rollback, yoksa tek commit
+            olcumleri_yaz(conn, satirlar)
+    finally:
+        if kendi_baglantisi:
+            conn.close()
+    return len(satirlar)
+
+class VeriYazici:
+    """
+    Collector için kalıcı bağlantılı, kuyruklu veritabanı yazıcısı.
+
+    ekle()/ekle_toplu() kayıtları sadece bellekteki sınırlı kuyruğa bırakır;
+    arka plandaki iş parçacığı kuyruğu TOPLU_YAZMA_BOYUTU kayıtta ya da
+    TOPLU_YAZMA_SURESI saniyede bir, tek transaction ile diske yazar.
+    Böylece Modbus döngüsü disk gecikmesini hiç beklemez.
+
+    sikistirici (sikistirma.Sikistirici) verilirse eşik altında kalan
+    ölçümler kuyruğa hiç girmez.
+
+    kuyruk olarak multiprocessing.Queue verilebilir (supervizor.py): toplayıcı
+    süreçler sadece ekle*() çağırır, yazıcı süreç calistir() ile diske yazar.
+
+    DB'ye yazılamayan (kilitli, disk dolu, bağlantı açılamıyor) paketler
+    düşürülmez, kalıcı taşma tamponuna (tampon.DiskTamponu) eklenir. Tampon
+    boşalana kadar yeni paketler de tampona gider (sıra korunur); DB artan
+    beklemeyle yeniden denenir ve düzelince tampon paket paket geri yazılır.
+    Kapanırken DB hâlâ yoksa kayıtlar dosyada kalır, bir sonraki açılışta yazılır.
+    İş parçacığı beklenmedik bir hatayla ölürse ekle() RuntimeError atar
+    (kuyruğa sessizce birikmesin).
+    """
+
+    def __init__(self, db_yolu=None, kapasite=KUYRUK_KAPASITESI,
+                 toplu_boyut=TOPLU_YAZMA_BOYUTU, toplu_sure=TOPLU_YAZMA_SURESI, sikistirici=None,
+                 kuyruk=None):
+        self.db_yolu = db_yolu or DB_NAME
+        self.sikistirici = sikistirici
+        self.toplu_boyut = toplu_boyut
+        self.toplu_sure = toplu_sure
+        self.kuyruk = kuyruk if kuyruk is not None else queue.Queue(maxsize=kapasite)
+        self.yazilan = 0
+        self.dusurulen = 0
+        self.hata = None        # İş parçacığını öldüren hata
+        self.tampon = None      # Yazıcı iş parçacığında açılır (toplayıcı süreçler açmaz)
+        self._conn = None
+        self._bekleme = 0       # DB hatasından sonraki yeniden deneme beklemesi (sn)
+        self._sonraki_deneme = 0.0
+        self._dur = threading.Event()
+        self._is = None
+
+    def baslat(self):
+        if self._is is None or not self._is.is_alive():
+            self._dur.clear()
+            self._is = threading.Thread(target=self.calistir, name="VeriYazici", daemon=True)
+            self._is.start()
+        return self
+
+    def calistir(self, dur=None):
+        """Yazma döngüsünü bu iş parçacığında çalıştırır; dur set edilip kuyruk boşalınca döner."""
+        if dur is not None:
+            self._dur = dur
+        self._calis()
+
+    def _olum_kontrol(self):
+        if self._is is not None and not self._is.is_alive() and not self._dur.is_set():
+            raise RuntimeError(f"VeriYazici iş parçacığı durmuş: {self.hata!r}") from self.hata
+
+    def ekle(self, slave_id, data):
+        """Tek ölçümü kuyruğa bırakır. Kuyruk doluysa beklemez, False döner."""
+        self._olum_kontrol()
+        if self.sikistirici is not None and not self.sikistirici.yazilmali(slave_id, data):
+            metrikler.DB_ATLANAN.artir()
+            return True
+        try:
+            self.kuyruk.put_nowait(('olcum', kayit_hazirla(slave_id, data)))
+        except queue.Full:
+            self.dusurulen += 1
+            metrikler.DB_DUSEN.artir(neden="kuyruk")
+            logging.error(f"Yazıcı kuyruğu dolu, ID {slave_id} ölçümü düşürüldü.")
+            return False
+        if self.sikistirici is not None:
+            self.sikistirici.kaydet(slave_id, data)
+        return True
+
+    def ekle_toplu(self, kayitlar):
+        """Bir turun tüm ölçümlerini kuyruğa bırakır: [(slave_id, data), ...]"""
+        return sum(1 for slave_id, data in kayitlar if self.ekle(slave_id, data))
+
+    def alarm_ekle(self, olaylar):
+        """AlarmIzleyici'nin ürettiği başlangıç/bitiş olaylarını kuyruğa bırakır."""
+        if olaylar:
+            self._olum_kontrol()
+        for olay in olaylar:
+            try:
+                self.kuyruk.put_nowait(('alarm', olay))
+            except queue.Full:
+                logging.error(f"Yazıcı kuyruğu dolu, alarm olayı düşürüldü: {olay}")
+
+    def durdur(self, zaman_asimi=10):
+        """İş parçacığını durdurur; kuyrukta kalanlar diske yazılır."""
+        self._dur.set()
+        if self._is is not None:
+            self._is.join(zaman_asimi)
+
+    def _kuyrugu_topla(self, bekle=True):
+        # İlk kaydı en fazla toplu_sure kadar bekle, sonra gelenleri de ekle.
+        # bekle=False: tamponda geri yazılacak kayıt varken sadece hazır olanları al
+        paket = []
+        son_tarih = time.monotonic() + (self.toplu_sure if bekle else 0)
+        while len(paket) < self.toplu_boyut:
+            kalan = son_tarih - time.monotonic()
+            try:
+                paket.append(self.kuyruk.get(timeout=kalan) if kalan > 0 else self.kuyruk.get_nowait())
+            except queue.Empty:
+                break
+        return paket
+
+    def _tampon_ac(self):
+        if not TAMPON['acik']:
+            return None
+        yol = TAMPON['dosya'] or os.path.join(os.path.dirname(self.db_yolu), 'tampon.bin')
+        try:
+            t = tampon.DiskTamponu(yol, TAMPON['boyut'])
+        except (OSError, ValueError) as e:
+            logging.error(f"Taşma tamponu açılamadı ({yol}), yazma hatasında kayıtlar düşürülecek: {e}")
+            return None
+        if t.adet:
+            print(f"📦 Taşma tamponunda {t.adet} kayıt var, veritabanına geri yazılacak")
+        return t
+
+    def _db_yaz(self, paket):
+        """Paketi tek transaction ile yazar; hata olursa False (bağlantı kapatılır, bekleme artar)."""
+        try:
+            if self._conn is None:
+                self._conn = baglanti_ac(self.db_yolu)
+            with metrikler.sure_olc(metrikler.DB_YAZMA):
+                yazilan = self._paketi_yaz(paket, self._conn)
+        except sqlite3.Error as e:
+            metrikler.YAZICI_HATA.artir(tur="baglanti" if self._conn is None else "yazma")
+            if self._conn is not None:
+                # Bozulmuş olabilecek bağlantı bir sonraki denemede yeniden açılır
+                self._conn.close()
+                self._conn = None
+            self._bekleme = min(max(self._bekleme * 2, 1), BAGLANTI_BEKLEME_MAX)
+            self._sonraki_deneme = time.monotonic() + self._bekleme
+            logging.error(f"Veritabanına yazılamadı ({len(paket)} kayıt), "
+                          f"{self._bekleme} sn sonra tekrar denenecek: {e}")
+            return False
+        self._bekleme = 0
+        self.yazilan += yazilan
+        metrikler.DB_SATIR.artir(yazilan)
+        return True
+
+    def _biriktir(self, paket):
+        # Yazılamayan paket tampona; tampon yoksa ya da doluysa sığmayanlar düşer
+        eklenen = self.tampon.ekle(paket) if self.tampon is not None else 0
+        dusen = len(paket) - eklenen
+        if dusen:
+            self.dusurulen += dusen
+            metrikler.DB_DUSEN.artir(dusen, neden="hata" if self.tampon is None else "tampon_dolu")
+            logging.error(f"{dusen} kayıt düşürüldü (veritabanı yazılamıyor, taşma tamponu "
+                          f"{'kapalı' if self.tampon is None else 'dolu'})")
+
+    def _paket_isle(self, paket):
+        if self.tampon is not None and self.tampon.adet:
+            # Tamponda bekleyenler varken doğrudan yazılmaz: sıra bozulmasın
+            self._biriktir(paket)
+        elif time.monotonic() < self._sonraki_deneme or not self._db_yaz(paket):
+            self._biriktir(paket)
+
+    def _tamponu_bosalt(self):
+        # Tampondaki en eski kayıtları DB'ye yazar; yazılırsa tampondan düşer
+        kayitlar, imlec = self.tampon.oku(TAMPON['geri_yazma_paketi'])
+        if kayitlar and self._db_yaz(kayitlar):
+            self.tampon.onayla(imlec)
+            if not self.tampon.adet:
+                print("📦 Taşma tamponu boşaldı, yazma normale döndü")
+
+    def _calis(self):
+        metrikler.YAZICI_CALISIYOR.ayarla(1)
+        self.tampon = self._tampon_ac()
+        try:
+            while not (self._dur.is_set() and self.kuyruk.empty()):
+                bekleyen = self.tampon is not None and self.tampon.adet > 0
+                denenebilir = time.monotonic() >= self._sonraki_deneme
+                paket = self._kuyrugu_topla(bekle=not (bekleyen and denenebilir))
+                metrikler.KUYRUK.ayarla(self.kuyruk.qsize())
+                if paket:
+                    self._paket_isle(paket)
+                if self.tampon is not None:
+                    if self.tampon.adet and time.monotonic() >= self._sonraki_deneme:
+                        self._tamponu_bosalt()
+                    metrikler.TAMPON.ayarla(self.tampon.adet)
+        except Exception as e:
+            self.hata = e
+            logging.exception("VeriYazici beklenmedik hatayla durdu")
+            raise
+        finally:
+            metrikler.YAZICI_CALISIYOR.ayarla(0)
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if self.tampon is not None:
+                self.tampon.kapat()
+                self.tampon = None
+
+    def _paketi_yaz(self, paket, conn):
+        # Ölçümler ve alarm olayları aynı transaction'da (sıra korunarak) yazılır
+        olcumler = [veri for tur, veri in paket if tur == 'olcum']
+        olaylar = [veri for tur, veri in paket if tur == 'alarm']
+        with conn:
+            olcumleri_yaz(conn, olcumler)
+            if olaylar:
+                alarm_olaylari_yaz(olaylar, conn)
+        return len(olcumler)
+
+def alarm_olaylari_yaz(olaylar, conn=None):
+    """
+    Başlangıç olayı yeni satır açar, bitiş olayı açık satırı kapatır.
+    conn verilirse transaction çağırandadır; verilmezse kendi bağlantısıyla yazar.
+    """
+    if conn is None:
+        if olaylar:
+            conn = sqlite3.connect(DB_NAME)
+            with conn:
+                alarm_olaylari_yaz(olaylar, conn)
+            conn.close()
+        return
+    for olay in olaylar:
+        zaman = olay['zaman'].strftime('%Y-%m-%d %H:%M:%S.%f')
+        if olay['tur'] == 'baslangic':
+            conn.execute('''
+                INSERT INTO alarm_olaylari (slave_id, register, bit, baslangic) VALUES (?, ?, ?, ?)
+            ''', (olay['slave_id'], olay['register'], olay['bit'], zaman))
+        else:
+            conn.execute('''
+                UPDATE alarm_olaylari SET bitis = ?
+                WHERE slave_id = ? AND register = ? AND bit = ? AND bitis IS NULL
+            ''', (zaman, olay['slave_id'], olay['register'], olay['bit']))
+
+def metrik_istatistik_yaz(satirlar):
+    """metrikler.istatistik_satirlari() çıktısını metrik_istatistik tablosuna ekler."""
+    if not satirlar:
+        return
+    conn = baglanti_ac()
+    with conn:
+        conn.executemany(
+            "INSERT INTO metrik_istatistik (zaman, ad, etiketler, adet, toplam) VALUES (?, ?, ?, ?, ?)",
+            satirlar)
+    conn.close()
+
+AKTIF_ALARMLAR_SQL = '''
+    SELECT slave_id, register, bit, baslangic FROM alarm_olaylari
+    WHERE bitis IS NULL
+    ORDER BY slave_id, register, bit
+'''
+
+def aktif_alarmlar():
+    """Hâlâ açık arızalar: [(slave_id, register, bit, baslangic), ...]"""
     conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(f'''
+    rows = conn.execute(AKTIF_ALARMLAR_SQL).fetchall()
+    conn.close()
+    return rows
+
+def alarm_olaylari_getir(baslangic, bitis, slave_ids=None):
+    """
+    [baslangic, bitis] aralığıyla kesişen arıza olaylarını DataFrame olarak döner.
+    Sütunlar: slave_id, register, bit, mesaj, baslangic, bitis, sure (alarm_kodlari.alarm_olaylari ile aynı)
+    """
+    sql = '''
+        SELECT slave_id, register, bit, baslangic, bitis FROM alarm_olaylari
+        WHERE baslangic <= ? AND (bitis IS NULL OR bitis >= ?)
+    '''
+    params = [bitis.strftime('%Y-%m-%d %H:%M:%S.%f'), baslangic.strftime('%Y-%m-%d %H:%M:%S.%f')]
+    if slave_ids:
+        sql += f" AND slave_id IN ({', '.join('?' * len(slave_ids))})"
+        params += list(slave_ids)
+
+    conn = sqlite3.connect(DB_NAME)
+    df = pd.read_sql_query(sql + " ORDER BY baslangic", conn, params=params)
+    conn.close()
+
+    df["baslangic"] = pd.to_datetime(df["baslangic"], format="ISO8601")
+    df["bitis"] = pd.to_datetime(df["bitis"], format="ISO8601")
+    df["sure"] = df["bitis"] - df["baslangic"]
+    df["mesaj"] = [alarm_kodlari.hata_mesaji(r, b) for r, b in zip(df["register"], df["bit"])]
+    return df[["slave_id", "register", "bit", "mesaj", "baslangic", "bitis", "sure"]]
+
+def ayar_oku(anahtar, varsayilan=None, conn=None):
+    kendi_baglantisi = conn is None
+    if kendi_baglantisi:
+        conn = sqlite3.connect(DB_NAME)
+    row = conn.execute("SELECT deger FROM ayarlar WHERE anahtar = ?", (anahtar,)).fetchone()
+    if kendi_baglantisi:
+        conn.close()
+    return row[0] if row else varsayilan
+
+def ayar_yaz(anahtar, deger, conn):
+    conn.execute("INSERT OR REPLACE INTO ayarlar (anahtar, deger) VALUES (?, ?)", (anahtar, str(deger)))
+
+def kesif_yaz(gateway, id_araligi, cihazlar):
+    """
+    Bir gateway'in keşif sonucunu yazar. Taranan ID aralığındaki eski kayıtlar
+    silinir (artık cevap vermeyen cihaz listede kalmasın), aralık dışı korunur.
+    cihazlar: [{'slave_id', 'uyumlu', 'parmak_izi'}, ...]
+    """
+    simdi = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    ids = list(id_araligi)
+    conn = sqlite3.connect(DB_NAME)
+    with conn:
+        conn.execute(
+            "DELETE FROM kesif WHERE ip = ? AND port = ? AND slave_id BETWEEN ? AND ?",
+            (gateway['ip'], gateway['port'], min(ids), max(ids)))
+        conn.executemany(
+            "INSERT INTO kesif (ip, port, slave_id, seri_hat, uyumlu, parmak_izi, zaman) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(gateway['ip'], gateway['port'], c['slave_id'], int(gateway.get('seri_hat', True)),
+              int(c['uyumlu']), c['parmak_izi'], simdi) for c in cihazlar])
+    conn.close()
+
+def kesif_getir():
+    """[(ip, port, slave_id, seri_hat, uyumlu, parmak_izi, zaman)], gateway ve ID sırasında"""
+    conn = sqlite3.connect(DB_NAME)
+    rows = conn.execute('''
+        SELECT ip, port, slave_id, seri_hat, uyumlu, parmak_izi, zaman
+        FROM kesif
+        ORDER BY ip, port, slave_id
+    ''').fetchall()
+    conn.close()
+    return rows
+
+def kompakt_goc(conn=None, paket=KOMPAKT_PAKET):
+    """
+    olcumler'deki satırları olcumler_kompakt'a taşır (kopyalar).
+    Kaldığı id ayarlar tablosunda tutulur: kesilirse devam eder, periyodik
+    çağrılırsa yeni gelen satırları da ekler. Taşınan satır sayısını döner.
+    """
+    kendi_baglantisi = conn is None
+    if kendi_baglantisi:
+        conn = baglanti_ac()
+
+    # Ham değer = round(değer / ölçek); zaman -> epoch ms (julianday ile, Python'a çekmeden)
+    hamlar = ", ".join(f"CAST(ROUND({a} / {o}) AS INTEGER)" for a, o in KOMPAKT_OLCEK.items())
+    toplam = 0
+    try:
+        while True:
+            son_id = int(ayar_oku('kompakt_son_id', 0, conn))
+            row = conn.execute(
+                "SELECT MAX(id) FROM (SELECT id FROM olcumler WHERE id > ? ORDER BY id LIMIT ?)",
+                (son_id, paket)).fetchone()
+            if row[0] is None:
+                break
+            with conn:
+                toplam += conn.execute(f'''
+                    INSERT OR REPLACE INTO olcumler_kompakt
+                    SELECT slave_id,
+                           CAST(ROUND((julianday(zaman) - 2440587.5) * 86400000.0) AS INTEGER),
+                           {hamlar}, hata_kodu, hata_kodu_193
+                    FROM olcumler WHERE id > ? AND id <= ?
+                ''', (son_id, row[0])).rowcount
+                ayar_yaz('kompakt_son_id', row[0], conn)
+    finally:
+        if kendi_baglantisi:
+            conn.close()
+    return toplam
+
+def kompakt_aralik_getir(slave_ids, baslangic, bitis):
+    """
+    Kompakt tablodan bir aralığı doğrudan DataFrame olarak yükler.
+    Zaman string parse edilmez (epoch ms -> datetime64), ölçekler vektörel uygulanır.
+    """
+    bas_ms = int(pd.Timestamp(baslangic).value // 1_000_000)
+    bit_ms = int(pd.Timestamp(bitis).value // 1_000_000)
+    yer = ", ".join("?" * len(slave_ids))
+
+    conn = sqlite3.connect(DB_NAME)
+    df = pd.read_sql_query(f'''
+        SELECT slave_id, zaman_ms, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
+        FROM olcumler_kompakt
+        WHERE slave_id IN ({yer}) AND zaman_ms BETWEEN ? AND ?
+        ORDER BY slave_id, zaman_ms
+    ''', conn, params=[*slave_ids, bas_ms, bit_ms])
+    conn.close()
+
+    df["zaman"] = pd.to_datetime(df.pop("zaman_ms"), unit="ms")
+    for alan, olcek in KOMPAKT_OLCEK.items():
+        df[alan] = df[alan] * olcek
+    return df[["slave_id", "zaman", *KOMPAKT_OLCEK, "hata_kodu", "hata_kodu_193"]]
+
+def parquet_dosyasi(gun, slave_id, klasor=None):
+    """gun: 'YYYY-MM-DD' -> parquet/gun=YYYY-MM-DD/slave_id=N/veri.parquet"""
+    return os.path.join(klasor or PARQUET_KLASORU, f"gun={gun}", f"slave_id={slave_id}", "veri.parquet")
+
+def parquet_aralik_getir(baslangic, bitis, slave_ids=None, klasor=None):
+    """
+    Parquet arşivinden [baslangic, bitis] aralığını tek DataFrame olarak yükler.
+    Sadece ilgili gün/cihaz dosyaları okunur, SQLite'a hiç dokunulmaz.
+    Sütunlar: slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
+    """
+    klasor = klasor or PARQUET_KLASORU
+    baslangic, bitis = pd.Timestamp(baslangic), pd.Timestamp(bitis)
+    gunler = pd.date_range(baslangic.normalize(), bitis.normalize(), freq="D")
+
+    parcalar = []
+    for gun in gunler.strftime('%Y-%m-%d'):
+        gun_klasoru = os.path.join(klasor, f"gun={gun}")
+        if not os.path.isdir(gun_klasoru):
+            continue
+        if slave_ids is None:
+            ids = [int(d.split('=', 1)[1]) for d in os.listdir(gun_klasoru) if d.startswith('slave_id=')]
+        else:
+            ids = slave_ids
+        for sid in ids:
+            dosya = parquet_dosyasi(gun, sid, klasor)
+            if not os.path.exists(dosya):
+                continue
+            # Satır grubu istatistikleriyle aralık dışı bloklar hiç okunmaz
+            df = pd.read_parquet(dosya, filters=[("zaman", ">=", baslangic), ("zaman", "<=", bitis)])
+            df.insert(0, "slave_id", sid)
+            parcalar.append(df)
+
+    sutunlar = ["slave_id", "zaman", "guc", "voltaj", "akim", "sicaklik", "hata_kodu", "hata_kodu_193"]
+    if not parcalar:
+        return pd.DataFrame(columns=sutunlar)
+    return pd.concat(parcalar, ignore_index=True)[sutunlar].sort_values(["slave_id", "zaman"], ignore_index=True)
+
+def adimli_seri(rows, baslangic, bitis, adim, tutma=None):
+    """
+    Sıkıştırılmış (sadece değişimlerin yazıldığı) satırları düzenli zaman
+    ızgarasına açar: her değer bir sonraki satıra kadar tutulur, en fazla
+    `tutma` sn (varsayılan sikistirma.SIKISTIRMA['tutma_suresi']). Daha uzun
+    boşluklar None kalır. Sütun sırası rows ile aynıdır, zaman metin döner.
+    """
+    if not rows:
+        return []
+    tutma = sikistirma.SIKISTIRMA['tutma_suresi'] if tutma is None else tutma
+    df = pd.DataFrame(rows).rename(columns={0: 'zaman'})
+    df['zaman'] = pd.to_datetime(df['zaman'], format="ISO8601")
+    df = df.drop_duplicates('zaman', keep='last').set_index('zaman').sort_index()
+
+    izgara = pd.date_range(pd.Timestamp(baslangic).ceil(f"{adim}s"), bitis, freq=f"{adim}s")
+    # Her ızgara noktası için ondan önceki en son satır; yaşı tutma'dan büyükse boş
+    konum = df.index.searchsorted(izgara, side='right') - 1
+    gecerli = konum >= 0
+    yas = np.full(len(izgara), np.inf)
+    yas[gecerli] = (izgara[gecerli] - df.index[konum[gecerli]]).total_seconds()
+    sonuc = df.iloc[np.clip(konum, 0, None)].set_axis(izgara)
+    sonuc = sonuc.astype(object).where(pd.Series(yas <= tutma, index=izgara), None)
+    zamanlar = izgara.strftime('%Y-%m-%d %H:%M:%S.%f')
+    return [(z, *degerler) for z, degerler in zip(zamanlar, sonuc.itertuples(index=False, name=None))]
+
+def _adimli_aralik(conn, slave_id, baslangic, bitis, adim):
+    # Pencere başındaki değeri taşıyan (pencereden önceki) satır da gelsin
+    arama = baslangic - timedelta(seconds=sikistirma.SIKISTIRMA['tutma_suresi'])
+    rows = conn.execute('''
         SELECT zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
-        FROM olcumler 
-        WHERE slave_id = {slave_id}
-        ORDER BY zaman DESC 
-        LIMIT {limit}
-    ''')
-    rows = cursor.fetchall()
+        FROM olcumler
+        WHERE slave_id = ? AND zaman >= ? AND zaman <= ?
+        ORDER BY zaman ASC
+    ''', (slave_id, arama.strftime('%Y-%m-%d %H:%M:%S.%f'), bitis.strftime('%Y-%m-%d %H:%M:%S.%f'))).fetchall()
+    return adimli_seri(rows, baslangic, bitis, adim)
+
+def _canli_bitis(conn, slave_id):
+    """Adımlı canlı serinin son ızgara zamanı; cihazın hiç satırı yoksa None."""
+    son = conn.execute(
+        "SELECT MAX(zaman) FROM olcumler WHERE slave_id = ?", (slave_id,)).fetchone()[0]
+    if son is None:
+        return None
+    tutma = sikistirma.SIKISTIRMA['tutma_suresi']
+    # Yazıcı kuyruğundaki satırlar en geç TOPLU_YAZMA_SURESI sonra diskte olur:
+    # daha yeni ızgara noktaları henüz gelmemiş değişimi kaçırıp eski değeri tutmasın.
+    # Cihaz artık yazmıyorsa pencere son satırda biter (eski veri de görünsün).
+    return min(datetime.now() - timedelta(seconds=TOPLU_YAZMA_SURESI),
+               pd.Timestamp(son).to_pydatetime() + timedelta(seconds=tutma))
+
+# Okuma sorguları sabit metin + parametre: bağlantının hazır ifade (statement)
+# önbelleği aynı sorguyu tekrar derlemez (VeriOkuyucu bağlantıyı açık tutar)
+SON_VERILER_SQL = '''
+    SELECT zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
+    FROM olcumler
+    WHERE slave_id = ?
+    ORDER BY zaman DESC
+    LIMIT ?
+'''
+SON_VERILER_SINCE_SQL = '''
+    SELECT zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
+    FROM olcumler
+    WHERE slave_id = ? AND zaman > ?
+    ORDER BY zaman DESC
+    LIMIT ?
+'''
+
+def _son_veriler(conn, slave_id, limit, adim):
+    if adim:
+        bitis = _canli_bitis(conn, slave_id)
+        if bitis is None:
+            return []
+        return _adimli_aralik(conn, slave_id, bitis - timedelta(seconds=limit * adim), bitis, adim)
+    return conn.execute(SON_VERILER_SQL, (slave_id, limit)).fetchall()[::-1]
+
+def _son_veriler_since(conn, slave_id, son_zaman, adim, limit):
+    if adim:
+        bitis = _canli_bitis(conn, slave_id)
+        baslangic = pd.Timestamp(son_zaman).to_pydatetime() + timedelta(seconds=adim)
+        if bitis is None or bitis < baslangic:
+            return []
+        baslangic = max(baslangic, bitis - timedelta(seconds=(limit - 1) * adim))
+        return _adimli_aralik(conn, slave_id, baslangic, bitis, adim)
+    return conn.execute(SON_VERILER_SINCE_SQL, (slave_id, son_zaman, limit)).fetchall()[::-1]
+
+def son_verileri_getir(slave_id, limit=100, adim=None):
+    """
+    Cihazın son `limit` ölçümü. adim (sn) verilirse yazılan son satırlar yerine
+    son limit*adim saniyelik seri adım tutularak düzenli ızgarada geri kurulur
+    (sıkıştırma açıkken grafikler zamanla orantılı kalsın diye).
+    """
+    conn = sqlite3.connect(DB_NAME)
+    rows = _son_veriler(conn, slave_id, limit, adim)
     conn.close()
-    return rows[::-1]
+    return rows
 
-def tum_cihazlarin_son_durumu():
+def son_verileri_getir_since(slave_id, son_zaman, adim=None, limit=100):
+    """
+    son_verileri_getir'in artımlı hali: sadece son_zaman'dan sonraki satırlar,
+    eskiden yeniye. Panel elindeki son zamanı verir; maliyet pencere boyuna
+    değil yeni veri miktarına bağlıdır. adim verilirse son_verileri_getir ile
+    aynı ızgaranın son_zaman'dan sonraki noktaları döner. Arada uzun bir
+    boşluk varsa sadece son `limit` nokta gelir.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    rows = _son_veriler_since(conn, slave_id, son_zaman, adim, limit)
+    conn.close()
+    return rows
+
+def cozunurluk_sec(baslangic, bitis, hedef_nokta=HEDEF_NOKTA):
+    """
+    Aralık için en kaba ama yine de ~hedef_nokta nokta veren özet tablosunu seçer.
+    Hiçbiri yetmiyorsa (kısa aralık) None döner: ham veri kullanılır.
+    """
+    pencere = (bitis - baslangic).total_seconds()
+    for tablo, saniye in sorted(OZET_TABLOLARI, key=lambda t: -t[1]):
+        if pencere / saniye >= hedef_nokta / 2:
+            return tablo
+    return None
+
+def aralik_getir(slave_id, baslangic, bitis, hedef_nokta=HEDEF_NOKTA):
+    """
+    Bir cihazın [baslangic, bitis] aralığındaki serisini son_verileri_getir ile
+    aynı sütun sırasında döner. Uzun aralıklarda özet tablolarından zaman
+    ağırlıklı ortalamalar (alarm bitleri kova içinde OR'lanmış) gelir; maliyet
+    aralık uzunluğundan bağımsız olarak ~hedef_nokta satırdır. Kısa aralıklarda
+    ham satırlar adım tutularak HAM_ADIM sn'lik ızgaraya açılır (adimli_seri).
+    """
+    conn = sqlite3.connect(DB_NAME)
+    rows = _aralik(conn, slave_id, baslangic, bitis, hedef_nokta)
+    conn.close()
+    return rows
+
+def _aralik(conn, slave_id, baslangic, bitis, hedef_nokta):
+    tablo = cozunurluk_sec(baslangic, bitis, hedef_nokta)
+    if tablo is None:
+        return _adimli_aralik(conn, slave_id, baslangic, bitis, HAM_ADIM)
+
+    bas = baslangic.strftime('%Y-%m-%d %H:%M:%S.%f')
+    bit = bitis.strftime('%Y-%m-%d %H:%M:%S.%f')
+    # Süresi henüz işlenmemiş (tek satırlı, en yeni) kovada min/max ortası
+    ortalamalar = ", ".join(f"COALESCE({a}_toplam / NULLIF(sure, 0), ({a}_min + {a}_max) / 2)"
+                            for a in OZET_ALANLARI)
+    return conn.execute(f'''
+        SELECT datetime(zaman, 'unixepoch'), {ortalamalar}, hata_kodu, hata_kodu_193
+        FROM {tablo}
+        WHERE slave_id = ?
+          AND zaman BETWEEN CAST(strftime('%s', ?) AS INTEGER) AND CAST(strftime('%s', ?) AS INTEGER)
+        ORDER BY zaman ASC
+    ''', (slave_id, bas, bit)).fetchall()
+
+def coklu_aralik_getir(slave_ids, baslangic, bitis, alan='guc', adim=None, hedef_nokta=HEDEF_NOKTA):
+    """
+    Birden çok cihazın [baslangic, bitis] aralığı tek sorguda, geniş biçimde:
+    index zaman, sütunlar slave_id (sırası slave_ids ile aynı, verisi olmayan
+    cihaz NaN sütun). Tablo seçimi aralik_getir ile aynıdır. Tüm cihazlar
+    tek sorguda (slave_id IN ... AND zaman aralığı) idx_slave_zaman / birincil
+    anahtar üzerinden okunur; cihaz sayısı kadar bağlantı ya da sorgu açılmaz.
+    adim (sn) verilirse seri bu aralıklı ızgaraya yeniden örneklenir: ham
+    veride adım tutularak, özet tablosunda kovalar zaman ağırlıklı birleştirilerek.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    df = _coklu_aralik(conn, slave_ids, baslangic, bitis, alan, adim, hedef_nokta)
+    conn.close()
+    return df
+
+def _coklu_aralik(conn, slave_ids, baslangic, bitis, alan, adim, hedef_nokta):
+    if alan not in OZET_ALANLARI:
+        raise ValueError(f"Bilinmeyen alan: {alan}")
+    slave_ids = [int(i) for i in slave_ids]
+    if not slave_ids:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="zaman"))
+    idler = ", ".join("?" * len(slave_ids))
+    tablo = cozunurluk_sec(baslangic, bitis, hedef_nokta)
+
+    if tablo is None:
+        # Ham satırlar: pencere başındaki değeri taşıyan önceki satırlar da gelsin
+        tutma = sikistirma.SIKISTIRMA['tutma_suresi']
+        arama = baslangic - timedelta(seconds=tutma)
+        df = pd.read_sql_query(f'''
+            SELECT slave_id, zaman, {alan} AS deger FROM olcumler
+            WHERE slave_id IN ({idler}) AND zaman >= ? AND zaman <= ?
+        ''', conn, params=[*slave_ids, arama.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                             bitis.strftime('%Y-%m-%d %H:%M:%S.%f')])
+        df["zaman"] = pd.to_datetime(df["zaman"], format="ISO8601").astype("datetime64[ns]")
+        df["slave_id"] = df["slave_id"].astype(np.int64)
+        adim = adim or HAM_ADIM
+        izgara = pd.date_range(pd.Timestamp(baslangic).ceil(f"{adim}s"), bitis, freq=f"{adim}s", name="zaman")
+        # Her (ızgara noktası, cihaz) için ondan önceki en son satır, en fazla tutma sn eski (adimli_seri)
+        noktalar = pd.DataFrame({
+            "zaman": np.tile(izgara.values.astype("datetime64[ns]"), len(slave_ids)),
+            "slave_id": np.repeat(np.array(slave_ids, dtype=np.int64), len(izgara)),
+        }).sort_values("zaman", kind="stable")
+        eslesme = pd.merge_asof(noktalar, df.sort_values("zaman"), on="zaman", by="slave_id",
+                                tolerance=pd.Timedelta(seconds=tutma), allow_exact_matches=True)
+        genis = eslesme.pivot(index="zaman", columns="slave_id", values="deger")
+    else:
+        saniye = dict(OZET_TABLOLARI)[tablo]
+        df = pd.read_sql_query(f'''
+            SELECT slave_id, zaman, {alan}_toplam AS toplam, sure, ({alan}_min + {alan}_max) / 2 AS orta
+            FROM {tablo}
+            WHERE slave_id IN ({idler})
+              AND zaman BETWEEN CAST(strftime('%s', ?) AS INTEGER) AND CAST(strftime('%s', ?) AS INTEGER)
+        ''', conn, params=[*slave_ids, baslangic.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                             bitis.strftime('%Y-%m-%d %H:%M:%S.%f')])
+        adim = max(int(adim or saniye), saniye)
+        df["zaman"] = df["zaman"] // adim * adim
+        # Kovalar birleşirken ortalama sure ile ağırlıklı; süresi işlenmemiş kovada min/max ortası
+        toplamlar = df.groupby(["zaman", "slave_id"])[["toplam", "sure", "orta"]].agg(
+            {"toplam": "sum", "sure": "sum", "orta": "mean"})
+        deger = (toplamlar["toplam"] / toplamlar["sure"].where(toplamlar["sure"] > 0)).fillna(toplamlar["orta"])
+        genis = deger.unstack("slave_id")
+        bas = pd.Timestamp(baslangic).timestamp() // adim * adim
+        kovalar = np.arange(bas, pd.Timestamp(bitis).timestamp() + 1, adim).astype(np.int64)
+        genis = genis.reindex(kovalar)
+        genis.index = pd.DatetimeIndex(pd.to_datetime(genis.index, unit='s'), name="zaman")
+
+    genis = genis.reindex(columns=slave_ids)
+    genis.columns.name = "slave_id"
+    return genis.astype(float)
+
+def filo_ozet_getir(tablo, baslangic, bitis):
+    """
+    Tüm cihazların bir özet tablosundaki [baslangic, bitis] kovaları (kova
+    anahtarı, epoch sn) tek sorguda: (slave_id, zaman, ortalama guc, alarm var mı).
+    Cihaz listesi son_durum'dan gelir; her cihaz için birincil anahtarda
+    aralık taraması yapılır, tablonun geri kalanı okunmaz.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    rows = conn.execute(f'''
+        SELECT slave_id, zaman, COALESCE(guc_toplam / NULLIF(sure, 0), (guc_min + guc_max) / 2),
+               (hata_kodu | hata_kodu_193) != 0
+        FROM {tablo}
+        WHERE slave_id IN (SELECT slave_id FROM son_durum) AND zaman BETWEEN ? AND ?
+    ''', (int(baslangic), int(bitis))).fetchall()
+    conn.close()
+    return rows
+
+def ozet_seri_getir(tablo, baslangic, bitis, alanlar=('guc', 'sicaklik')):
+    """
+    Tüm cihazların bir özet tablosundaki [baslangic, bitis] kovaları (epoch sn)
+    uzun biçimde: DataFrame [slave_id, zaman, alan...]; değerler zaman ağırlıklı ortalamadır.
+    """
+    ortalamalar = ", ".join(f"COALESCE({a}_toplam / NULLIF(sure, 0), ({a}_min + {a}_max) / 2) AS {a}"
+                            for a in alanlar)
+    conn = sqlite3.connect(DB_NAME)
+    df = pd.read_sql_query(f'''
+        SELECT slave_id, zaman, {ortalamalar}
+        FROM {tablo}
+        WHERE slave_id IN (SELECT slave_id FROM son_durum) AND zaman BETWEEN ? AND ?
+    ''', conn, params=(int(baslangic), int(bitis)))
+    conn.close()
+    return df
+
+def anomali_yaz(baslangic, bitis, anomaliler, yuksek_kotu=()):
+    """
+    [baslangic, bitis] analizinin sonucunu yazar: bu aralıkta başlamış eski
+    kayıtlar yenileriyle değiştirilir. Aralıktan önce açılmış ve yeni bir
+    dönemle kesişen kayıt o dönemin devamıdır: yeni satır açılmaz, eski
+    satırın bitişi ve değeri güncellenir (tur yuksek_kotu içindeyse en
+    büyük, değilse en küçük değer saklanır).
+    anomaliler: DataFrame [slave_id, tur, baslangic, bitis, deger]
+    """
+    bas = baslangic.strftime('%Y-%m-%d %H:%M:%S')
+    bit = bitis.strftime('%Y-%m-%d %H:%M:%S')
+    conn = baglanti_ac()
+    with conn:
+        acik = {(s, t): (i, b) for i, s, t, b in conn.execute('''
+            SELECT id, slave_id, tur, bitis FROM anomaliler
+            WHERE baslangic < ? AND bitis >= ? ORDER BY baslangic
+        ''', (bas, bas))}
+        conn.execute("DELETE FROM anomaliler WHERE baslangic >= ? AND baslangic <= ?", (bas, bit))
+        yeni = 0
+        for a in anomaliler.itertuples(index=False):
+            a_bas = a.baslangic.strftime('%Y-%m-%d %H:%M:%S')
+            a_bit = a.bitis.strftime('%Y-%m-%d %H:%M:%S')
+            onceki = acik.get((int(a.slave_id), a.tur))
+            if onceki and a_bas <= onceki[1]:
+                conn.execute(f'''
+                    UPDATE anomaliler SET bitis = MAX(bitis, ?), deger = {"MAX" if a.tur in yuksek_kotu else "MIN"}(deger, ?)
+                    WHERE id = ?
+                ''', (a_bit, float(a.deger), onceki[0]))
+                continue
+            conn.execute("INSERT INTO anomaliler (slave_id, tur, baslangic, bitis, deger) VALUES (?, ?, ?, ?, ?)",
+                         (int(a.slave_id), a.tur, a_bas, a_bit, float(a.deger)))
+            yeni += 1
+    conn.close()
+    return yeni
+
+def anomalileri_getir(baslangic, bitis, slave_ids=None):
+    """[baslangic, bitis] ile kesişen anomaliler: DataFrame [slave_id, tur, baslangic, bitis, deger, sure]"""
+    sql = '''
+        SELECT slave_id, tur, baslangic, bitis, deger FROM anomaliler
+        WHERE bitis >= ? AND baslangic <= ?
+    '''
+    params = [baslangic.strftime('%Y-%m-%d %H:%M:%S'), bitis.strftime('%Y-%m-%d %H:%M:%S')]
+    if slave_ids:
+        sql += f" AND slave_id IN ({', '.join('?' * len(slave_ids))})"
+        params += list(slave_ids)
+
+    conn = sqlite3.connect(DB_NAME)
+    df = pd.read_sql_query(sql + " ORDER BY baslangic", conn, params=params)
+    conn.close()
+
+    df["baslangic"] = pd.to_datetime(df["baslangic"], format="ISO8601")
+    df["bitis"] = pd.to_datetime(df["bitis"], format="ISO8601")
+    df["sure"] = df["bitis"] - df["baslangic"]
+    return df
+
+def uretim_getir(baslangic, bitis, slave_ids=None, donem='gun', simdi=None):
+    """
+    Cihaz başına enerji üretimi, [baslangic, bitis] günleri (date) için.
+    Kaynak olcumler_gunluk'un guc_toplam'ı (W·sn): her ölçüm, bir sonraki ölçüm
+    yazılırken ona kadar, en fazla tutma_suresi sn adım tutularak entegre edilir; daha uzun boşluklar (cihaz/collector kapalı)
+    üretime katılmaz. Bugün için son ölçümün henüz işlenmemiş tutma süresi
+    son_durum'dan eklenir. Maliyet cihaz ve gün başına tek satırdır.
+    donem: 'gun' ya da 'ay'.
+    Dönüş: DataFrame [slave_id, donem, uretim_kwh, kapsama]
+    (kapsama: değeri bilinen süre / dönemin aralıktaki ve şimdiye kadarki süresi)
+    """
+    simdi = simdi or datetime.now()
+    bugun = simdi.strftime('%Y-%m-%d')
+    sql = '''
+        SELECT slave_id, date(zaman, 'unixepoch') AS gun, guc_toplam AS ws, sure
+        FROM olcumler_gunluk
+        WHERE zaman BETWEEN CAST(strftime('%s', ?) AS INTEGER) AND CAST(strftime('%s', ?) AS INTEGER)
+    '''
+    params = [baslangic.strftime('%Y-%m-%d'), bitis.strftime('%Y-%m-%d')]
+    kuyruk_sql = "SELECT slave_id, zaman, guc FROM son_durum WHERE zaman >= ?"
+    kuyruk_params = [bugun]
+    if slave_ids:
+        filtre = f" AND slave_id IN ({', '.join('?' * len(slave_ids))})"
+        sql += filtre
+        kuyruk_sql += filtre
+        params += list(slave_ids)
+        kuyruk_params += list(slave_ids)
+
+    conn = sqlite3.connect(DB_NAME)
+    df = pd.read_sql_query(sql, conn, params=params)
+    if params[0] <= bugun <= params[1]:
+        # Son satırın süresi bir sonraki satır gelince işlenir: şimdiye kadarki kısmı
+        kuyruk = pd.read_sql_query(kuyruk_sql, conn, params=kuyruk_params)
+        yas = (pd.Timestamp(simdi) - pd.to_datetime(kuyruk["zaman"], format="ISO8601")).dt.total_seconds()
+        kuyruk["sure"] = yas.clip(lower=0, upper=sikistirma.SIKISTIRMA['tutma_suresi'])
+        kuyruk["ws"] = kuyruk["guc"] * kuyruk["sure"]
+        kuyruk["gun"] = bugun
+        df = pd.concat([df, kuyruk[df.columns]], ignore_index=True)
+    conn.close()
+
+    df["donem"] = df["gun"].str[:7] if donem == 'ay' else df["gun"]
+    df = df.groupby(["slave_id", "donem"], as_index=False)[["ws", "sure"]].sum()
+
+    # Dönemin aralığa ve şimdiye kırpılmış süresi
+    bas = pd.to_datetime(df["donem"])
+    son = bas + (pd.DateOffset(months=1) if donem == 'ay' else pd.Timedelta(days=1))
+    bas = bas.clip(lower=pd.Timestamp(baslangic))
+    son = son.clip(upper=min(pd.Timestamp(bitis) + pd.Timedelta(days=1), pd.Timestamp(simdi)))
+    df["uretim_kwh"] = df["ws"] / 3.6e6
+    df["kapsama"] = (df["sure"] / (son - bas).dt.total_seconds()).clip(upper=1.0)
+    return df.sort_values(["slave_id", "donem"], ignore_index=True)[["slave_id", "donem", "uretim_kwh", "kapsama"]]
+
+def son_kayit_id():
+    """En son eklenen ölçümün id'si (önbellek anahtarı olarak kullanılır)."""
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
-    # Hata kodlarını (189 ve 193) çekiyoruz
-    cursor.execute('''
-        SELECT slave_id, MAX(zaman) as son_zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
-        FROM olcumler
-        GROUP BY slave_id
-        ORDER BY slave_id ASC
-    ''')
-    rows = cursor.fetchall()
+    cursor.execute('SELECT MAX(id) FROM olcumler')
+    son_id = cursor.fetchone()[0]
+    conn.close()
+    return son_id or 0
+
+# son_durum yazıcıda paket başına güncel tutuluyor: geçmiş ne kadar büyük olursa olsun
+# cihaz sayısı kadar satır okunur. Hata kodlarını (189 ve 193) da çekiyoruz.
+SON_DURUM_SQL = '''
+    SELECT slave_id, zaman as son_zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
+    FROM son_durum
+    ORDER BY slave_id ASC
+'''
+
+def tum_cihazlarin_son_durumu():
+    conn = sqlite3.connect(DB_NAME)
+    rows = conn.execute(SON_DURUM_SQL).fetchall()
     conn.close()
     return rows
 
+class VeriOkuyucu:
+    """
+    Panel ve sayfalar için kalıcı, salt okunur (URI mode=ro) bağlantılı okuyucu.
+
+    Her sorgu sabit metinli ve parametrelidir; bağlantı açık kaldığından
+    SQLite derlenmiş ifadeleri yeniden kullanır. WAL'da okuyucu yazıcıyı
+    bloklamaz. Sonuçlar doğrudan tipli DataFrame (zaman: datetime64) ya da
+    NumPy dizisi olarak döner ve en fazla `kapasite` sonuç LRU önbellekte
+    tutulur. Önbellek olcumler'in son rowid'i (MAX(id)) değişince boşaltılır;
+    rowid en fazla `kontrol_suresi` sn'de bir sorulur. "Şimdi"ye bağlı sonuçların
+    (adımlı son veriler, son pencere) anahtarında ayrıca zaman_kovasi vardır:
+    ölü bant sıkıştırmasında MAX(id) uzun süre aynı kalsa da ızgara ilerler.
+
+    Streamlit'te st.cache_resource ile tüm oturumlar tek okuyucuyu paylaşır
+    (sorgular kilit altında sırayla çalışır). Dönen DataFrame'ler önbellekteki
+    nesnenin kopyasıdır, çağıran değiştirebilir.
+        okuyucu = VeriOkuyucu()
+        df = okuyucu.son_veriler(1, limit=100, adim=2)
+    """
+
+    def __init__(self, db_yolu=None, kapasite=256, kontrol_suresi=1.0):
+        self.db_yolu = os.path.abspath(db_yolu or DB_NAME)
+        self.kapasite = kapasite
+        self.kontrol_suresi = kontrol_suresi
+        self._conn = None
+        self._kilit = threading.RLock()
+        self._onbellek = OrderedDict()
+        self._surum = None           # Önbelleğin ait olduğu MAX(id)
+        self._kontrol_zamani = 0.0
+
+    def _baglanti(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(f"file:{quote(self.db_yolu)}?mode=ro", uri=True,
+                                         timeout=10, check_same_thread=False)
+        return self._conn
+
+    def kapat(self):
+        with self._kilit:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._onbellek.clear()
+
+    def _calistir(self, islem):
+        # Bağlantı koparsa (DB silinip yeniden kuruldu vb.) bir kez yeniden açılır
+        try:
+            return islem(self._baglanti())
+        except sqlite3.OperationalError:
+            self.kapat()
+            return islem(self._baglanti())
+
+    def son_id(self):
+        """En son ölçümün rowid'i (önbellek anahtarı; en fazla kontrol_suresi eski)."""
+        with self._kilit:
+            simdi = time.monotonic()
+            if self._surum is None or simdi - self._kontrol_zamani >= self.kontrol_suresi:
+                son = self._calistir(lambda c: c.execute("SELECT MAX(id) FROM olcumler").fetchone()[0]) or 0
+                if son != self._surum:
+                    self._onbellek.clear()
+                    self._surum = son
+                self._kontrol_zamani = simdi
+            return self._surum
+
+    def _onbellekli(self, anahtar, islem):
+        with self._kilit:
+            self.son_id()
+            if anahtar in self._onbellek:
+                self._onbellek.move_to_end(anahtar)
+                sonuc = self._onbellek[anahtar]
+            else:
+                sonuc = self._onbellek[anahtar] = self._calistir(islem)
+                while len(self._onbellek) > self.kapasite:
+                    self._onbellek.popitem(last=False)
+        return sonuc.copy()
+
+    @staticmethod
+    def olcum_cercevesi(rows):
+        """Ölçüm satırları -> zaman indeksli, tipli DataFrame (OLCUM_SUTUNLARI)."""
+        sutunlar = list(zip(*rows)) or [()] * len(OLCUM_SUTUNLARI)
+        zaman = pd.DatetimeIndex(pd.to_datetime(list(sutunlar[0]), format="ISO8601"), name="zaman")
+        # Izgarada tutma süresini aşan boşluklar None gelir: değerler NaN, alarm kelimeleri <NA>
+        veri = {ad: np.array(deger, dtype=float) for ad, deger in zip(OLCUM_SUTUNLARI[1:5], sutunlar[1:5])}
+        veri.update({ad: pd.array(deger, dtype="Int64") for ad, deger in zip(OLCUM_SUTUNLARI[5:], sutunlar[5:])})
+        return pd.DataFrame(veri, index=zaman)
+
+    @staticmethod
+    def zaman_kovasi(adim):
+        """Her `adim` sn'de bir değişen anahtar parçası (adim yoksa sonuç zamana bağlı değil)."""
+        return int(time.time() // adim) if adim else None
+
+    @staticmethod
+    def pencere_adimi(pencere, hedef_nokta=HEDEF_NOKTA):
+        """Son `pencere` sorgusunun yaklaşık ızgara adımı (sn)."""
+        return max(pencere.total_seconds() / hedef_nokta, HAM_ADIM)
+
+    def son_durum(self):
+        """Cihaz başına son ölçüm: DataFrame [slave_id, son_zaman, guc, ..., hata_kodu_193]"""
+        def islem(conn):
+            df = pd.read_sql_query(SON_DURUM_SQL, conn)
+            df["son_zaman"] = pd.to_datetime(df["son_zaman"], format="ISO8601")
+            return df
+        return self._onbellekli(('son_durum',), islem)
+
+    def cihazlar(self):
+        """Kayıtlı slave_id'ler (NumPy dizisi, sıralı)."""
+        return self.son_durum()["slave_id"].to_numpy()
+
+    def aktif_alarmlar(self):
+        """Hâlâ açık arızalar: DataFrame [slave_id, register, bit, baslangic]"""
+        def islem(conn):
+            df = pd.read_sql_query(AKTIF_ALARMLAR_SQL, conn)
+            df["baslangic"] = pd.to_datetime(df["baslangic"], format="ISO8601")
+            return df
+        # Yazıcı alarm olaylarını onları doğuran ölçümle aynı transaction'da yazar: MAX(id) ile değişir
+        return self._onbellekli(('aktif_alarmlar',), islem)
+
+    def son_veriler(self, slave_id, limit=100, adim=None):
+        """son_verileri_getir'in DataFrame hali (zaman indeksli)."""
+        return self._onbellekli(
+            ('son_veriler', slave_id, limit, adim, self.zaman_kovasi(adim)),
+            lambda c: self.olcum_cercevesi(_son_veriler(c, slave_id, limit, adim)))
+
+    def son_veriler_since(self, slave_id, son_zaman, adim=None, limit=100):
+        """son_verileri_getir_since'in DataFrame hali (son_zaman: Timestamp ya da metin)."""
+        if not isinstance(son_zaman, str):
+            son_zaman = pd.Timestamp(son_zaman).strftime('%Y-%m-%d %H:%M:%S.%f')
+        return self._onbellekli(
+            ('son_veriler_since', slave_id, son_zaman, adim, limit, self.zaman_kovasi(adim)),
+            lambda c: self.olcum_cercevesi(_son_veriler_since(c, slave_id, son_zaman, adim, limit)))
+
+    def aralik(self, slave_id, baslangic, bitis, hedef_nokta=HEDEF_NOKTA):
+        """aralik_getir'in DataFrame hali (zaman indeksli)."""
+        return self._onbellekli(
+            ('aralik', slave_id, baslangic, bitis, hedef_nokta),
+            lambda c: self.olcum_cercevesi(_aralik(c, slave_id, baslangic, bitis, hedef_nokta)))
+
+    def son_pencere(self, slave_id, pencere, hedef_nokta=HEDEF_NOKTA):
+        """
+        Şimdiye kadarki son `pencere` (timedelta). Anahtar pencere ve zaman kovasıdır:
+        yeni ölçüm gelmese de sonuç ızgara adımında bir yeniden hesaplanır.
+        """
+        def islem(conn):
+            simdi = datetime.now()
+            return self.olcum_cercevesi(_aralik(conn, slave_id, simdi - pencere, simdi, hedef_nokta))
+        kova = self.zaman_kovasi(self.pencere_adimi(pencere, hedef_nokta))
+        return self._onbellekli(('son_pencere', slave_id, pencere, hedef_nokta, kova), islem)
+
+    def coklu_aralik(self, slave_ids, baslangic, bitis, alan='guc', adim=None, hedef_nokta=HEDEF_NOKTA):
+        """coklu_aralik_getir'in önbellekli hali (geniş DataFrame, sütunlar slave_id)."""
+        slave_ids = tuple(int(i) for i in slave_ids)
+        return self._onbellekli(
+            ('coklu_aralik', slave_ids, baslangic, bitis, alan, adim, hedef_nokta),
+            lambda c: _coklu_aralik(c, slave_ids, baslangic, bitis, alan, adim, hedef_nokta))
+
+    def coklu_son_pencere(self, slave_ids, pencere, alan='guc', adim=None, hedef_nokta=HEDEF_NOKTA):
+        """Son `pencere` için coklu_aralik; anahtar son_pencere'deki gibi pencere ve zaman kovasıdır."""
+        slave_ids = tuple(int(i) for i in slave_ids)
+        def islem(conn):
+            simdi = datetime.now()
+            return _coklu_aralik(conn, slave_ids, simdi - pencere, simdi, alan, adim, hedef_nokta)
+        kova = self.zaman_kovasi(adim or self.pencere_adimi(pencere, hedef_nokta))
+        return self._onbellekli(('coklu_son_pencere', slave_ids, pencere, alan, adim, hedef_nokta, kova), islem)
+
+    def dizi(self, slave_id, alan, baslangic, bitis, hedef_nokta=HEDEF_NOKTA):
+        """Tek alanın aralıktaki serisi NumPy olarak: (zamanlar datetime64[ns], degerler float64)"""
+        df = self.aralik(slave_id, baslangic, bitis, hedef_nokta)
+        return df.index.to_numpy(), df[alan].to_numpy(dtype=float)
+
 def db_temizle():
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
     try:
         cursor.execute('DELETE FROM olcumler')
+        cursor.execute('DELETE FROM son_durum')
+        for tablo, _ in OZET_TABLOLARI:
+            cursor.execute(f'DELETE FROM {tablo}')
+        cursor.execute('DELETE FROM olcumler_kompakt')
+        cursor.execute('DELETE FROM alarm_olaylari')
+        cursor.execute('DELETE FROM anomaliler')
+        cursor.execute("DELETE FROM ayarlar WHERE anahtar = 'kompakt_son_id'")
         conn.commit()
         return True
     except: return False
@@ -0,0 +1,133 @@
+"""
+Cihaz bazında uyarlanabilir okuma zamanlayıcısı.
+
+Her cihazın sağlığı ve son değerleri tutulur; aralık buna göre seçilir:
+    - Cevap vermeyen cihaz : normal * 2^hata, en fazla geri_cekilme_max (üstel geri çekilme)
+    - Alarmı aktif cihaz    : hizli
+    - Gece / güç sabit      : yavas (alarm register'ları yine normal aralıkla okunur)
+    - Diğerleri             : normal (REFRESH_RATE)
+
+Yavaşlatılan cihazlarda telemetri seyrekleşir ama alarm register'ları
+hafif bir "alarm okuması" ile normal aralıkta sorulmaya devam eder; alarm
+görülürse cihaz hemen hızlı moda alınır.
+
+Seri hatlarda (RS485) bir turda hatta harcanacak tahmini süre
+hat_doluluk * tur süresi ile sınırlanır. Sığmayan cihazlar bir sonraki tura
+kalır; öncelik sırası: alarmlı cihazlar, alarm okumaları, en çok gecikenler.
+"""
+import time
+
+# --- ZAMANLAMA AYARLARI ---
+ZAMANLAMA = {
+    'normal': 2.0,             # sn, collector.REFRESH_RATE ile aynı tutulur
+    'hizli': 1.0,              # Alarmı aktif cihaz
+    'yavas': 30.0,             # Gece ya da değerleri sabit cihaz
+    'geri_cekilme_max': 600.0, # Cevapsız cihaz en fazla bu kadar sn'de bir denenir
+    'gece_guc': 0,             # guc bu değerin altında/eşitse "gece"
+    'sabit_oran': 0.01,        # guc değişimi bu oranın altındaysa "sabit"
+    'sabit_tur': 5,            # Bu kadar ardışık sabit okumadan sonra yavaşla
+    'hat_doluluk': 0.8,        # Seri hatta tur süresinin en fazla bu kadarı kullanılır
+    'tahmini_sure': 0.1,       # Hiç okunmamış cihaz için tahmini okuma süresi (sn)
+}
+
+TAM = 'tam'        # Tüm register'lar (telemetri + alarm)
+ALARM = 'alarm'    # Sadece alarm register'ları
+
+class CihazDurumu:
+    def __init__(self, simdi):
+        self.aralik = ZAMANLAMA['normal']
+        self.sonraki = simdi           # Tam okuma zamanı
+        self.sonraki_alarm = simdi     # Yavaş modda alarm okuması zamanı
+        self.hata = 0                  # Ardışık cevapsız okuma
+        self.sabit = 0                 # Ardışık sabit (ya da gece) okuma
+        self.son_guc = None
+        self.alarm = False
+        self.sure = ZAMANLAMA['tahmini_sure']  # Okuma süresinin kayan ortalaması
+        self.mod = 'normal'
+
+class Zamanlayici:
+    """
+    Kullanım (her tur):
+        for slave_id, tur in z.siradakiler(hat, tur_suresi, seri_hat): ... oku ...
+            z.sonuc(hat, slave_id, tur, data, sure)
+    hat: gateway anahtarı ('ip:port'), aynı slave ID farklı hatlarda olabilir.
+    """
+
+    def __init__(self, hatlar):
+        # hatlar: {hat: [slave_id, ...]}
+        simdi = time.monotonic()
+        self.cihazlar = {(hat, dev_id): CihazDurumu(simdi)
+                         for hat, ids in hatlar.items() for dev_id in ids}
+
+    def siradakiler(self, hat, tur_suresi, seri_hat=True, simdi=None):
+        """Bu turda okunacak [(slave_id, TAM|ALARM), ...] (öncelik sırasıyla)."""
+        simdi = time.monotonic() if simdi is None else simdi
+        adaylar = []
+        for (h, dev_id), d in self.cihazlar.items():
+            if h != hat:
+                continue
+            if d.sonraki <= simdi:
+                oncelik = 0 if d.alarm else 2
+                adaylar.append((oncelik, d.sonraki, dev_id, TAM, d.sure))
+            elif d.mod == 'yavas' and d.sonraki_alarm <= simdi:
+                adaylar.append((1, d.sonraki_alarm, dev_id, ALARM, d.sure / 2))
+        adaylar.sort()
+
+        if not seri_hat:
+            return [(dev_id, tur) for _, _, dev_id, tur, _ in adaylar]
+
+        # Hat bütçesi: en az bir cihaz her zaman okunur (açlık olmasın)
+        butce = ZAMANLAMA['hat_doluluk'] * tur_suresi
+        secilen, harcanan = [], 0.0
+        for _, _, dev_id, tur, sure in adaylar:
+            if secilen and harcanan + sure > butce:
+                break
+            secilen.append((dev_id, tur))
+            harcanan += sure
+        return secilen
+
+    def sonuc(self, hat, slave_id, tur, data, sure, simdi=None):
+        """Okuma sonucuna göre cihazın bir sonraki okuma zamanını belirler."""
+        simdi = time.monotonic() if simdi is None else simdi
+        d = self.cihazlar[(hat, slave_id)]
+        d.sure = 0.7 * d.sure + 0.3 * sure
+
+        if data is None:
+            d.hata += 1
+            d.alarm = False
+            d.mod = 'geri_cekilme'
+            d.aralik = min(ZAMANLAMA['geri_cekilme_max'], ZAMANLAMA['normal'] * 2 ** d.hata)
+            d.sonraki = simdi + d.aralik
+            return
+
+        d.hata = 0
+        d.alarm = bool(data.get('hata_kodu', 0) or data.get('hata_kodu_193', 0))
+        if tur == ALARM:
+            if d.alarm:
+                # Yavaş moddaki cihazda alarm: tam okumayı öne çek
+                d.mod, d.aralik, d.sonraki = 'hizli', ZAMANLAMA['hizli'], simdi
+            d.sonraki_alarm = simdi + ZAMANLAMA['normal']
+            return
+
+        guc = data.get('guc', 0)
+        gece = guc <= ZAMANLAMA['gece_guc']
+        sabit = (d.son_guc is not None
+                 and abs(guc - d.son_guc) <= ZAMANLAMA['sabit_oran'] * max(abs(d.son_guc), 1))
+        d.sabit = d.sabit + 1 if (gece or sabit) else 0
+        d.son_guc = guc
+
+        if d.alarm:
+            d.mod, d.aralik = 'hizli', ZAMANLAMA['hizli']
+        elif d.sabit >= ZAMANLAMA['sabit_tur']:
+            d.mod, d.aralik = 'yavas', ZAMANLAMA['yavas']
+        else:
+            d.mod, d.aralik = 'normal', ZAMANLAMA['normal']
+        d.sonraki = simdi + d.aralik
+        d.sonraki_alarm = simdi + ZAMANLAMA['normal']
+
+    def ozet(self):
+        """{mod: cihaz sayısı} - durum satırı için"""
+        sayim = {}
+        for d in self.cihazlar.values():
+            sayim[d.mod] = sayim.get(d.mod, 0) + 1
+        return sayim